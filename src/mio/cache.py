@@ -22,6 +22,9 @@ import pathlib
 import semver
 import time
 import fusesoc
+import sqlite3
+import pickle
+from threading import Lock
 
 
 
@@ -31,6 +34,17 @@ fsoc_ip_dir_name = {}
 
 ip_cache   = {}
 core_cache = {}
+ip_cache_loaded = False
+
+# Persistent stat index of the IP paths: lets a warm start skip listing unchanged directories and re-parsing unchanged
+# descriptors
+dir_index        = {}
+descriptor_index = {}
+
+# Bump whenever the layout of the cache dicts changes: stale databases are then discarded instead of parsed
+cache_db_schema_version = 1
+cache_db      = None
+cache_db_lock = Lock()
 
 
 class FCore:
@@ -119,8 +133,10 @@ class IP:
         else:
             self.ip_yml_hash  = ""
         self.is_licensed                                   = False
-        self.code_timestamp                                = ""
-        self.fresh_code_timestamp                          = ""
+        self.code_hash                                     = ""
+        self.fresh_code_hash                               = ""
+        self.build_manifest                                = {}
+        self.src_file_digests                              = {}
         self.is_installed                                  = False # TODO Use package manager lib to resolve this
         self.is_encrypted                                  = False
         self.is_fsoc_processed                             = False
@@ -339,7 +355,9 @@ class IP:
     
     def parse_from_cache_yml(self, yml):
         try:
-            self.code_timestamp    = yml['code_timestamp']
+            self.code_hash         = yml.get('code_hash', "")
+            self.build_manifest    = yml.get('build_manifest', {})
+            self.src_file_digests  = yml.get('src_file_digests', {})
             self.is_licensed       = yml['is_licensed']
             self.is_local          = yml['is_local']
             self.is_global         = yml['is_global']
@@ -429,7 +447,9 @@ class IP:
     
     def convert_to_cache_dict(self):
         dict = {}
-        dict['code_timestamp']              = self.code_timestamp
+        dict['code_hash']                   = self.code_hash
+        dict['build_manifest']              = self.build_manifest
+        dict['src_file_digests']            = self.src_file_digests
         dict['is_licensed']                 = self.is_licensed
         dict['is_local']                    = self.is_local
         dict['is_global']                   = self.is_global
@@ -523,10 +543,20 @@ class IP:
         else:
             return False
     
-    def calc_code_timestamp(self):
-        src_path = f"{self.path}/{self.src_path}/"
-        self.code_timestamp = common.dir_timestamp(src_path)
-        common.dbg(f"{self.vendor}/{self.name}: calc_code_timestamp={self.code_timestamp}")
+    def calc_code_hash(self):
+        self.code_hash = self.get_code_hash()
+        common.dbg(f"{self.vendor}/{self.name}: calc_code_hash={self.code_hash}")
+    
+    def get_code_hash(self):
+        if self.fresh_code_hash == "":
+            if self.is_local:
+                src_path = f"{self.path}/{self.src_path}/"
+                self.fresh_code_hash = common.dir_hash(src_path, self.src_file_digests)
+            else:
+                # Installed IPs are immutable for a given descriptor
+                self.fresh_code_hash = self.ip_yml_hash
+            common.dbg(f"{self.vendor}/{self.name}: fresh_code_hash={self.fresh_code_hash}")
+        return self.fresh_code_hash
     
     def reset_is_compiled_elaborated(self):
         clean.clean_ip(self, True)
@@ -542,13 +572,9 @@ class IP:
                     needs_update = True
         if needs_update:
             self.reset_is_compiled_elaborated()
-        else:
-            if self.fresh_code_timestamp == "":
-                src_path = f"{self.path}/{self.src_path}/"
-                self.fresh_code_timestamp = common.dir_timestamp(src_path)
-                common.dbg(f"{self.vendor}/{self.name}: fresh_timestamp={self.fresh_code_timestamp}")
-            if self.fresh_code_timestamp != self.code_timestamp:
-                self.reset_is_compiled_elaborated()
+        elif self.get_code_hash() != self.code_hash:
+            self.reset_is_compiled_elaborated()
+            self.code_hash = self.get_code_hash()
     
     def resolve_dependencies(self):
         common.dbg(f"Resolving dependencies for IP '{self.vendor}/{self.name}'")
@@ -681,6 +707,13 @@ def get_ip(vendor, ip_name, fail_if_not_found=False):
             common.dbg(f"IP '{ip_name}' not found in vendor '{vendor}' cache!")
     else:
         common.dbg(f"Vendor '{vendor}' not found in cache!")
+    if (found_ip == False) and (not ip_cache_loaded):
+        ip = load_ip_from_cache(vendor, ip_name)
+        if ip != None:
+            found_ip = True
+            if vendor not in ip_cache:
+                ip_cache[vendor] = {}
+            ip_cache[vendor][ip_name] = ip
     if found_ip == False:
         if fail_if_not_found:
             common.fatal(f"Cannot find IP '{vendor}/{ip_name}'.")
@@ -710,39 +743,101 @@ def get_core(core_name, fail_if_not_found=False):
         return None
 
 
+def get_cache_db():
+    global cache_db
+    if cache_db == None:
+        cache_db = sqlite3.connect(cfg.ip_cache_db_path, check_same_thread=False)
+        cache_db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        row = cache_db.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        if (row == None) or (row[0] != str(cache_db_schema_version)):
+            if row != None:
+                common.dbg(f"IP cache database schema is out of date, starting fresh")
+            cache_db.execute("DROP TABLE IF EXISTS ip")
+            cache_db.execute("DROP TABLE IF EXISTS core")
+            cache_db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)", (str(cache_db_schema_version),))
+        cache_db.execute("CREATE TABLE IF NOT EXISTS ip (vendor TEXT NOT NULL, name TEXT NOT NULL, data BLOB NOT NULL, PRIMARY KEY (vendor, name))")
+        cache_db.execute("CREATE TABLE IF NOT EXISTS core (name TEXT PRIMARY KEY, data BLOB NOT NULL)")
+        cache_db.execute("CREATE TABLE IF NOT EXISTS dir_index (path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, dir_names BLOB NOT NULL)")
+        cache_db.execute("CREATE TABLE IF NOT EXISTS descriptor_index (path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL)")
+        cache_db.commit()
+    return cache_db
+
+
+def parse_ip_cache_row(data):
+    ip_model = IP(False)
+    if ip_model.parse_from_cache_yml(pickle.loads(data)):
+        return ip_model
+    return None
+
+
+def load_ip_from_cache(vendor, name):
+    if cfg.ip_cache_db_path == "":
+        return None
+    try:
+        with cache_db_lock:
+            row = get_cache_db().execute("SELECT data FROM ip WHERE vendor = ? AND name = ?", (vendor, name)).fetchone()
+        if row != None:
+            ip_model = parse_ip_cache_row(row[0])
+            if ip_model != None:
+                common.dbg(f"Loaded IP '{vendor}/{name}' from cache")
+            return ip_model
+    except Exception as e:
+        common.warning(f"Could not look up IP '{vendor}/{name}' in cache: {e}")
+    return None
+
+
 def load_ip_cache():
     global ip_cache
+    global ip_cache_loaded
     try:
-        with open(cfg.ip_cache_file_path, 'r') as ymlfile:
-            yml = yaml.load(ymlfile, Loader=SafeLoader)
-            for vendor in yml['ip']:
-                for ip in yml['ip'][vendor]:
-                    ip_model = IP(False)
-                    if ip_model.parse_from_cache_yml(yml['ip'][vendor][ip]):
-                        if ip_model.vendor not in ip_cache:
-                            ip_cache[ip_model.vendor] = {}
-                        ip_cache[ip_model.vendor][ip_model.name] = ip_model
-                        common.dbg(f"Loaded IP '{ip_model.vendor}/{ip_model.name}' from cache")
+        with cache_db_lock:
+            rows = get_cache_db().execute("SELECT data FROM ip").fetchall()
+        for row in rows:
+            ip_model = parse_ip_cache_row(row[0])
+            if ip_model != None:
+                if ip_model.vendor not in ip_cache:
+                    ip_cache[ip_model.vendor] = {}
+                ip_cache[ip_model.vendor][ip_model.name] = ip_model
+                common.dbg(f"Loaded IP '{ip_model.vendor}/{ip_model.name}' from cache")
     except Exception as e:
         common.warning(f"IP cache is corrupt, starting fresh: {e}")
         ip_cache = {}
+    ip_cache_loaded = True
 
 
 def load_core_cache():
     global core_cache
     try:
-        with open(cfg.fsoc_cache_file_path, 'r') as ymlfile:
-            yml = yaml.load(ymlfile, Loader=SafeLoader)
-            for core in yml['cores']:
-                core_model = FCore()
-                if core_model.parse_from_cache_yml(yml['cores'][core]):
-                    core_cache[core_model.name] = core_model
-                    commong.dbg(f"Loaded Core '{core_model.name}' from cache")
-    except:
-        common.warning("Core cache is corrupt.  Starting fresh.")
+        with cache_db_lock:
+            rows = get_cache_db().execute("SELECT data FROM core").fetchall()
+        for row in rows:
+            core_model = FCore()
+            if core_model.parse_from_cache_yml(pickle.loads(row[0])):
+                core_cache[core_model.name] = core_model
+                common.dbg(f"Loaded Core '{core_model.name}' from cache")
+    except Exception as e:
+        common.warning(f"Core cache is corrupt, starting fresh: {e}")
         core_cache = {}
 
 
+def load_dir_index():
+    global dir_index
+    global descriptor_index
+    try:
+        with cache_db_lock:
+            db = get_cache_db()
+            dir_rows        = db.execute("SELECT path, mtime_ns, dir_names FROM dir_index").fetchall()
+            descriptor_rows = db.execute("SELECT path, mtime_ns, size FROM descriptor_index").fetchall()
+        for path, mtime_ns, dir_names in dir_rows:
+            dir_index[path] = [mtime_ns, pickle.loads(dir_names)]
+        for path, mtime_ns, size in descriptor_rows:
+            descriptor_index[path] = [mtime_ns, size]
+    except Exception as e:
+        common.warning(f"Directory index is corrupt, starting fresh: {e}")
+        dir_index        = {}
+        descriptor_index = {}
+
+
 def check_ip_cache_integrity():
     list = {}
     for vendor in ip_cache:
@@ -764,6 +859,7 @@ def check_core_cache_integrity():
 def scan_and_load_ip_metadata():
     load_ip_cache()
     load_core_cache()
+    load_dir_index()
     find_external_ip_files(cfg.user_global_ips_path, True)
     find_external_ip_files(cfg.dependencies_path)
     for ip_path in cfg.global_ips_path:
@@ -787,113 +883,191 @@ def resolve_ip_dependencies():
             ip_cache[vendor][ip].resolve_dependencies()
 
 
+def find_descriptors(path, is_core=False):
+    # Only the immediate sub-directories of an IP path can hold descriptors.  The listing of 'path' is reused as long as
+    # its mtime doesn't move; descriptors themselves are always stat'ed to catch in-place edits.
+    descriptors = []
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return descriptors
+    if (path in dir_index) and (dir_index[path][0] == mtime_ns):
+        dir_names = dir_index[path][1]
+    else:
+        common.dbg(f"Listing directory '{path}'")
+        dir_names = sorted([entry.name for entry in os.scandir(path) if entry.is_dir()])
+        dir_index[path] = [mtime_ns, dir_names]
+    for dir_name in dir_names:
+        dir_path = os.path.join(path, dir_name)
+        if is_core:
+            descriptor_path = os.path.join(dir_path, dir_name + ".core")
+        else:
+            descriptor_path = os.path.join(dir_path, "ip.yml")
+        try:
+            stat = os.stat(descriptor_path)
+        except OSError:
+            continue
+        descriptors.append([dir_path, descriptor_path, [stat.st_mtime_ns, stat.st_size]])
+    return descriptors
+
+
+def is_cached_descriptor(descriptor_path, descriptor_stat, cached_model):
+    if cached_model == None:
+        return False
+    return descriptor_index.get(descriptor_path) == descriptor_stat
+
+
+def get_cached_ips_by_path(is_local):
+    cached_ips = {}
+    for vendor in ip_cache:
+        for name in ip_cache[vendor]:
+            ip = ip_cache[vendor][name]
+            if ip.is_local == is_local:
+                cached_ips[ip.path] = ip
+    return cached_ips
+
+
 def find_fsoc_cores(path):
     global core_cache
-    add_core = False
-    for dirpath, dirnames, filenames in os.walk(path):
-        for dir in dirnames:
-            current_dir_path       = os.path.join(path            , dir)
-            current_core_file_path = os.path.join(current_dir_path, dir + ".core")
-            if os.path.exists(current_core_file_path):
-                common.dbg("Found FuseSoC core file at '" + current_core_file_path + "'")
-                core = FCore(current_dir_path, current_core_file_path)
-                core.parse_from_core_yml()
-                if core.name not in core_cache:
-                    core_cache[core.name] = core
-                    common.dbg(f"Added core '{core.name}' to the cache")
-                else:
-                    if core.core_yml_hash != core_cache[core.name].core_yml_hash:
-                        core_cache[core.name] = core
-                        common.dbg(f"Updated core '{core.name}'")
-                    else:
-                        common.dbg(f"Core '{core.name}' cache data is up-to-date")
+    cached_cores = {}
+    for name in core_cache:
+        cached_cores[core_cache[name].path] = core_cache[name]
+    for current_dir_path, current_core_file_path, core_file_stat in find_descriptors(path, True):
+        if is_cached_descriptor(current_core_file_path, core_file_stat, cached_cores.get(current_core_file_path)):
+            common.dbg(f"Core file at '{current_core_file_path}' is unchanged")
+            continue
+        common.dbg("Found FuseSoC core file at '" + current_core_file_path + "'")
+        core = FCore(current_dir_path, current_core_file_path)
+        core.parse_from_core_yml()
+        descriptor_index[current_core_file_path] = core_file_stat
+        if core.name not in core_cache:
+            core_cache[core.name] = core
+            common.dbg(f"Added core '{core.name}' to the cache")
+        else:
+            if core.core_yml_hash != core_cache[core.name].core_yml_hash:
+                core_cache[core.name] = core
+                common.dbg(f"Updated core '{core.name}'")
+            else:
+                common.dbg(f"Core '{core.name}' cache data is up-to-date")
 
 
 def find_local_ip_files(path):
     global ip_cache
-    for dirpath, dirnames, filenames in os.walk(path):
-        for dir in dirnames:
-            current_dir_path     = os.path.join(path            , dir)
-            current_ip_file_path = os.path.join(current_dir_path, "ip.yml")
-            if os.path.exists(current_ip_file_path):
-                common.dbg("Found ip.yml at '" + current_dir_path + "'")
-                ip = IP(True, False, current_dir_path)
-                ip.parse_from_ip_yml()
-                if ip.vendor not in ip_cache:
-                    ip.calc_code_timestamp()
-                    ip_cache[ip.vendor] = {}
-                    ip_cache[ip.vendor][ip.name] = ip
-                    common.dbg(f"Added local IP '{ip.vendor}/{ip.name}'")
-                else:
-                    if ip.name not in ip_cache[ip.vendor]:
-                        ip.calc_code_timestamp()
+    cached_ips = get_cached_ips_by_path(True)
+    for current_dir_path, current_ip_file_path, ip_file_stat in find_descriptors(path):
+        if is_cached_descriptor(current_ip_file_path, ip_file_stat, cached_ips.get(current_dir_path)):
+            common.dbg(f"ip.yml at '{current_dir_path}' is unchanged")
+            continue
+        common.dbg("Found ip.yml at '" + current_dir_path + "'")
+        ip = IP(True, False, current_dir_path)
+        ip.parse_from_ip_yml()
+        descriptor_index[current_ip_file_path] = ip_file_stat
+        if ip.vendor not in ip_cache:
+            ip.calc_code_hash()
+            ip_cache[ip.vendor] = {}
+            ip_cache[ip.vendor][ip.name] = ip
+            common.dbg(f"Added local IP '{ip.vendor}/{ip.name}'")
+        else:
+            if ip.name not in ip_cache[ip.vendor]:
+                ip.calc_code_hash()
+                ip_cache[ip.vendor][ip.name] = ip
+                common.dbg(f"Added local IP '{ip.vendor}/{ip.name}'")
+            else:
+                if ip_cache[ip.vendor][ip.name].is_local:
+                    if ip.ip_yml_hash != ip_cache[ip.vendor][ip.name].ip_yml_hash:
+                        ip.calc_code_hash()
                         ip_cache[ip.vendor][ip.name] = ip
-                        common.dbg(f"Added local IP '{ip.vendor}/{ip.name}'")
+                        common.dbg(f"Updated local IP '{ip.vendor}/{ip.name}'")
                     else:
-                        if ip_cache[ip.vendor][ip.name].is_local:
-                            if ip.ip_yml_hash != ip_cache[ip.vendor][ip.name].ip_yml_hash:
-                                ip.calc_code_timestamp()
-                                ip_cache[ip.vendor][ip.name] = ip
-                                common.dbg(f"Updated local IP '{ip.vendor}/{ip.name}'")
-                            else:
-                                common.dbg(f"Local IP '{ip.vendor}/{ip.name}' cache data is up-to-date")
-                        else:
-                            ip.calc_code_timestamp()
-                            ip_cache[ip.vendor][ip.name] = ip
-                            common.dbg(f"Updated local IP '{ip.vendor}/{ip.name}'")
+                        common.dbg(f"Local IP '{ip.vendor}/{ip.name}' cache data is up-to-date")
+                else:
+                    ip.calc_code_hash()
+                    ip_cache[ip.vendor][ip.name] = ip
+                    common.dbg(f"Updated local IP '{ip.vendor}/{ip.name}'")
 
 
 def find_external_ip_files(path, is_global=False):
     global ip_cache
     common.dbg(f"Looking for external IPs under '{path}'")
-    for dirpath, dirnames, filenames in os.walk(path):
-        for dir in dirnames:
-            current_dir_path     = os.path.join(path            , dir)
-            current_ip_file_path = os.path.join(current_dir_path, "ip.yml")
-            if os.path.exists(current_ip_file_path):
-                common.dbg("Found ip.yml at '" + current_dir_path + "'")
-                ip = IP(False, is_global, current_dir_path)
-                ip.parse_from_ip_yml()
-                if ip.vendor not in ip_cache:
-                    ip_cache[ip.vendor] = {}
+    cached_ips = get_cached_ips_by_path(False)
+    for current_dir_path, current_ip_file_path, ip_file_stat in find_descriptors(path):
+        if is_cached_descriptor(current_ip_file_path, ip_file_stat, cached_ips.get(current_dir_path)):
+            common.dbg(f"ip.yml at '{current_dir_path}' is unchanged")
+            continue
+        common.dbg("Found ip.yml at '" + current_dir_path + "'")
+        ip = IP(False, is_global, current_dir_path)
+        ip.parse_from_ip_yml()
+        descriptor_index[current_ip_file_path] = ip_file_stat
+        if ip.vendor not in ip_cache:
+            ip_cache[ip.vendor] = {}
+            ip_cache[ip.vendor][ip.name] = ip
+            common.dbg(f"Added external IP '{ip.vendor}/{ip.name}'")
+        else:
+            if ip.name not in ip_cache[ip.vendor]:
+                ip_cache[ip.vendor][ip.name] = ip
+                common.dbg(f"Added external IP '{ip.vendor}/{ip.name}'")
+            else:
+                if ip.ip_yml_hash != ip_cache[ip.vendor][ip.name].ip_yml_hash:
                     ip_cache[ip.vendor][ip.name] = ip
-                    common.dbg(f"Added external IP '{ip.vendor}/{ip.name}'")
+                    common.dbg(f"Updated external IP '{ip.vendor}/{ip.name}'")
                 else:
-                    if ip.name not in ip_cache[ip.vendor]:
-                        ip_cache[ip.vendor][ip.name] = ip
-                        common.dbg(f"Added external IP '{ip.vendor}/{ip.name}'")
-                    else:
-                        if ip.ip_yml_hash != ip_cache[ip.vendor][ip.name].ip_yml_hash:
-                            ip_cache[ip.vendor][ip.name] = ip
-                            common.dbg(f"Updated external IP '{ip.vendor}/{ip.name}'")
-                        else:
-                            common.dbg(f"External IP '{ip.vendor}/{ip.name}' cache data is up-to-date")
+                    common.dbg(f"External IP '{ip.vendor}/{ip.name}' cache data is up-to-date")
 
 
 def write_caches_to_disk():
-    if cfg.ip_cache_file_path == "":
+    if cfg.ip_cache_db_path == "":
         # We're running doctor or a similar command, we don't complain
         return
     try:
-        with open(cfg.ip_cache_file_path, 'w') as yaml_file_write:
-            ip_yml = {}
-            ip_yml['ip'] = {}
-            for vendor in ip_cache:
-                ip_yml['ip'][vendor] = {}
-                for ip in ip_cache[vendor]:
-                    ip_yml['ip'][vendor][ip] = ip_cache[vendor][ip].convert_to_cache_dict()
-            yaml.dump(ip_yml, yaml_file_write)
+        ip_rows = []
+        for vendor in ip_cache:
+            for ip in ip_cache[vendor]:
+                ip_dict = ip_cache[vendor][ip].convert_to_cache_dict()
+                ip_rows.append((vendor, ip, pickle.dumps(ip_dict, pickle.HIGHEST_PROTOCOL)))
+        core_rows = []
+        for core in core_cache:
+            core_dict = core_cache[core].convert_to_cache_dict()
+            core_rows.append((core, pickle.dumps(core_dict, pickle.HIGHEST_PROTOCOL)))
+        dir_rows = []
+        for path in dir_index:
+            dir_rows.append((path, dir_index[path][0], pickle.dumps(dir_index[path][1], pickle.HIGHEST_PROTOCOL)))
+        descriptor_rows = []
+        for path in descriptor_index:
+            descriptor_rows.append((path, descriptor_index[path][0], descriptor_index[path][1]))
         
-        with open(cfg.fsoc_cache_file_path, 'w') as yaml_file_write:
-            core_yml = {}
-            core_yml['cores'] = {}
-            for core in core_cache:
-                core_yml['cores'][core] = core_cache[core].convert_to_cache_dict()
-            yaml.dump(core_yml, yaml_file_write)
+        with cache_db_lock:
+            db = get_cache_db()
+            with db:
+                db.execute("DELETE FROM ip")
+                db.executemany("INSERT INTO ip (vendor, name, data) VALUES (?, ?, ?)", ip_rows)
+                db.execute("DELETE FROM core")
+                db.executemany("INSERT INTO core (name, data) VALUES (?, ?)", core_rows)
+                db.execute("DELETE FROM dir_index")
+                db.executemany("INSERT INTO dir_index (path, mtime_ns, dir_names) VALUES (?, ?, ?)", dir_rows)
+                db.execute("DELETE FROM descriptor_index")
+                db.executemany("INSERT INTO descriptor_index (path, mtime_ns, size) VALUES (?, ?, ?)", descriptor_rows)
         
-        with open(cfg.job_history_file_path, 'w') as yamlfile:
-            yaml.dump({"history" : cfg.job_history}, yamlfile)
+        if cfg.dbg:
+            export_caches_to_yml()
         
     except Exception as e:
         print("\033[31m\033[1m[mio-fatal] Could not write caches to disk \033[0m: " + str(e))
         sys.exit(0)
+
+
+def export_caches_to_yml():
+    with open(cfg.ip_cache_file_path, 'w') as yaml_file_write:
+        ip_yml = {}
+        ip_yml['ip'] = {}
+        for vendor in ip_cache:
+            ip_yml['ip'][vendor] = {}
+            for ip in ip_cache[vendor]:
+                ip_yml['ip'][vendor][ip] = ip_cache[vendor][ip].convert_to_cache_dict()
+        yaml.dump(ip_yml, yaml_file_write)
+    
+    with open(cfg.fsoc_cache_file_path, 'w') as yaml_file_write:
+        core_yml = {}
+        core_yml['cores'] = {}
+        for core in core_cache:
+            core_yml['cores'][core] = core_cache[core].convert_to_cache_dict()
+        yaml.dump(core_yml, yaml_file_write)
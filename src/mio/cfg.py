@@ -57,20 +57,31 @@ mio_data_dir          = ""
 fsoc_dir              = ""
 sim_output_dir        = ""
 dependencies_path     = ""
+ip_cache_db_path      = ""
 ip_cache_file_path    = ""
 fsoc_cache_file_path  = ""
 job_history_file_path = ""
+job_history_db_path   = ""
 commands_file_path    = ""
 user_file_path        = mio_user_dir + "/user.yml"
 builtin_ip_path       = ""
 user_mio_file         = mio_user_dir + "/mio.toml"
 
-sim_timescale   = ""
-regression_name = ""
-test_suite_name = ""
+sim_timescale    = ""
+compilation_jobs = 0
+regression_name  = ""
+test_suite_name  = ""
+job_history_retention_days = 0
+elaboration_snapshots      = 0
+sim_log_failure_limit      = 0
+library_cache_path         = ""
+library_cache_max_size_gb  = 0
 test_results_path_template = ""
 encryption_key_path_vivado = ""
 encryption_key_path_metrics = ""
+encryption_jobs = 0
+download_cache_path = ""
+download_cache_max_size_gb = 0
 
 templateLoader = jinja2.FileSystemLoader(searchpath=mio_template_dir)
 templateEnv    = jinja2.Environment(loader=templateLoader)
@@ -79,7 +90,6 @@ fresh_fsoc_cache = False
 fresh_ip_cache = False
 
 ip_paths = []
-job_history = {}
 configuration = {}
 ip_local_cache = {}
 ip_external_cache = {}
@@ -107,9 +117,11 @@ def set_project_dir(path):
     global sim_output_dir
     global dependencies_path
     global builtin_ip_path
+    global ip_cache_db_path
     global ip_cache_file_path
     global fsoc_cache_file_path
     global job_history_file_path
+    global job_history_db_path
     global commands_file_path
     project_dir           = path
     mio_data_dir          = project_dir + "/.mio"
@@ -119,9 +131,11 @@ def set_project_dir(path):
     dependencies_path     = mio_data_dir + "/vendors"
     builtin_ip_path       = mio_data_src_dir + "/ip"
     commands_file_path    = mio_data_dir + "/commands.yml"
+    ip_cache_db_path      = mio_data_dir + "/ip_cache.db"
     fsoc_cache_file_path  = mio_data_dir + "/fsoc_cache.yml"
     ip_cache_file_path    = mio_data_dir + "/ip_cache.yml"
     job_history_file_path = mio_data_dir + "/job_history.yml"
+    job_history_db_path   = mio_data_dir + "/job_history.db"
 
 
 
@@ -136,12 +150,21 @@ def load_configuration():
     global test_results_path_template
     global encryption_key_path_vivado
     global encryption_key_path_metrics
+    global encryption_jobs
     global org_name
     global org_full_name
     global global_ips_path
     global default_simulator
     global uvm_version
     global sim_timescale
+    global compilation_jobs
+    global job_history_retention_days
+    global elaboration_snapshots
+    global sim_log_failure_limit
+    global library_cache_path
+    global library_cache_max_size_gb
+    global download_cache_path
+    global download_cache_max_size_gb
     
     project_name      = configuration.get("project", {}).get("name")
     #org_name          = user.user_data['org-name']
@@ -153,21 +176,56 @@ def load_configuration():
     sim_timescale              = configuration.get("simulation", {}).get("timescale").strip()
     test_results_path_template = configuration.get("simulation", {}).get("test-result-path-template").strip()
     default_simulator_str      = configuration.get("simulation", {}).get("default-simulator").strip()
+    compilation_jobs           = configuration.get("simulation", {}).get("compilation-jobs")
+    job_history_retention_days = configuration.get("simulation", {}).get("job-history-retention-days")
+    elaboration_snapshots      = configuration.get("simulation", {}).get("elaboration-snapshots")
+    sim_log_failure_limit      = configuration.get("simulation", {}).get("sim-log-failure-limit")
+    library_cache_path         = configuration.get("simulation", {}).get("library-cache-path").strip()
+    library_cache_max_size_gb  = configuration.get("simulation", {}).get("library-cache-max-size-gb")
     
     encryption_key_path_vivado  = configuration.get("encryption", {}).get("vivado-key-path" ).strip().replace("~", user_dir)
     encryption_key_path_metrics = configuration.get("encryption", {}).get("metrics-key-path").strip().replace("~", user_dir)
+    encryption_jobs             = configuration.get("encryption", {}).get("jobs")
     
     org_name      = configuration.get("org", {}).get("name").strip()
     org_full_name = configuration.get("org", {}).get("full-name").strip()
     
     global_ips_path = configuration.get("ip", {}).get("global-paths")
     ip_paths        = configuration.get("ip", {}).get("paths")
+    download_cache_path        = configuration.get("ip", {}).get("download-cache-path").strip()
+    download_cache_max_size_gb = configuration.get("ip", {}).get("download-cache-max-size-gb")
     
     if not encryption_key_path_vivado == None:
         encryption_key_path_vivado = encryption_key_path_vivado.replace("~", user_dir)
     if not encryption_key_path_metrics == None:
         encryption_key_path_metrics = encryption_key_path_metrics.replace("~", user_dir)
     
+    if download_cache_path != "":
+        download_cache_path = os.path.abspath(os.path.expandvars(download_cache_path.replace("~", user_dir)))
+    if (type(download_cache_max_size_gb) not in [int, float]) or (download_cache_max_size_gb < 0):
+        common.warning(f"Download cache size ('{download_cache_max_size_gb}') is invalid.  Using 0 (no limit).")
+        download_cache_max_size_gb = 0
+    if (type(encryption_jobs) is not int) or (encryption_jobs < 0):
+        common.warning(f"Number of encryption jobs ('{encryption_jobs}') is invalid.  Using 0 (one per CPU).")
+        encryption_jobs = 0
+    if (type(compilation_jobs) is not int) or (compilation_jobs < 0):
+        common.warning(f"Number of compilation jobs ('{compilation_jobs}') is invalid.  Using 0 (one per CPU).")
+        compilation_jobs = 0
+    if (type(job_history_retention_days) is not int) or (job_history_retention_days < 0):
+        common.warning(f"Job history retention ('{job_history_retention_days}') is invalid.  Using 0 (keep all history).")
+        job_history_retention_days = 0
+    if (type(elaboration_snapshots) is not int) or (elaboration_snapshots < 0):
+        common.warning(f"Number of elaboration snapshots ('{elaboration_snapshots}') is invalid.  Using 0 (no snapshots).")
+        elaboration_snapshots = 0
+    if (type(sim_log_failure_limit) is not int) or (sim_log_failure_limit < 0):
+        common.warning(f"Simulation log failure limit ('{sim_log_failure_limit}') is invalid.  Using 0 (parse entire logs).")
+        sim_log_failure_limit = 0
+    if library_cache_path != "":
+        library_cache_path = os.path.abspath(os.path.expandvars(library_cache_path.replace("~", user_dir)))
+    if (type(library_cache_max_size_gb) not in [int, float]) or (library_cache_max_size_gb < 0):
+        common.warning(f"Library cache size ('{library_cache_max_size_gb}') is invalid.  Using 0 (no limit).")
+        library_cache_max_size_gb = 0
+    
     if default_simulator_str == "viv":
         default_simulator = common.simulators_enum.VIVADO
     elif default_simulator_str == "vcs":
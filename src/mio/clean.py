@@ -82,6 +82,7 @@ def clean_ip(ip, no_infos=False):
     common.remove_dir(cfg.sim_output_dir + '/vcs/elab_out/regressions/' + ip_dir_name)
     common.remove_dir(cfg.sim_output_dir + '/xcl/elab_out/regressions/' + ip_dir_name)
     common.remove_dir(cfg.sim_output_dir + '/qst/elab_out/regressions/' + ip_dir_name)
+    common.remove_dir(cfg.sim_output_dir + '/riv/elab_out/regressions/' + ip_dir_name)
     
     if ip.is_local:
         if no_infos:
@@ -111,4 +112,5 @@ def clean_ip(ip, no_infos=False):
     ip.is_elaborated[common.simulators_enum.XCELIUM] = False
     ip.is_elaborated[common.simulators_enum.QUESTA ] = False
     ip.is_elaborated[common.simulators_enum.RIVIERA] = False
+    ip.build_manifest = {}
     
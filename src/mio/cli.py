@@ -20,7 +20,9 @@ from mio import main
 from mio import help_text
 from mio import user
 from mio import doctor
+from mio import engine
 
+import atexit
 import sys
 import argparse
 import os
@@ -60,6 +62,11 @@ def main():
         cfg.set_pwd(cli_args.wd)
     else:
         cfg.pwd = os.getcwd()
+    if cli_args.events != None:
+        events_consumer = engine.JsonEventConsumer(cli_args.events)
+        engine.add_consumer(events_consumer)
+        # mio exits from many places (common.exit(), common.fatal()): the events file is closed whenever it does
+        atexit.register(engine.close_consumer, events_consumer)
     
     user.load_user_data()
     in_project = cfg.find_project_descriptor()
@@ -92,7 +99,7 @@ def main():
             if (cli_args.password == None) or (cli_args.password == ""):
                 common.fatal("Must specify both username AND password")
         vendor, name = common.parse_dep(cli_args.ip.lower())
-        install.install_ip_and_deps(vendor, name, cli_args.is_global, cli_args.username, cli_args.password)
+        install.install_ip_and_deps(vendor, name, cli_args.is_global, cli_args.username, cli_args.password, cli_args.frozen)
         common.exit()
     if cli_args.command == 'login':
         if (cli_args.username != None) and (cli_args.username != ""):
@@ -124,7 +131,9 @@ def main():
     if cli_args.command == 'results':
         cache.check_ip_str(cli_args.ip.lower())
         common.banner(f"Parsing simulation results for '{cli_args.ip.lower()}'")
-        regr_results = results.main(cli_args.ip.lower(), cli_args.filename)
+        if (cli_args.failure_limit != None) and (cli_args.failure_limit < 0):
+            common.fatal("Failure limit must be positive or 0")
+        regr_results = results.main(cli_args.ip.lower(), cli_args.filename, failure_limit=cli_args.failure_limit)
         common.info(f"HTML Report: '{regr_results.html_report_path}'")
         common.info(f"Jenkins XML: '{regr_results.xml_report_path}'")
         common.exit()
@@ -135,17 +144,18 @@ def main():
     if cli_args.command == 'sim':
         sim_job = create_sim_job(cli_args)
         cache.check_ip(sim_job.vendor, sim_job.ip)
-        user.login()
+        user.resolve_session_token()
         sim.main(sim_job)
         common.exit()
     if cli_args.command == '!':
         sim_job = create_repeat_sim_job(cli_args)
         cache.check_ip(sim_job.vendor, sim_job.ip)
-        user.login()
+        user.resolve_session_token()
         sim.main(sim_job)
         common.exit()
     if cli_args.command == 'regr':
         cache.check_ip_str(cli_args.ip.lower())
+        user.resolve_session_token()
         regr.main(cli_args.ip.lower(), cli_args.regr.lower(), cli_args.app, cli_args.dry)
         common.exit()
     
@@ -157,6 +167,7 @@ def build_parser():
     parser.add_argument("-h"   , "--help"   , help="Show this help message and exit.", action="store_true", default=False, required=False)
     parser.add_argument("-v"   , "--version", help="Print the mio version and exit." , action="store_true", default=False, required=False)
     parser.add_argument("--dbg",              help="Enable mio tracing output."      , action="store_true", default=False, required=False)
+    parser.add_argument("--events",           help="Write EDA job events as JSON lines to <path> ('-' for stdout).", required=False)
     parser.add_argument("-C"   , "--wd"     , help="Run as if mio was started in <path> instead of the current working directory.", type=pathlib.Path, required=False)
     subparsers = parser.add_subparsers(help='Command to be performed by mio', dest='command')
     
@@ -175,6 +186,7 @@ def build_parser():
     parser_install.add_argument("-g", "--global"  , help="Install dependencies under '~/.mio'." , action="store_true", default=False, required=False, dest="is_global")
     parser_install.add_argument('-u', "--username", help='Moore.io IP Marketplace username', required=False)
     parser_install.add_argument('-p', "--password", help='Moore.io IP Marketplace password', required=False)
+    parser_install.add_argument('-f', "--frozen"  , help="Install the dependency versions pinned in 'ip.lock.yml'.", action="store_true", default=False, required=False)
     
     parser_login = subparsers.add_parser('login', help=help_text.login_help_text, add_help=False)
     parser_login.add_argument('-u', "--username", help='Moore.io IP Marketplace username', required=False)
@@ -201,6 +213,7 @@ def build_parser():
     parser_sim.add_argument('-w', "--waves"    , help='Enable wave capture to disk.'                                                                       , action="store_true", required=False)
     parser_sim.add_argument('-c', "--cov"      , help='Enable code & functional coverage capture.'                                                         , action="store_true", required=False)
     parser_sim.add_argument('-g', "--gui"      , help="Invoke the simulator's Graphical User Interface."                                                   , action="store_true", required=False)
+    parser_sim.add_argument('-j', "--jobs"     , help='Specifies the maximum number of IP dependencies compiled in parallel.'                              , type=int           , required=False)
     #parser_sim.add_argument('-p', "--prism"    , help='Enable Moore.io PRISM advanced UVM debugging.'                                                      , action="store_true", required=False)
     parser_sim.add_argument('-S'               , help='Force mio to simulate target IP.  Can be combined with -F, -C and/or -E.'                           , action="store_true", required=False)
     parser_sim.add_argument('-E'               , help='Force mio to elaborate target IP.  Can be combined with -F, -C and/or -S.'                          , action="store_true", required=False)
@@ -217,6 +230,10 @@ def build_parser():
     parser_sim.add_argument('regr'       , help='Regression to be run.  For Test Bench IPs with multiple Test Suites, the suite must be specified. Ex: `mio regr my_ip apbxc.sanity`')
     parser_sim.add_argument('-a', "--app", help='Specifies which simulator to use: viv, mdc, vcs, xcl, qst, riv.', choices=simulators , required=False)
     parser_sim.add_argument('-d', "--dry", help='Compiles and elaborates target IP but only prints out the tests that would be run.', action="store_true", default=False , required=False)
+    parser_sim.add_argument("--abort-failures" , help='Abort the regression after this many failed tests.'                                   , type=int  , required=False)
+    parser_sim.add_argument("--abort-rate"     , help='Abort the regression when the percentage of failed tests exceeds this value.'          , type=float, required=False)
+    parser_sim.add_argument("--abort-min-tests", help='Number of tests that must have completed before --abort-rate is checked (default: 10).', type=int  , required=False)
+    parser_sim.add_argument("--abort-on-fatal" , help='Abort the regression as soon as a test ends with a fatal error.', action="store_true", default=False , required=False)
     
     parser_clean = subparsers.add_parser('clean', help=help_text.clean_help_text, add_help=False)
     parser_clean.add_argument('ip'          , help='Target IP'                                                            )
@@ -225,6 +242,7 @@ def build_parser():
     parser_results = subparsers.add_parser('results', help=help_text.results_help_text, add_help=False)
     parser_results.add_argument('ip'      , help='Target IP'      )
     parser_results.add_argument('filename', help='Report filename')
+    parser_results.add_argument('-f', "--failure-limit", help='Stop parsing a simulation log after this many errors and fatals.', type=int, required=False)
     
     parser_cov = subparsers.add_parser('cov', help=help_text.cov_help_text, add_help=False)
     parser_cov.add_argument('ip', help='Target IP')
@@ -294,6 +312,11 @@ def create_sim_job(cli_args):
     else:
         sim_job.max_errors = cli_args.errors
     
+    if cli_args.jobs != None:
+        if cli_args.jobs < 1:
+            common.fatal("Number of compilation jobs must be a positive integer")
+        sim_job.max_cmp_jobs = cli_args.jobs
+    
     if cli_args.verbosity == None:
        sim_job.verbosity = "medium"
     else:
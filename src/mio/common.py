@@ -14,12 +14,14 @@ import os
 import yaml
 import shutil
 import re
-import platform
-import time
 from enum import Enum
 from yaml.loader import SafeLoader
 from datetime import datetime
 import hashlib
+import errno
+import fcntl
+from contextlib import contextmanager
+from threading import Condition, Lock
 from tqdm import tqdm
 from distutils.dir_util import copy_tree
 from distutils.dir_util import remove_tree
@@ -130,24 +132,38 @@ def parse_timestamp(string):
     return datetime.strptime(string, "%Y/%m/%d-%H:%M:%S")
 
 
-def dir_timestamp(path):
-    timestamps = []
+def dir_hash(path, file_digests):
+    digest = hashlib.md5()
+    seen_files = set()
     for root, subdirs, files in os.walk(path):
-        for file in files:
+        subdirs.sort()
+        for file in sorted(files):
             file_p = os.path.join(root, file)
-            if platform.system() == 'Windows':
-                modTimesinceEpoc = os.path.getctime(file_p)
-            else:
+            rel_path = os.path.relpath(file_p, path)
+            try:
                 statbuf = os.stat(file_p)
-                modTimesinceEpoc = statbuf.st_mtime
-            modificationTime = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(modTimesinceEpoc))
-            timestamps.append(modificationTime)
-    if len(timestamps) > 0:
-        latest_timestamp = max(timestamps)
-        latest_timestamp_str = datetime.strptime(latest_timestamp, '%Y-%m-%d %H:%M:%S')
-    else:
-        latest_timestamp_str = timestamp()
-    return latest_timestamp_str
+                if (rel_path in file_digests) and (file_digests[rel_path][0:2] == [statbuf.st_size, statbuf.st_mtime_ns]):
+                    file_digest = file_digests[rel_path][2]
+                else:
+                    file_digest = calc_file_digest(file_p)
+                    file_digests[rel_path] = [statbuf.st_size, statbuf.st_mtime_ns, file_digest]
+            except OSError:
+                continue
+            seen_files.add(rel_path)
+            record = rel_path.encode()
+            digest.update(len(record).to_bytes(8, "little") + record + file_digest.encode())
+    for rel_path in list(file_digests):
+        if rel_path not in seen_files:
+            file_digests.pop(rel_path)
+    return digest.hexdigest()
+
+
+def calc_file_digest(path):
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1048576), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
 
 
 def create_dir(path):
@@ -158,6 +174,9 @@ def create_dir(path):
             dbg("Created directory at " + path)
         else:
             dbg("Not creating directory at " + path + " because it already exists")
+    except FileExistsError:
+        # Created concurrently by another job
+        pass
     except:
         fatal(f"Failed to create directory {path}")
 
@@ -181,6 +200,93 @@ def remove_dir(path):
         remove_tree(path)
 
 
+class FileLock:
+    """File Lock model"""
+    
+    def __init__(self, path):
+        self.path       = path
+        self.condition  = Condition()
+        self.file       = None
+        self.num_shared = 0
+        self.exclusive  = False
+        self.acquiring  = False
+    
+    def acquire(self, exclusive, blocking=True):
+        with self.condition:
+            while self.exclusive or self.acquiring or (exclusive and (self.num_shared > 0)):
+                if not blocking:
+                    return False
+                self.condition.wait()
+            if self.num_shared > 0:
+                self.num_shared += 1
+                return True
+            self.acquiring = True
+        # Only one thread at a time waits for other processes to release the file
+        lock_file = None
+        operation = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        if not blocking:
+            operation |= fcntl.LOCK_NB
+        try:
+            lock_file = open(self.path, 'a+')
+            fcntl.lockf(lock_file, operation)
+        except BaseException as e:
+            if lock_file != None:
+                lock_file.close()
+            with self.condition:
+                self.acquiring = False
+                self.condition.notify_all()
+            if (not blocking) and isinstance(e, OSError) and (e.errno in [errno.EACCES, errno.EAGAIN]):
+                return False
+            raise
+        with self.condition:
+            self.acquiring = False
+            self.file      = lock_file
+            if exclusive:
+                self.exclusive = True
+            else:
+                self.num_shared += 1
+            self.condition.notify_all()
+        return True
+    
+    def release(self, exclusive):
+        with self.condition:
+            if exclusive:
+                self.exclusive = False
+            else:
+                self.num_shared -= 1
+            if self.exclusive or (self.num_shared > 0):
+                return
+            try:
+                fcntl.lockf(self.file, fcntl.LOCK_UN)
+            finally:
+                self.file.close()
+                self.file = None
+                self.condition.notify_all()
+
+
+file_locks      = {}
+file_locks_lock = Lock()
+
+
+@contextmanager
+def file_lock(path, exclusive=False, blocking=True):
+    # POSIX record locks, unlike flock(), are honored over NFS.  They belong to the process rather than to the thread
+    # (unlocking from one thread unlocks for all of them): the threads of a process share one lock per file, held until
+    # the last of them leaves, and an exclusive lock also excludes the process' other threads.
+    # Yields whether the lock was acquired, which can only be False when not blocking.
+    with file_locks_lock:
+        if path not in file_locks:
+            file_locks[path] = FileLock(path)
+        lock = file_locks[path]
+    if not lock.acquire(exclusive, blocking):
+        yield False
+        return
+    try:
+        yield True
+    finally:
+        lock.release(exclusive)
+
+
 def remove_file(path):
     if os.path.exists(path):
         dbg(f"Removing file '{path}'")
@@ -220,37 +326,12 @@ def create_common_files():
         create_dir(cfg.mio_user_dir        )
         create_dir(cfg.user_global_ips_path)
         create_dir(cfg.sim_output_dir      )
-        create_file(cfg.job_history_file_path)
-        create_file(cfg.ip_cache_file_path   )
-        create_file(cfg.fsoc_cache_file_path )
         create_file(cfg.user_file_path       )
         
-        with open(cfg.job_history_file_path, 'r') as yaml_file_read:
-            ymlr = yaml.load(yaml_file_read, Loader=SafeLoader)
-            if not ymlr:
-                ymlr = { "history" : {}}
-                dbg("Initializing job history file at " + cfg.job_history_file_path)
-                with open(cfg.job_history_file_path, 'w') as yaml_file_write:
-                    yaml.dump(ymlr, yaml_file_write)
-            cfg.job_history = ymlr['history']
-        
-        with open(cfg.ip_cache_file_path, 'r') as yaml_file_read:
-            ymlr = yaml.load(yaml_file_read, Loader=SafeLoader)
-            if not ymlr:
-                ymlr = {"ip" : {}}
-                dbg("Initializing IP cache file at " + cfg.ip_cache_file_path)
-                cfg.fresh_ip_cache = True
-                with open(cfg.ip_cache_file_path, 'w') as yaml_file_write:
-                    yaml.dump(ymlr, yaml_file_write)
-        
-        with open(cfg.fsoc_cache_file_path, 'r') as yaml_file_read:
-            ymlr = yaml.load(yaml_file_read, Loader=SafeLoader)
-            if not ymlr:
-                ymlr = {"cores" : {}}
-                dbg("Initializing FuseSoC cache file at " + cfg.fsoc_cache_file_path)
-                cfg.fresh_soc_cache = True
-                with open(cfg.fsoc_cache_file_path, 'w') as yaml_file_write:
-                    yaml.dump(ymlr, yaml_file_write)
+        if not os.path.exists(cfg.ip_cache_db_path):
+            dbg("Initializing IP cache database at " + cfg.ip_cache_db_path)
+            cfg.fresh_ip_cache   = True
+            cfg.fresh_fsoc_cache = True
         
         with open(cfg.user_file_path, 'r') as yaml_file_read:
             ymlr = yaml.load(yaml_file_read, Loader=SafeLoader)
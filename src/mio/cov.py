@@ -11,6 +11,7 @@ from mio import results
 from mio import sim
 from mio import eal
 from mio import cache
+from mio import history
 
 import os
 import yaml
@@ -43,21 +44,17 @@ def gen_cov_report(ip_str, is_regression=False, test_suite="", regression_name="
     merge_string = "-merge_dir " + merge_path + " -merge_db_name " + sim_lib
     now = datetime.now()
     timestamp = now.strftime("%Y/%m/%d-%H:%M:%S")
-    if not sim_lib in cfg.job_history:
+    sim_entries = history.get_entries(sim_lib, 'simulation', simulator='viv')
+    if len(sim_entries) == 0:
         common.fatal(f"No record of simulations for IP '{sim_lib}'")
     else:
-        if not 'simulation' in cfg.job_history[sim_lib]:
-            common.fatal(f"No record of simulations for IP '{sim_lib}'")
-        else:
-            for sim in cfg.job_history[sim_lib]['simulation']:
-                if sim['simulator'] != 'vivado':
-                    continue
-                if sim['type'] != 'end':
-                    continue
-                cov_path = sim['path'] + "/cov"
-                if sim['cov']:
-                    dir_string     = dir_string + " -dir " + cov_path
-                    db_name_string = db_name_string + " -db_name " + sim['test_name'] + "_" + str(sim['seed'])
+        for sim in sim_entries:
+            if sim['type'] != 'end':
+                continue
+            cov_path = sim['path'] + "/cov"
+            if sim['cov']:
+                dir_string     = dir_string + " -dir " + cov_path
+                db_name_string = db_name_string + " -db_name " + sim['test_name'] + "_" + str(sim['seed'])
     wd = cfg.sim_output_dir + "/viv/cov_wd"
     eal.launch_eda_bin(cfg.vivado_home + "/xcrg", [dir_string, db_name_string, merge_string, "-report_format html", f"-report_dir {report_path}"], wd)
     return report_path
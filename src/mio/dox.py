@@ -19,15 +19,16 @@ def gen_doxygen(ip_str):
     ip_name = f"{ip.vendor}/{ip.name}"
     ip_src_path = ip.path + "/" + ip.src_path
     ip_bin_path = ip.path + "/" + ip.scripts_path
-    args  = " PROJECT_NAME='"  + ip.full_name + "'"
-    args += " PROJECT_BRIEF='" + ip.full_name + "'"
-    args += " IP_NAME='" + ip.name + "'"
-    args += " PROJECT_NUMBER='" + ip.name + "'"
-    args += " EXAMPLE_PATH=" + ip.path + "/" + ip.examples_path
-    args += " OUTPUT_PATH="  + ip.path + "/" + ip.docs_path + "/dox_out"
-    args += " SRC_PATH=" + ip_src_path + " MIO_HOME=" + cfg.mio_data_src_dir + " IP_NAME=" + ip_name
-    
-    args += " DOCS_PATH+=" + ip.path + "/" + ip.docs_path
+    env = {}
+    env["PROJECT_NAME"  ] = ip.full_name
+    env["PROJECT_BRIEF" ] = ip.full_name
+    env["PROJECT_NUMBER"] = ip.name
+    env["EXAMPLE_PATH"  ] = ip.path + "/" + ip.examples_path
+    env["OUTPUT_PATH"   ] = ip.path + "/" + ip.docs_path + "/dox_out"
+    env["SRC_PATH"      ] = ip_src_path
+    env["MIO_HOME"      ] = cfg.mio_data_src_dir
+    env["IP_NAME"       ] = ip_name
+    env["DOCS_PATH"     ] = ip.path + "/" + ip.docs_path
     #args += " IMAGE_PATH=" + ip_path + "/" + ip_metadata['structure']['docs-path']
     #args += " INPUT+="     + ip_path + "/" + ip_metadata['structure']['docs-path']
     #for input_dir in ip_metadata['hdl-src']['directories']:
@@ -36,5 +37,5 @@ def gen_doxygen(ip_str):
     #    else:
     #        args += " INPUT+=" + ip_src_path
     common.info(f"Invoking Doxygen on IP '{ip_name}' ({ip_src_path})")
-    eal.launch_eda_bin(args + " doxygen", [cfg.mio_data_src_dir + "/doxygen.private.cfg"], cfg.mio_data_dir)
+    eal.launch_eda_bin("doxygen", [cfg.mio_data_src_dir + "/doxygen.private.cfg"], cfg.mio_data_dir, env=env)
     common.info("Done.  To view documentation: `firefox " + ip.path + "/" + ip.docs_path + "/dox_out/html/index.html &`")
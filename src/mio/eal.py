@@ -7,6 +7,10 @@ from mio import common
 from mio import cache
 from mio import cfg
 from mio import sim
+from mio import history
+from mio import results
+from mio import engine
+from mio import libcache
 from jinja2 import Template
 from fusesoc import main as fsoc
 from tqdm import tqdm
@@ -16,14 +20,27 @@ import pathlib
 import argparse
 import os
 import subprocess
+import signal
+import shlex
+import resource
+import sys
 import re
 import yaml
 import glob
+import hashlib
 from yaml.loader import SafeLoader
-from threading import BoundedSemaphore
+from threading import Lock, Event, Timer
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 eda_processes = []
 bar = None
+shared_state_lock = Lock()
+snapshot_marker_file_name = ".mio_snapshot"
+snapshot_lock_file_name   = ".mio_snapshot.lock"
+# Snapshots linked into a working directory stay locked (shared) until mio exits so that no other regression prunes them
+snapshot_locks            = ExitStack()
+atexit.register(snapshot_locks.close)
 
 vivado_default_compilation_args  = ["--incr", "-sv"]
 metrics_default_compilation_args = ["-suppress MultiBlockWrite:ReadingOutputModport:UndefinedMacro"]
@@ -59,48 +76,45 @@ riviera_default_simulation_args = []
 vivado_cmp_log_error_regexes  = ["ERROR:", "CRITICAL WARNING:"]
 metrics_cmp_log_error_regexes = ["=E:", "=F:"]
 vcs_cmp_log_error_regexes     = ["Error-"]
-xcelium_cmp_log_error_regexes = ["*E "]
+xcelium_cmp_log_error_regexes = ["\*E "]
 questa_cmp_log_error_regexes  = ["\*\* Error:"]
 riviera_cmp_log_error_regexes = ["Error:"]
 
 vivado_cmp_log_warning_regexes  = ["WARNING:"]
 metrics_cmp_log_warning_regexes = ["=W:"]
 vcs_cmp_log_warning_regexes     = ["Warning-"]
-xcelium_cmp_log_warning_regexes = ["*W "]
+xcelium_cmp_log_warning_regexes = ["\*W "]
 questa_cmp_log_warning_regexes  = ["\*\* Warning:"]
 riviera_cmp_log_warning_regexes = ["Warning:"]
 
 vivado_elab_log_error_regexes  = ["ERROR:","Invalid path for DPI library:"]
 metrics_elab_log_error_regexes = ["=E:", "=F:"]
 vcs_elab_log_error_regexes     = ["Error-"]
-xcelium_elab_log_error_regexes = ["*E "]
+xcelium_elab_log_error_regexes = ["\*E "]
 questa_elab_log_error_regexes  = ["\*\* Error:"]
 riviera_elab_log_error_regexes = ["Error:"]
 
 vivado_elab_log_warning_regexes  = ["WARNING:"]
 metrics_elab_log_warning_regexes = ["=W:"]
 vcs_elab_log_warning_regexes     = ["Warning-"]
-xcelium_elab_log_warning_regexes = ["*W "]
+xcelium_elab_log_warning_regexes = ["\*W "]
 questa_elab_log_warning_regexes  = ["\*\* Warning:"]
 riviera_elab_log_warning_regexes = ["Warning:"]
 
 vivado_gen_image_log_error_regexes  = ["ERROR:", "CRITICAL WARNING:"]
 metrics_gen_image_log_error_regexes = ["=E:", "=F:", "error:"]
 vcs_gen_image_log_error_regexes     = ["Error-"]
-xcelium_gen_image_log_error_regexes = ["*E "]
+xcelium_gen_image_log_error_regexes = ["\*E "]
 questa_gen_image_log_error_regexes  = ["\*\* Error:"]
 riviera_gen_image_log_error_regexes = ["Error:"]
 
 vivado_gen_image_log_warning_regexes  = ["WARNING:"]
 metrics_gen_image_log_warning_regexes = ["=W:"]
 vcs_gen_image_log_warning_regexes     = ["Warning-"]
-xcelium_gen_image_log_warning_regexes = ["*W "]
+xcelium_gen_image_log_warning_regexes = ["\*W "]
 questa_gen_image_log_warning_regexes  = ["\*\* Warning:"]
 riviera_gen_image_log_warning_regexes = ["Warning:"]
 
-sem = BoundedSemaphore(1)
-
-
 def compile_fsoc_core(flist_path, core, sim_job):
     defines = sim_job.cmp_args
     timestamp_start = common.timestamp()
@@ -148,6 +162,9 @@ def gen_ip_image(ip, sim_job, fsoc_core_name, fsoc_core_flist_path):
         log_gen_image_history_ip(ip, log_file_path, sim_job, timestamp_start, timestamp_end)
         ip.is_compiled  [sim_job.simulator] = True
         ip.is_elaborated[sim_job.simulator] = True
+        if not sim_job.is_regression:
+            ip.build_manifest[f"{sim_str}.gen_image"] = calc_build_key(ip, sim_job, "gen_image")
+            mark_last_image(ip, sim_job, "gen_image")
     return log_file_path
 
 
@@ -186,10 +203,40 @@ def prep_ip_for_gen_image(ip, sim_job):
 
 
 
+class IpCompilation:
+    """IP Compilation model"""
+    
+    def __init__(self, ip):
+        self.ip              = ip
+        self.log_file_path   = ""
+        self.build_key       = ""
+        self.timestamp_start = ""
+        self.timestamp_end   = ""
+        self.errors          = []
+        self.skipped         = False
+        self.cached          = False
+
+
 def compile_ip(ip, sim_job):
+    compilation = launch_ip_compilation(ip, sim_job)
+    end_ip_compilation(compilation, sim_job)
+    return compilation.log_file_path
+
+
+# Safe to call from worker threads: history, IP model updates and error reporting are left to end_ip_compilation(),
+# which must only be called from the thread scheduling the compilations (ex: the engine job running cmp_dependencies()),
+# one compilation at a time.  Its fatal errors are carried back to the main thread by the engine.
+def launch_ip_compilation(ip, sim_job):
+    compilation = IpCompilation(ip)
     ip_str = f"{ip.vendor}/{ip.name}"
     ip_dir = f"{ip.vendor}__{ip.name}"
     sim_str = common.get_simulator_short_name(sim_job.simulator)
+    if not needs_compilation(ip, sim_job):
+        common.dbg(f"Skipping compilation of IP '{ip_str}': up-to-date")
+        compilation.skipped       = True
+        compilation.log_file_path = cfg.sim_dir + "/cmp/" + ip_dir + "." + sim_str + ".cmp.log"
+        return compilation
+    compilation.build_key = calc_build_key(ip, sim_job, "cmp")
     flist_path = get_ip_flist_path(ip, sim_job)
     deps_list  = get_dep_list(ip, sim_job)
     if sim_job.bwrap:
@@ -225,22 +272,44 @@ def compile_ip(ip, sim_job):
         flist_path = os.path.relpath(flist_path, cfg.project_dir)
     
     flist_env_var_name = 'MIO_' + ip.name.upper() + '_SRC_PATH'
-    os.environ[flist_env_var_name] = path
-    sim_job.bwrap_flists[flist_env_var_name] = path
-    timestamp_start = common.timestamp()
-    log_file_path = compile_flist(ip.vendor, ip.name, flist_path, deps_list, sim_job, ip.is_local)
+    with shared_state_lock:
+        os.environ[flist_env_var_name] = path
+        sim_job.bwrap_flists[flist_env_var_name] = path
+    use_library_cache = libcache.is_enabled(ip, sim_job)
+    if use_library_cache:
+        log_file_path = cfg.sim_dir + "/cmp/" + ip_dir + "." + sim_str + ".cmp.log"
+        if libcache.fetch(ip, sim_job, compilation.build_key, log_file_path):
+            compilation.cached        = True
+            compilation.log_file_path = log_file_path
+            return compilation
+    compilation.timestamp_start = common.timestamp()
+    compilation.log_file_path = compile_flist(ip.vendor, ip.name, flist_path, deps_list, sim_job, ip.is_local)
     if not sim_job.dry_run:
-        timestamp_end = common.timestamp()
-        errors = scan_cmp_log_file_for_errors(log_file_path, sim_job)
-        if len(errors):
-            common.error("Errors during compilation of IP '" + ip_str + "':")
-            for error in errors:
-                common.error("  " + error)
-            sim.kill_progress_bar()
-            common.fatal("Stopping due to compilation errors. Full log: " + log_file_path)
-        log_cmp_history_ip(ip, log_file_path, sim_job, timestamp_start, timestamp_end)
-        ip.is_compiled[sim_job.simulator] = True
-    return log_file_path
+        compilation.timestamp_end = common.timestamp()
+        compilation.errors = scan_cmp_log_file_for_errors(compilation.log_file_path, sim_job)
+        if use_library_cache and (len(compilation.errors) == 0):
+            libcache.publish(ip, sim_job, compilation.build_key, compilation.log_file_path)
+    return compilation
+
+
+def end_ip_compilation(compilation, sim_job):
+    ip = compilation.ip
+    ip_str = f"{ip.vendor}/{ip.name}"
+    sim_str = common.get_simulator_short_name(sim_job.simulator)
+    if compilation.skipped or sim_job.dry_run:
+        return
+    if len(compilation.errors):
+        common.error("Errors during compilation of IP '" + ip_str + "':")
+        for error in compilation.errors:
+            common.error("  " + error)
+        sim.kill_progress_bar()
+        common.fatal("Stopping due to compilation errors. Full log: " + compilation.log_file_path)
+    if compilation.cached:
+        common.dbg(f"Compiled library of IP '{ip_str}' fetched from the library cache")
+    else:
+        log_cmp_history_ip(ip, compilation.log_file_path, sim_job, compilation.timestamp_start, compilation.timestamp_end)
+    ip.is_compiled[sim_job.simulator] = True
+    ip.build_manifest[f"{sim_str}.cmp"] = compilation.build_key
 
 
 def compile_vivado_project(ip, sim_job):
@@ -252,8 +321,8 @@ def compile_vivado_project(ip, sim_job):
     log_file_paths = do_compile_vivado_project(ip, dep_list, sim_job)
     if not sim_job.dry_run:
         timestamp_end = common.timestamp()
-        errors = scan_cmp_log_file_for_errors(log_file_paths[0], sim_job)
-        errors.append(scan_cmp_log_file_for_errors(log_file_paths[1], sim_job))
+        errors  = scan_cmp_log_file_for_errors(log_file_paths[0], sim_job)
+        errors += scan_cmp_log_file_for_errors(log_file_paths[1], sim_job)
         if len(errors):
             common.error("Errors during compilation of Vivado Project IP '" + ip_str + "':")
             for error in errors:
@@ -262,6 +331,7 @@ def compile_vivado_project(ip, sim_job):
             common.fatal("Stopping due to compilation errors. Logs: " + log_file_paths[0] + " & " + log_file_paths[0])
         log_cmp_history_vivado_project(ip, log_file_paths[0], log_file_paths[1], sim_job, timestamp_start, timestamp_end)
         ip.is_compiled[sim_job.simulator] = True
+        ip.build_manifest[f"{sim_str}.cmp"] = calc_build_key(ip, sim_job, "cmp")
     return log_file_paths
 
 
@@ -279,8 +349,23 @@ def elaborate(ip, sim_job):
         ip_dir_name = f"{ip.vendor}__{ip.name}"
         elab_out = cfg.sim_output_dir + "/" + sim_str + "/sim_wd"
     common.create_dir(elab_out)
+    elab_wd = elab_out
+    if can_use_snapshots(ip, sim_job):
+        snapshot_path = get_snapshot_path(ip, sim_job)
+        if is_snapshot_complete(snapshot_path) and lock_snapshot(snapshot_path) and is_snapshot_complete(snapshot_path):
+            common.info(f"Reusing elaboration snapshot of IP '{ip_str}' ({os.path.basename(snapshot_path)})")
+            link_snapshot(snapshot_path, elab_out)
+            mark_snapshot(snapshot_path)
+            set_elaborated(ip, sim_job)
+            return elab_out
+        if sim_job.is_regression:
+            # Elaborate into the snapshot itself: simulators embed the elaboration path in their output (ex: -sv_root)
+            common.remove_dir(snapshot_path)
+            os.makedirs(snapshot_path)
+            lock_snapshot(snapshot_path)
+            elab_wd = snapshot_path
     timestamp_start = common.timestamp()
-    log_file_path = do_elaborate(ip, sim_job, elab_out)
+    log_file_path = do_elaborate(ip, sim_job, elab_wd)
     if not sim_job.dry_run:
         timestamp_end = common.timestamp()
         errors = scan_elab_log_file_for_errors(log_file_path, sim_job)
@@ -291,16 +376,103 @@ def elaborate(ip, sim_job):
             sim.kill_progress_bar()
             common.fatal("Stopping due to elaboration errors. Full log: " + log_file_path)
         log_elab_history(ip, log_file_path, sim_job, timestamp_start, timestamp_end)
-        ip.is_elaborated[sim_job.simulator] = True
+        if elab_wd != elab_out:
+            link_snapshot(elab_wd, elab_out)
+            mark_snapshot(elab_wd)
+            prune_snapshots(ip, sim_job)
+        set_elaborated(ip, sim_job)
     return elab_out
 
 
+def set_elaborated(ip, sim_job):
+    sim_str = common.get_simulator_short_name(sim_job.simulator)
+    ip.is_elaborated[sim_job.simulator] = True
+    if not sim_job.is_regression:
+        ip.build_manifest[f"{sim_str}.elab"] = calc_build_key(ip, sim_job, "elab")
+        mark_last_image(ip, sim_job, "elab")
+
+
+def can_use_snapshots(ip, sim_job):
+    if (cfg.elaboration_snapshots == 0) or sim_job.dry_run or sim_job.bwrap:
+        return False
+    if sim_job.simulator == common.simulators_enum.METRICS:
+        # Metrics images are elaborated in the cloud
+        return False
+    if ip.has_dut and (ip.dut_ip_type == "fsoc"):
+        return False
+    return True
+
+
+def get_snapshot_path(ip, sim_job):
+    # Snapshots are elaborated by regressions and keyed by their inputs, the same key as single simulation builds
+    sim_str = common.get_simulator_short_name(sim_job.simulator)
+    snapshots_path = cfg.sim_output_dir + "/" + sim_str + "/elab_out/regressions/" + f"{ip.vendor}__{ip.name}"
+    return snapshots_path + "/" + calc_build_key(ip, sim_job, "elab")
+
+
+def is_snapshot_complete(snapshot_path):
+    return os.path.exists(snapshot_path + "/" + snapshot_marker_file_name)
+
+
+def lock_snapshot(snapshot_path):
+    # The lock file lives in the snapshot: once a snapshot has been pruned, locking it fails or leaves it incomplete
+    try:
+        snapshot_locks.enter_context(common.file_lock(snapshot_path + "/" + snapshot_lock_file_name))
+    except OSError as e:
+        common.dbg(f"Could not lock elaboration snapshot '{snapshot_path}': {e}")
+        return False
+    return True
+
+
+def mark_snapshot(snapshot_path):
+    # The marker is written once the snapshot is complete and touched each time it is reused
+    with open(snapshot_path + "/" + snapshot_marker_file_name, 'w') as marker_file:
+        marker_file.write(common.timestamp() + "\n")
+
+
+def link_snapshot(snapshot_path, wd):
+    # Mirror the snapshot into the working directory with one symbolic link per file; directories are created so that
+    # the simulation outputs do not end up in the snapshot
+    for dir_path, dir_names, file_names in os.walk(snapshot_path):
+        dest_dir_path = os.path.normpath(os.path.join(wd, os.path.relpath(dir_path, snapshot_path)))
+        os.makedirs(dest_dir_path, exist_ok=True)
+        links = [name for name in file_names if name not in [snapshot_marker_file_name, snapshot_lock_file_name]]
+        links += [name for name in dir_names if os.path.islink(os.path.join(dir_path, name))]
+        for name in links:
+            dest_path = os.path.join(dest_dir_path, name)
+            if os.path.lexists(dest_path):
+                if os.path.isdir(dest_path) and not os.path.islink(dest_path):
+                    common.remove_dir(dest_path)
+                else:
+                    os.remove(dest_path)
+            os.symlink(os.path.join(dir_path, name), dest_path)
+
+
+def prune_snapshots(ip, sim_job):
+    # Keep the most recently used snapshots; incomplete ones may still be elaborating and those in use by a simulation
+    # or regression (locked) are left alone
+    snapshots_path = os.path.dirname(get_snapshot_path(ip, sim_job))
+    snapshots = []
+    for name in os.listdir(snapshots_path):
+        marker_path = snapshots_path + "/" + name + "/" + snapshot_marker_file_name
+        if os.path.exists(marker_path):
+            snapshots.append((os.path.getmtime(marker_path), name))
+    snapshots.sort(reverse=True)
+    for mtime, name in snapshots[cfg.elaboration_snapshots:]:
+        snapshot_path = snapshots_path + "/" + name
+        with common.file_lock(snapshot_path + "/" + snapshot_lock_file_name, exclusive=True, blocking=False) as locked:
+            if not locked:
+                common.dbg(f"Not pruning elaboration snapshot '{name}': in use")
+                continue
+            common.dbg(f"Pruning elaboration snapshot '{name}'")
+            common.remove_dir(snapshot_path)
+
+
 def simulate(ip, sim_job):
     ip_str = f"{ip.vendor}/{ip.name}"
     ip_dir_name = f"{ip.vendor}__{ip.name}"
     sim_args = sim_job.sim_args
     sim_str = common.get_simulator_short_name(sim_job.simulator)
-    global sem
     start = common.timestamp()
     log_sim_start_history(ip, sim_job, start)
     if sim_job.is_regression:
@@ -309,11 +481,115 @@ def simulate(ip, sim_job):
     else:
         ip_dir_name = f"{ip.vendor}__{ip.name}"
         sim_out = cfg.sim_output_dir + "/" + sim_str + "/sim_wd"
-    do_simulate(ip, sim_job, sim_out)
+    try:
+        do_simulate(ip, sim_job, sim_out)
+    except subprocess.TimeoutExpired as e:
+        sim_job.timed_out = True
+        common.warning(f"Killed test '{sim_job.test}' (seed {sim_job.seed}) after exceeding its {e.timeout} second(s) limit")
     if not sim_job.dry_run:
-        sem.acquire()
-        log_sim_end_history(ip, sim_job, start, common.timestamp())
-        sem.release()
+        end = common.timestamp()
+        results.write_sim_summary(sim_job, start, end)
+        log_sim_end_history(ip, sim_job, start, end)
+
+
+def needs_compilation(ip, sim_job):
+    sim_str = common.get_simulator_short_name(sim_job.simulator)
+    cmp_out = cfg.sim_output_dir + "/" + sim_str + "/cmp_out/" + f"{ip.vendor}__{ip.name}"
+    return not is_up_to_date(ip, sim_job, "cmp", cmp_out)
+
+
+def needs_elaboration(ip, sim_job):
+    if sim_job.is_regression:
+        return True
+    sim_str = common.get_simulator_short_name(sim_job.simulator)
+    if sim_job.simulator == common.simulators_enum.VIVADO:
+        elab_out = cfg.sim_output_dir + "/" + sim_str + "/sim_wd/xsim.dir/" + ip.name
+    else:
+        if not is_last_image(ip, sim_job, "elab"):
+            return True
+        elab_out = get_image_marker_path(sim_job)
+    return not is_up_to_date(ip, sim_job, "elab", elab_out)
+
+
+def needs_gen_image(ip, sim_job):
+    if sim_job.is_regression or (not is_last_image(ip, sim_job, "gen_image")):
+        return True
+    return not is_up_to_date(ip, sim_job, "gen_image", get_image_marker_path(sim_job))
+
+
+def get_image_marker_path(sim_job):
+    sim_str = common.get_simulator_short_name(sim_job.simulator)
+    return cfg.sim_output_dir + "/" + sim_str + "/sim_wd/.mio_last_image"
+
+
+def is_last_image(ip, sim_job, step):
+    marker_path = get_image_marker_path(sim_job)
+    if not os.path.exists(marker_path):
+        return False
+    with open(marker_path, 'r') as marker_file:
+        return marker_file.read().strip() == f"{ip.vendor}__{ip.name}.{step}"
+
+
+def mark_last_image(ip, sim_job, step):
+    marker_path = get_image_marker_path(sim_job)
+    os.makedirs(os.path.dirname(marker_path), exist_ok=True)
+    with open(marker_path, 'w') as marker_file:
+        marker_file.write(f"{ip.vendor}__{ip.name}.{step}\n")
+
+
+def is_up_to_date(ip, sim_job, step, output_path=""):
+    sim_str = common.get_simulator_short_name(sim_job.simulator)
+    if sim_job.dry_run or sim_job.bwrap:
+        return False
+    if ip.has_dut and (ip.dut_ip_type == "fsoc") and (step != "cmp"):
+        return False
+    manifest_key = f"{sim_str}.{step}"
+    if manifest_key not in ip.build_manifest:
+        return False
+    if (output_path != "") and (sim_job.simulator != common.simulators_enum.METRICS):
+        if not os.path.exists(output_path):
+            return False
+    return ip.build_manifest[manifest_key] == calc_build_key(ip, sim_job, step)
+
+
+def calc_build_key(ip, sim_job, step):
+    sim_str = common.get_simulator_short_name(sim_job.simulator)
+    inputs = [step, sim_str, ip.get_code_hash(), ip.ip_yml_hash, cfg.uvm_version, cfg.sim_timescale]
+    for define in sorted(sim_job.cmp_args):
+        inputs.append(f"+define+{define}={sim_job.cmp_args[define]}")
+    inputs += get_default_args(sim_job, step)
+    deps = get_dep_list(ip, sim_job)
+    if step == "cmp":
+        inputs += convert_compilation_args(sim_job)
+        for dep in deps:
+            inputs.append(dep.build_manifest.get(f"{sim_str}.cmp", ""))
+    elif step == "elab":
+        inputs += convert_elaboration_args(sim_job)
+        inputs.append(ip.build_manifest.get(f"{sim_str}.cmp", ""))
+        for dep in deps:
+            inputs.append(dep.build_manifest.get(f"{sim_str}.cmp", ""))
+    elif step == "gen_image":
+        inputs += convert_elaboration_args(sim_job)
+        for dep in deps:
+            inputs.append(dep.get_code_hash())
+    if step != "cmp":
+        so_libs = get_all_so_libs(ip, sim_job)
+        for so_lib in sorted(so_libs):
+            if os.path.exists(so_libs[so_lib]):
+                inputs.append(f"{so_lib}={common.calc_file_hash(so_libs[so_lib])}")
+    return hashlib.md5("\n".join(inputs).encode()).hexdigest()
+
+
+def get_default_args(sim_job, step):
+    default_args = {
+        common.simulators_enum.VIVADO : [vivado_default_compilation_args , vivado_default_elaboration_args , vivado_default_gen_image_args ],
+        common.simulators_enum.METRICS: [metrics_default_compilation_args, metrics_default_elaboration_args, metrics_default_gen_image_args],
+        common.simulators_enum.VCS    : [vcs_default_compilation_args    , vcs_default_elaboration_args    , vcs_default_gen_image_args    ],
+        common.simulators_enum.XCELIUM: [xcelium_default_compilation_args, xcelium_default_elaboration_args, xcelium_default_gen_image_args],
+        common.simulators_enum.QUESTA : [questa_default_compilation_args , questa_default_elaboration_args , questa_default_gen_image_args ],
+        common.simulators_enum.RIVIERA: [riviera_default_compilation_args, riviera_default_elaboration_args, riviera_default_gen_image_args]
+    }
+    return default_args[sim_job.simulator][["cmp", "elab", "gen_image"].index(step)]
 
 
 def init_metrics_workspace():
@@ -363,7 +639,7 @@ def gen_image_flist(ip, vendor, name, flist_path, sim_job, local):
         arg_list.append(f"-s {ip_dir_name}")
         arg_list.append("--log "  + compilation_log_path)
         write_cmd_to_disk(sim_job, "xelab", arg_list, compilation_command_file)
-        sim_job.bwrap_commands += launch_eda_bin(cfg.vivado_home + "/xelab", arg_list, wd=cmp_out, output=cfg.dbg, dry_run=sim_job.dry_run)
+        sim_job.bwrap_commands += launch_eda_bin(cfg.vivado_home + "/xelab", arg_list, wd=cmp_out, output=cfg.dbg, dry_run=sim_job.dry_run, log_scanner=get_live_log_scanner(sim_job, "gen-image"))
         
     elif sim_job.simulator == common.simulators_enum.VCS:
         arg_list += vcs_default_gen_image_args
@@ -373,7 +649,7 @@ def gen_image_flist(ip, vendor, name, flist_path, sim_job, local):
         arg_list += deps_list
         arg_list.append("-l "  + compilation_log_path)
         write_cmd_to_disk(sim_job, "vcs", arg_list, compilation_command_file)
-        sim_job.bwrap_commands += launch_eda_bin(cfg.vcs_home + "/vcs", arg_list, wd=cmp_out, output=cfg.dbg, dry_run=sim_job.dry_run)
+        sim_job.bwrap_commands += launch_eda_bin(cfg.vcs_home + "/vcs", arg_list, wd=cmp_out, output=cfg.dbg, dry_run=sim_job.dry_run, log_scanner=get_live_log_scanner(sim_job, "gen-image"))
         
     elif sim_job.simulator == common.simulators_enum.METRICS:
         arg_list += metrics_default_gen_image_args
@@ -404,7 +680,7 @@ def gen_image_flist(ip, vendor, name, flist_path, sim_job, local):
         else:
             arg_list = [f"dsim -a '{arg_list_str}'"]
         write_cmd_to_disk(sim_job, "mdc", arg_list, compilation_command_file)
-        sim_job.bwrap_commands += launch_eda_bin(cfg.metrics_home + "/mdc", arg_list, wd=cfg.project_dir, output=cfg.dbg, dry_run=sim_job.dry_run)
+        sim_job.bwrap_commands += launch_eda_bin(cfg.metrics_home + "/mdc", arg_list, wd=cfg.project_dir, output=cfg.dbg, dry_run=sim_job.dry_run, log_scanner=get_live_log_scanner(sim_job, "gen-image"))
         launch_eda_bin(cfg.metrics_home + "/mdc", ["download", mtr_compilation_log_path], wd=cfg.project_dir, output=cfg.dbg, dry_run=sim_job.dry_run)
         if not sim_job.dry_run:
             common.move_file(f"{cfg.project_dir}/_downloaded_{mtr_compilation_log_path}", compilation_log_path)
@@ -415,7 +691,7 @@ def gen_image_flist(ip, vendor, name, flist_path, sim_job, local):
         arg_list.append("-f " + flist_path)
         # TODO Add compilation output argument for nc
         write_cmd_to_disk(sim_job, "xrun", arg_list, compilation_command_file)
-        sim_job.bwrap_commands += launch_eda_bin(cfg.nc_home + "/xrun", arg_list, wd=cmp_out, output=cfg.dbg, dry_run=sim_job.dry_run)
+        sim_job.bwrap_commands += launch_eda_bin(cfg.nc_home + "/xrun", arg_list, wd=cmp_out, output=cfg.dbg, dry_run=sim_job.dry_run, log_scanner=get_live_log_scanner(sim_job, "gen-image"))
         
     elif sim_job.simulator == common.simulators_enum.QUESTA:
         os.environ['MIO_UVM_HOME'] = f"$MIO_QUESTA_HOME/../verilog_src/uvm-{cfg.uvm_version}"
@@ -428,7 +704,7 @@ def gen_image_flist(ip, vendor, name, flist_path, sim_job, local):
         arg_list.append("-l "  + compilation_log_path)
         arg_list.append(f"-work {name}")
         write_cmd_to_disk(sim_job, "vlog", arg_list, compilation_command_file)
-        sim_job.bwrap_commands += launch_eda_bin(cfg.questa_home + "/vlog", arg_list, wd=cmp_out, output=cfg.dbg)
+        sim_job.bwrap_commands += launch_eda_bin(cfg.questa_home + "/vlog", arg_list, wd=cmp_out, output=cfg.dbg, log_scanner=get_live_log_scanner(sim_job, "gen-image"))
         
     elif sim_job.simulator == common.simulators_enum.RIVIERA:
         arg_list += riviera_default_gen_image_args
@@ -436,7 +712,7 @@ def gen_image_flist(ip, vendor, name, flist_path, sim_job, local):
         arg_list.append("-f " + flist_path)
         # TODO Add compilation output argument for riviera
         write_cmd_to_disk(sim_job, "vlog", arg_list, compilation_command_file)
-        sim_job.bwrap_commands += launch_eda_bin(cfg.riviera_home + "/vlog", arg_list, wd=cmp_out, output=cfg.dbg, dry_run=sim_job.dry_run)
+        sim_job.bwrap_commands += launch_eda_bin(cfg.riviera_home + "/vlog", arg_list, wd=cmp_out, output=cfg.dbg, dry_run=sim_job.dry_run, log_scanner=get_live_log_scanner(sim_job, "gen-image"))
     
     return compilation_log_path
 
@@ -458,6 +734,7 @@ def compile_flist(vendor, name, flist_path, deps, sim_job, local, licensed=True)
     ip_dir_name = f"{vendor}__{name}"
     cmp_out_dir = cfg.sim_output_dir + "/" + sim_str + "/cmp_out/"
     cmp_out = cmp_out_dir + ip_dir_name
+    cmp_wd  = cfg.sim_output_dir + "/" + sim_str + "/cmp_wd/" + ip_dir_name
     sim_out = cfg.sim_output_dir + "/" + sim_str + "/sim_wd"
     
     if sim_job.simulator != common.simulators_enum.METRICS:
@@ -466,6 +743,7 @@ def compile_flist(vendor, name, flist_path, deps, sim_job, local, licensed=True)
     
     compilation_log_path = cfg.sim_dir + "/cmp/" + ip_dir_name + "." + sim_str + ".cmp.log"
     compilation_command_file = f"{ip_dir_name}.{sim_str}.cmp.cmd.txt"
+    commands = []
     
     if sim_job.simulator == common.simulators_enum.VIVADO:
         arg_list += vivado_default_compilation_args
@@ -479,7 +757,8 @@ def compile_flist(vendor, name, flist_path, deps, sim_job, local, licensed=True)
         arg_list.append(f"--work {name}={cmp_out}")
         arg_list.append("--log "  + compilation_log_path)
         write_cmd_to_disk(sim_job, "xvlog", arg_list, compilation_command_file)
-        sim_job.bwrap_commands += launch_eda_bin(cfg.vivado_home + "/xvlog", arg_list, wd=sim_out, output=cfg.dbg, dry_run=sim_job.dry_run)
+        common.create_dir(cmp_wd)
+        commands = launch_eda_bin(cfg.vivado_home + "/xvlog", arg_list, wd=cmp_wd, output=cfg.dbg, dry_run=sim_job.dry_run, log_scanner=get_live_log_scanner(sim_job, "cmp"))
         
     elif sim_job.simulator == common.simulators_enum.VCS:
         arg_list += vcs_default_compilation_args
@@ -489,7 +768,7 @@ def compile_flist(vendor, name, flist_path, deps, sim_job, local, licensed=True)
         arg_list += deps_list
         arg_list.append("-l "  + compilation_log_path)
         write_cmd_to_disk(sim_job, "vcs", arg_list, compilation_command_file)
-        sim_job.bwrap_commands += launch_eda_bin(cfg.vcs_home + "/vcs", arg_list, wd=sim_out, output=cfg.dbg, dry_run=sim_job.dry_run)
+        commands = launch_eda_bin(cfg.vcs_home + "/vcs", arg_list, wd=sim_out, output=cfg.dbg, dry_run=sim_job.dry_run, log_scanner=get_live_log_scanner(sim_job, "cmp"))
         
     elif sim_job.simulator == common.simulators_enum.METRICS:
         arg_list += metrics_default_compilation_args
@@ -515,7 +794,7 @@ def compile_flist(vendor, name, flist_path, deps, sim_job, local, licensed=True)
             arg_list = [f"dvlcom -a '{arg_list_str}'"]
         #launch_eda_bin(cfg.metrics_home + "/mdc", ["initialize"], wd=cfg.project_dir, output=True) # TODO Add project.yml and store this in there
         write_cmd_to_disk(sim_job, "mdc", arg_list, compilation_command_file)
-        sim_job.bwrap_commands += launch_eda_bin(cfg.metrics_home + "/mdc", arg_list, wd=cfg.project_dir, output=cfg.dbg, dry_run=sim_job.dry_run)
+        commands = launch_eda_bin(cfg.metrics_home + "/mdc", arg_list, wd=cfg.project_dir, output=cfg.dbg, dry_run=sim_job.dry_run, log_scanner=get_live_log_scanner(sim_job, "cmp"))
         launch_eda_bin(cfg.metrics_home + "/mdc", ["download", mtr_compilation_log_path], wd=cfg.project_dir, output=cfg.dbg, dry_run=sim_job.dry_run)
         if not sim_job.dry_run:
             common.move_file(f"{cfg.project_dir}/_downloaded_{mtr_compilation_log_path}", compilation_log_path)
@@ -526,10 +805,11 @@ def compile_flist(vendor, name, flist_path, deps, sim_job, local, licensed=True)
         arg_list.append("-f " + flist_path)
         # TODO Add compilation output argument for nc
         write_cmd_to_disk(sim_job, "xrun", arg_list, compilation_command_file)
-        sim_job.bwrap_commands += launch_eda_bin(cfg.nc_home + "/xrun", arg_list, wd=sim_out, output=cfg.dbg, dry_run=sim_job.dry_run)
+        commands = launch_eda_bin(cfg.nc_home + "/xrun", arg_list, wd=sim_out, output=cfg.dbg, dry_run=sim_job.dry_run, log_scanner=get_live_log_scanner(sim_job, "cmp"))
         
     elif sim_job.simulator == common.simulators_enum.QUESTA:
-        os.environ['MIO_UVM_HOME'] = f"$MIO_QUESTA_HOME/../verilog_src/uvm-{cfg.uvm_version}"
+        with shared_state_lock:
+            os.environ['MIO_UVM_HOME'] = f"$MIO_QUESTA_HOME/../verilog_src/uvm-{cfg.uvm_version}"
         arg_list += questa_default_compilation_args
         arg_list.append(license_macros_file_path);
         arg_list.append("-f " + flist_path)
@@ -539,7 +819,7 @@ def compile_flist(vendor, name, flist_path, deps, sim_job, local, licensed=True)
         arg_list.append("-l "  + compilation_log_path)
         arg_list.append(f"-work {name}")
         write_cmd_to_disk(sim_job, "vlog", arg_list, compilation_command_file)
-        sim_job.bwrap_commands += launch_eda_bin(cfg.questa_home + "/vlog", arg_list, wd=sim_out, output=cfg.dbg)
+        commands = launch_eda_bin(cfg.questa_home + "/vlog", arg_list, wd=sim_out, output=cfg.dbg, log_scanner=get_live_log_scanner(sim_job, "cmp"))
         
     elif sim_job.simulator == common.simulators_enum.RIVIERA:
         arg_list += riviera_default_compilation_args
@@ -547,8 +827,10 @@ def compile_flist(vendor, name, flist_path, deps, sim_job, local, licensed=True)
         arg_list.append("-f " + flist_path)
         # TODO Add compilation output argument for riviera
         write_cmd_to_disk(sim_job, "vlog", arg_list, compilation_command_file)
-        sim_job.bwrap_commands += launch_eda_bin(cfg.riviera_home + "/vlog", arg_list, wd=sim_out, output=cfg.dbg, dry_run=sim_job.dry_run)
+        commands = launch_eda_bin(cfg.riviera_home + "/vlog", arg_list, wd=sim_out, output=cfg.dbg, dry_run=sim_job.dry_run, log_scanner=get_live_log_scanner(sim_job, "cmp"))
     
+    with shared_state_lock:
+        sim_job.bwrap_commands += commands
     return compilation_log_path
 
 
@@ -578,10 +860,10 @@ def do_compile_vivado_project(ip, deps, sim_job, local):
         vhdl_arg_list.append("--log " + vhdl_compilation_log_path)
         compilation_command_file = f"{ip_dir_name}.{sim_str}.cmp.xvlog.cmd.txt"
         write_cmd_to_disk(sim_job, "xvlog", arg_list, compilation_command_file)
-        sim_job.bwrap_commands += launch_eda_bin(cfg.vivado_home + "/xvlog", vlog_arg_list, wd=sim_out, dry_run=sim_job.dry_run)
+        sim_job.bwrap_commands += launch_eda_bin(cfg.vivado_home + "/xvlog", vlog_arg_list, wd=sim_out, dry_run=sim_job.dry_run, log_scanner=get_live_log_scanner(sim_job, "cmp"))
         compilation_command_file = f"{ip_dir_name}.{sim_str}.cmp.xvhdl.cmd.txt"
         write_cmd_to_disk(sim_job, "xvhdl", arg_list, compilation_command_file)
-        sim_job.bwrap_commands += launch_eda_bin(cfg.vivado_home + "/xvhdl", vhdl_arg_list, wd=sim_out, dry_run=sim_job.dry_run)
+        sim_job.bwrap_commands += launch_eda_bin(cfg.vivado_home + "/xvhdl", vhdl_arg_list, wd=sim_out, dry_run=sim_job.dry_run, log_scanner=get_live_log_scanner(sim_job, "cmp"))
     else:
         common.fatal("Vivado Project IP are not yet compatible with simulator '" + sim_str + "'.")
     
@@ -628,7 +910,7 @@ def do_elaborate(ip, sim_job, wd):
             arg_list.append(f"-sv_lib {so_lib}")
         
         write_cmd_to_disk(sim_job, "xelab", arg_list, elaboration_command_file)
-        sim_job.bwrap_commands += launch_eda_bin(cfg.vivado_home + "/xelab", arg_list, wd, output=cfg.dbg, dry_run=sim_job.dry_run)
+        sim_job.bwrap_commands += launch_eda_bin(cfg.vivado_home + "/xelab", arg_list, wd, output=cfg.dbg, dry_run=sim_job.dry_run, log_scanner=get_live_log_scanner(sim_job, "elab"))
         
     elif sim_job.simulator == common.simulators_enum.VCS:
         arg_list += vcs_default_elaboration_args
@@ -636,7 +918,7 @@ def do_elaborate(ip, sim_job, wd):
             arg_list += dut_elab_to_arg_list(ip, sim_job)
         # TODO Add elaboration output argument for vcs
         write_cmd_to_disk(sim_job, "vcs", arg_list, elaboration_command_file)
-        sim_job.bwrap_commands += launch_eda_bin(cfg.vcs_home + "/vcs", arg_list, wd, output=cfg.dbg, dry_run=sim_job.dry_run)
+        sim_job.bwrap_commands += launch_eda_bin(cfg.vcs_home + "/vcs", arg_list, wd, output=cfg.dbg, dry_run=sim_job.dry_run, log_scanner=get_live_log_scanner(sim_job, "elab"))
         
     elif sim_job.simulator == common.simulators_enum.METRICS:
         arg_list += metrics_default_elaboration_args
@@ -676,7 +958,7 @@ def do_elaborate(ip, sim_job, wd):
         else:
             arg_list = [f"dsim -a '{arg_list_str}'"]
         write_cmd_to_disk(sim_job, "mdc", arg_list, elaboration_command_file)
-        sim_job.bwrap_commands += launch_eda_bin(cfg.metrics_home + "/mdc", arg_list, wd=cfg.project_dir, output=cfg.dbg, dry_run=sim_job.dry_run)
+        sim_job.bwrap_commands += launch_eda_bin(cfg.metrics_home + "/mdc", arg_list, wd=cfg.project_dir, output=cfg.dbg, dry_run=sim_job.dry_run, log_scanner=get_live_log_scanner(sim_job, "elab"))
         sim_job.bwrap_commands += launch_eda_bin(cfg.metrics_home + "/mdc", ["download", mtr_elaboration_log_path], wd=cfg.project_dir, output=cfg.dbg, dry_run=sim_job.dry_run)
         if not sim_job.dry_run:
             common.move_file(f"{cfg.project_dir}/_downloaded_{mtr_elaboration_log_path}", elaboration_log_path)
@@ -687,7 +969,7 @@ def do_elaborate(ip, sim_job, wd):
             arg_list += dut_elab_to_arg_list(ip, sim_job)
         # TODO Add elaboration output argument for nc
         write_cmd_to_disk(sim_job, "xrun", arg_list, elaboration_command_file)
-        sim_job.bwrap_commands += launch_eda_bin(cfg.nc_home + "/xrun", arg_list, wd, output=cfg.dbg, dry_run=sim_job.dry_run)
+        sim_job.bwrap_commands += launch_eda_bin(cfg.nc_home + "/xrun", arg_list, wd, output=cfg.dbg, dry_run=sim_job.dry_run, log_scanner=get_live_log_scanner(sim_job, "elab"))
         
     elif sim_job.simulator == common.simulators_enum.QUESTA:
         for construct in ip.hdl_src_top_constructs:
@@ -707,7 +989,7 @@ def do_elaborate(ip, sim_job, wd):
         arg_list.append(f"-l {elaboration_log_path}")
         arg_list.append(f"-Ldir {cmp_out_dir}")
         write_cmd_to_disk(sim_job, "vopt", arg_list, elaboration_command_file)
-        sim_job.bwrap_commands += launch_eda_bin(cfg.questa_home + "/vopt", arg_list, wd, output=cfg.dbg, dry_run=sim_job.dry_run)
+        sim_job.bwrap_commands += launch_eda_bin(cfg.questa_home + "/vopt", arg_list, wd, output=cfg.dbg, dry_run=sim_job.dry_run, log_scanner=get_live_log_scanner(sim_job, "elab"))
         
     elif sim_job.simulator == common.simulators_enum.RIVIERA:
         arg_list += riviera_default_elaboration_args
@@ -715,7 +997,7 @@ def do_elaborate(ip, sim_job, wd):
             arg_list += dut_elab_to_arg_list(ip, sim_job)
         # TODO Add elaboration output argument for riviera
         write_cmd_to_disk(sim_job, "vlog", arg_list, elaboration_command_file)
-        sim_job.bwrap_commands += launch_eda_bin(cfg.riviera_home + "/vlog", arg_list, wd, output=cfg.dbg, dry_run=sim_job.dry_run)
+        sim_job.bwrap_commands += launch_eda_bin(cfg.riviera_home + "/vlog", arg_list, wd, output=cfg.dbg, dry_run=sim_job.dry_run, log_scanner=get_live_log_scanner(sim_job, "elab"))
     
     return elaboration_log_path
 
@@ -724,8 +1006,6 @@ def do_simulate(ip, sim_job, wd):
     sim_str = common.get_simulator_short_name(sim_job.simulator)
     ip_str = f"{ip.vendor}/{ip.name}"
     ip_dir_name = f"{ip.vendor}__{ip.name}"
-    global sem
-    sem.acquire()
     plus_args = sim_job.sim_args
     if (len(plus_args) > 0):
         args_present = True
@@ -736,11 +1016,15 @@ def do_simulate(ip, sim_job, wd):
     test_result_dir_template = Template(cfg.test_results_path_template)
     test = sim_job.test
     test_name = test_template.render(name=test)
-    simulation_command_file = f"{ip_dir_name}.{sim_str}.sim.cmd.txt"
     test_result_dir = test_result_dir_template.render(ip_vendor=ip.vendor, ip_name=ip.name, test_name=test, seed=sim_job.seed, args=plus_args_list_to_str_list(plus_args), args_present=args_present)
+    if sim_job.is_regression:
+        # Regression tests run concurrently and must not share a command file
+        simulation_command_file = f"{ip_dir_name}.{test_result_dir}.{sim_str}.sim.cmd.txt"
+    else:
+        simulation_command_file = f"{ip_dir_name}.{sim_str}.sim.cmd.txt"
     plus_args["UVM_TESTNAME"] = test_name
     
-    plus_args["__MIO_TOKEN"] = user.login()
+    plus_args["__MIO_TOKEN"] = user.get_session_token()
     
     if sim_job.is_regression:
         common.create_dir   (cfg.regr_results_dir + "/" + ip.name + "_" + sim_job.regression_name)
@@ -757,6 +1041,7 @@ def do_simulate(ip, sim_job, wd):
     common.create_dir(tests_results_path + "/trn_log")
     sim_job.results_path = tests_results_path
     sim_job.results_dir_name = test_result_dir
+    sim_job.sim_log_file_path = simulation_log_path
     if sim_job.waves:
         if sim_job.simulator == common.simulators_enum.VIVADO:
             wave_capture_script_path = tests_results_path + "/waves.viv.tcl"
@@ -842,15 +1127,13 @@ def do_simulate(ip, sim_job, wd):
         arg_list.append(ip.name)
         arg_list.append("-sv_seed " + str(sim_job.seed))
         write_cmd_to_disk(sim_job, "xsim", arg_list, simulation_command_file)
-        sem.release()
-        sim_job.bwrap_commands += launch_eda_bin(cfg.vivado_home + "/xsim", arg_list, wd, output=output, dry_run=sim_job.dry_run)
+        sim_job.bwrap_commands += launch_eda_bin(cfg.vivado_home + "/xsim", arg_list, wd, output=output, dry_run=sim_job.dry_run, timeout=sim_job.max_duration, cpu_time_limit=sim_job.max_cpu_time)
         
     elif sim_job.simulator == common.simulators_enum.VCS:
         arg_list += vcs_default_simulation_args
         # TODO Add simulation output argument for vcs
         write_cmd_to_disk(sim_job, "simv", arg_list, simulation_command_file)
-        sem.release()
-        sim_job.bwrap_commands += launch_eda_bin(cfg.vcs_home + "/simv", arg_list, wd, output=output, dry_run=sim_job.dry_run)
+        sim_job.bwrap_commands += launch_eda_bin(cfg.vcs_home + "/simv", arg_list, wd, output=output, dry_run=sim_job.dry_run, timeout=sim_job.max_duration, cpu_time_limit=sim_job.max_cpu_time)
         
     elif sim_job.simulator == common.simulators_enum.METRICS:
         arg_list += metrics_default_simulation_args
@@ -866,7 +1149,8 @@ def do_simulate(ip, sim_job, wd):
         so_libs = get_all_so_libs(ip, sim_job)
         for so_lib in so_libs:
             so_lib_temp_path = f"{cfg.temp_path}/{so_lib}"
-            common.copy_file(so_libs[so_lib], so_lib_temp_path)
+            with shared_state_lock:
+                common.copy_file(so_libs[so_lib], so_lib_temp_path)
             so_lib_path = os.path.relpath(so_lib_temp_path, cfg.project_dir)
             arg_list.append(f"-sv_lib {so_lib_path}")
         
@@ -878,8 +1162,7 @@ def do_simulate(ip, sim_job, wd):
         else:
             arg_list = [f"dsim -a '{arg_list_str}'"]
         write_cmd_to_disk(sim_job, "mdc", arg_list, simulation_command_file)
-        sem.release()
-        sim_job.bwrap_commands += launch_eda_bin(cfg.metrics_home + "/mdc", arg_list, wd=cfg.project_dir, output=output, dry_run=sim_job.dry_run)
+        sim_job.bwrap_commands += launch_eda_bin(cfg.metrics_home + "/mdc", arg_list, wd=cfg.project_dir, output=output, dry_run=sim_job.dry_run, timeout=sim_job.max_duration, cpu_time_limit=sim_job.max_cpu_time)
         common.remove_file(f"{cfg.project_dir}/_downloaded_{mtr_simulation_log_path}")
         sim_job.bwrap_commands += launch_eda_bin(cfg.metrics_home + "/mdc", ["download", mtr_simulation_log_path], wd=cfg.project_dir, dry_run=sim_job.dry_run)
         if not sim_job.dry_run:
@@ -893,8 +1176,7 @@ def do_simulate(ip, sim_job, wd):
         arg_list += xcelium_default_simulation_args
         # TODO Add simulation output argument for nc
         write_cmd_to_disk(sim_job, "xrun", arg_list, simulation_command_file)
-        sem.release()
-        sim_job.bwrap_commands += launch_eda_bin(cfg.nc_home + "/xrun", arg_list, wd, output=output, dry_run=sim_job.dry_run)
+        sim_job.bwrap_commands += launch_eda_bin(cfg.nc_home + "/xrun", arg_list, wd, output=output, dry_run=sim_job.dry_run, timeout=sim_job.max_duration, cpu_time_limit=sim_job.max_cpu_time)
         
     elif sim_job.simulator == common.simulators_enum.QUESTA:
         arg_list += questa_default_simulation_args
@@ -903,17 +1185,14 @@ def do_simulate(ip, sim_job, wd):
         arg_list.append("-sv_seed " + str(sim_job.seed))
         arg_list.append(f" {ip.name}")
         write_cmd_to_disk(sim_job, "vsim", arg_list, simulation_command_file)
-        sem.release()
-        sim_job.bwrap_commands += launch_eda_bin(cfg.questa_home + "/vsim", arg_list, wd, output=output, dry_run=sim_job.dry_run)
+        sim_job.bwrap_commands += launch_eda_bin(cfg.questa_home + "/vsim", arg_list, wd, output=output, dry_run=sim_job.dry_run, timeout=sim_job.max_duration, cpu_time_limit=sim_job.max_cpu_time)
         
     elif sim_job.simulator == common.simulators_enum.RIVIERA:
         arg_list += riviera_default_simulation_args
         # TODO Add simulation output argument for riviera
         write_cmd_to_disk(sim_job, "vsim", arg_list, simulation_command_file)
-        sem.release()
-        sim_job.bwrap_commands += launch_eda_bin(cfg.riviera_home + "/vsim", arg_list, wd, output=output, dry_run=sim_job.dry_run)
-    
-    sim_job.sim_log_file_path = simulation_log_path
+        sim_job.bwrap_commands += launch_eda_bin(cfg.riviera_home + "/vsim", arg_list, wd, output=output, dry_run=sim_job.dry_run, timeout=sim_job.max_duration, cpu_time_limit=sim_job.max_cpu_time)
+
 
 
 def write_cmd_to_disk(sim_job, executable_name, arg_list, command_filename):
@@ -1404,14 +1683,17 @@ def invoke_fsoc(ip, core, sim_job):
         common.fatal("Failed to convert FuseSoC output data for core '" + core.name + "': "+ str(e))
 
 
+def is_hdl_file(path):
+    return (path[-2:] == ".v") or (path[-3:] == ".vh") or (path[-3:] == ".sv") or (path[-4:] == ".svh")  # TODO Add support for VHDL files
+
+
 def encrypt_tree(ip_name, location, app):
-    global bar
     tcl_script = ""
     files      = []
     
     for file in glob.iglob(location + '**/**', recursive=True):
         file_path = os.path.join(location, file)
-        if (file_path[-2:] == ".v") or (file_path[-3:] == ".vh") or (file_path[-3:] == ".sv") or (file_path[-4:] == ".svh"):  # TODO Add support for VHDL files
+        if is_hdl_file(file_path):
             common.dbg(f"Adding '{file_path}' to files to be encrypted")
             files.append(file_path)
     
@@ -1437,158 +1719,317 @@ def encrypt_tree(ip_name, location, app):
         mtr_key_local_path = f"{cfg.temp_path}/metrics.key"
         mtr_key_rel_path = os.path.relpath(mtr_key_local_path, cfg.temp_path)
         common.copy_file(cfg.encryption_key_path_metrics, mtr_key_local_path)
-        num_files = len(files)
-        with tqdm(total=num_files) as pbar:
-        #with alive_bar(num_files, bar = 'smooth', stats="{eta} estimated", monitor=True, elapsed=True) as bar:
-            for file in files:
-                filename = os.path.basename(file)
-                pbar.set_description(f"{filename}")
-                file_dir_path = file.replace(filename, "")
-                file_dir_rel_path = os.path.relpath(file_dir_path, cfg.temp_path)
-                
-                file_r = open(file,mode='r')
-                file_text = file_r.read()
-                file_r.close()
-                file_w = open(file,mode='w')
-                file_w.write("`pragma protect begin\n")
-                file_w.write(file_text)
-                file_w.write("\n`pragma protect end")
-                file_w.close()
-                file_rel_path = os.path.relpath(file, cfg.temp_path)
-                args = [file_rel_path, f"-i {mtr_key_rel_path}", f"-o {file_rel_path}.e"]
-                #if cfg.dbg:
-                #    args.append("-v")
-                arg_list_str = ""
-                for arg in args:
-                    arg_list_str = arg_list_str + f" {arg}"
-                if cfg.dbg:
-                    arg_list = [f"dvlencrypt -a '{arg_list_str}'"]
-                else:
-                    arg_list = [f"dvlencrypt -a '{arg_list_str}'"]
-                launch_eda_bin(cfg.metrics_home + "/mdc", arg_list, cfg.temp_path, cfg.dbg)
-                launch_eda_bin(cfg.metrics_home + "/mdc", ["download", f"{file_rel_path}.e"], cfg.temp_path, cfg.dbg)
-                #common.move_file(file, f"{file}.orig")
-                common.move_file(f"{cfg.temp_path}/_downloaded_{filename}.e", file)
-                pbar.update(1)
+        # 'mdc download' names its output after the file alone: files sharing a name are encrypted one after the other
+        files_by_name = {}
+        for file in files:
+            files_by_name.setdefault(os.path.basename(file), []).append(file)
+        if cfg.encryption_jobs > 0:
+            num_jobs = cfg.encryption_jobs
+        else:
+            num_jobs = os.cpu_count() or 1
+        with tqdm(total=len(files), desc=app) as pbar:
+            with ThreadPoolExecutor(max_workers=num_jobs) as executor:
+                futures = [executor.submit(encrypt_files_metrics, same_name_files, mtr_key_rel_path, pbar) for same_name_files in files_by_name.values()]
+                for future in as_completed(futures):
+                    future.result()
     else:
         common.fatal("Only vivado and metrics are currently supported for encryption")
 
 
-def launch_eda_bin(path, args, wd, output=False, shell=True, dry_run=False):
+def encrypt_files_metrics(files, mtr_key_rel_path, pbar):
+    for file in files:
+        filename = os.path.basename(file)
+        file_r = open(file,mode='r')
+        file_text = file_r.read()
+        file_r.close()
+        file_w = open(file,mode='w')
+        file_w.write("`pragma protect begin\n")
+        file_w.write(file_text)
+        file_w.write("\n`pragma protect end")
+        file_w.close()
+        file_rel_path = os.path.relpath(file, cfg.temp_path)
+        args = [file_rel_path, f"-i {mtr_key_rel_path}", f"-o {file_rel_path}.e"]
+        arg_list_str = ""
+        for arg in args:
+            arg_list_str = arg_list_str + f" {arg}"
+        arg_list = [f"dvlencrypt -a '{arg_list_str}'"]
+        launch_eda_bin(cfg.metrics_home + "/mdc", arg_list, cfg.temp_path, cfg.dbg)
+        launch_eda_bin(cfg.metrics_home + "/mdc", ["download", f"{file_rel_path}.e"], cfg.temp_path, cfg.dbg)
+        common.move_file(f"{cfg.temp_path}/_downloaded_{filename}.e", file)
+        pbar.update(1)
+
+
+def launch_eda_bin(path, args, wd, output=False, shell=False, dry_run=False, timeout=0, cpu_time_limit=0, env=None, log_scanner=None):
     global eda_processes
-    args_str = ""
     commands = []
-    for arg in args:
-        args_str = args_str + "  " + arg
+    args_str = " ".join(args)
     if not dry_run:
-        os.chdir(wd)
         common.dbg("Launching " + path + " with arguments '" + args_str + "' from " + wd)
-        if output:
-            p = subprocess.Popen(path + " " + args_str, shell=shell)
+        if shell:
+            cmd = path + " " + args_str
+        else:
+            cmd = build_argv(path, args)
+        if env != None:
+            env = dict(os.environ, **env)
+        if log_scanner != None:
+            # The tool's output is scanned as it is produced, and echoed only if it would otherwise be shown
+            p = subprocess.Popen(cmd, shell=shell, cwd=wd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True, errors='replace', start_new_session=(not output))
+        elif output:
+            p = subprocess.Popen(cmd, shell=shell, cwd=wd, env=env)
         else:
-            p = subprocess.Popen(path + " " + args_str + " > /dev/null 2>&1", shell=shell)
+            # Background jobs get their own process group so that the EDA tool is killed along with anything it spawns
+            p = subprocess.Popen(cmd, shell=shell, cwd=wd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
         eda_processes.append(p)
-        p.wait()
-    rel_wd = os.path.relpath(wd, cfg.project_dir)
+        engine.report_phase(os.path.basename(path))
+        try:
+            if cpu_time_limit > 0:
+                set_cpu_time_limit(p, cpu_time_limit)
+            timer = None
+            timed_out = Event()
+            if timeout > 0:
+                timer = Timer(timeout, stop_process, [p, timed_out])
+                timer.daemon = True
+                timer.start()
+            if log_scanner != None:
+                for line in p.stdout:
+                    if output:
+                        sys.stdout.write(line)
+                    log_scanner.feed(line)
+                    engine.report_output(1, log_scanner.num_errors, log_scanner.num_warnings)
+                    if log_scanner.stopped:
+                        common.warning(f"Stopping {os.path.basename(path)} after {log_scanner.num_errors} error(s)")
+                        kill_process(p)
+                        break
+                p.stdout.close()
+                log_scanner.finish()
+            p.wait()
+            if timer != None:
+                timer.cancel()
+            if timed_out.is_set():
+                raise subprocess.TimeoutExpired(cmd, timeout)
+            if (cpu_time_limit > 0) and (p.returncode in [-signal.SIGXCPU, -signal.SIGKILL]):
+                raise subprocess.TimeoutExpired(cmd, cpu_time_limit)
+        finally:
+            eda_processes.remove(p)
     commands.append(f"cd {wd}")
     commands.append(f"{path} {args_str}")
     return commands
 
 
+def build_argv(path, args):
+    # Arguments are written as shell fragments (ex: "-l sim.log"): variables are expanded and words split the way
+    # the shell used to, without starting one
+    argv = []
+    for fragment in [path] + args:
+        argv += shlex.split(os.path.expandvars(fragment))
+    return argv
+
+
+def set_cpu_time_limit(p, cpu_time_limit):
+    # Inherited by any process the tool spawns; the kernel stops it once it has used up its CPU time
+    try:
+        resource.prlimit(p.pid, resource.RLIMIT_CPU, (cpu_time_limit, cpu_time_limit + 5))
+    except (AttributeError, OSError) as e:
+        common.warning(f"Could not set a CPU time limit on process {p.pid}: {e}")
+
+
+def stop_process(p, timed_out):
+    timed_out.set()
+    kill_process(p)
+
+
+def get_live_log_scanner(sim_job, step):
+    error_regexes, warning_regexes = get_log_regexes(sim_job.simulator, step)
+    return LogScanner(error_regexes, warning_regexes, max_matches=sim_job.max_errors, stop_on_errors=sim_job.max_errors)
+
+
 def kill_all_processes():
     global eda_processes
-    for p in eda_processes:
-        p.terminate()
-        p.wait()
+    for p in list(eda_processes):
+        if p.poll() == None:
+            kill_process(p)
+
+
+def kill_process(p):
+    try:
+        if os.getpgid(p.pid) == p.pid:
+            os.killpg(p.pid, signal.SIGTERM)
+        else:
+            p.terminate()
+    except ProcessLookupError:
+        pass
+    p.wait()
 atexit.register(kill_all_processes)
 
 
+class LogScanner:
+    """Log Scanner model"""
+    
+    def __init__(self, error_regexes, warning_regexes=[], max_matches=0, stop_on_errors=0):
+        self.regex          = compile_log_regex(error_regexes, warning_regexes)
+        self.max_matches    = max_matches
+        self.stop_on_errors = stop_on_errors
+        self.errors         = []
+        self.warnings       = []
+        self.num_errors     = 0
+        self.num_warnings   = 0
+        self.stopped        = False
+        self.partial_line   = ""
+    
+    def feed(self, text):
+        # Only complete lines are scanned; the trailing fragment is kept until the next call (or finish())
+        if self.stopped:
+            return
+        text = self.partial_line + text
+        end = text.rfind("\n") + 1
+        self.partial_line = text[end:]
+        if end > 0:
+            self.scan(text, end)
+    
+    def finish(self):
+        if (not self.stopped) and (self.partial_line != ""):
+            self.scan(self.partial_line, len(self.partial_line))
+        self.partial_line = ""
+    
+    def scan(self, text, end):
+        # One pass of the combined pattern over the whole buffer; each line is reported once, as an error if any error
+        # pattern matches it
+        if self.regex == None:
+            return
+        line_end = -1
+        line_is_error = False
+        line_start = 0
+        for match in self.regex.finditer(text, 0, end):
+            if match.start() < line_end:
+                if (not line_is_error) and (match.lastgroup == "error"):
+                    line_is_error = True
+                continue
+            if line_end >= 0:
+                self.add_line(text[line_start:line_end], line_is_error)
+                if self.stopped:
+                    return
+            line_start = text.rfind("\n", 0, match.start()) + 1
+            line_end = text.find("\n", match.start(), end)
+            if line_end < 0:
+                line_end = end
+            line_is_error = (match.lastgroup == "error")
+        if line_end >= 0:
+            self.add_line(text[line_start:line_end], line_is_error)
+    
+    def add_line(self, line, is_error):
+        if is_error:
+            self.num_errors += 1
+            if (self.max_matches == 0) or (len(self.errors) < self.max_matches):
+                self.errors.append(line)
+            if (self.stop_on_errors > 0) and (self.num_errors >= self.stop_on_errors):
+                self.stopped = True
+        else:
+            self.num_warnings += 1
+            if (self.max_matches == 0) or (len(self.warnings) < self.max_matches):
+                self.warnings.append(line)
+    
+    def scan_file(self, path, chunk_size=1024*1024):
+        with open(path, 'r', errors='replace') as log_file:
+            while not self.stopped:
+                chunk = log_file.read(chunk_size)
+                if not chunk:
+                    break
+                self.feed(chunk)
+        self.finish()
+        return self
+
+
+log_regexes = {}
+
+
+def compile_log_regex(error_regexes, warning_regexes):
+    key = (tuple(error_regexes), tuple(warning_regexes))
+    if key not in log_regexes:
+        alternatives = []
+        if len(error_regexes):
+            alternatives.append("(?P<error>" + "|".join(f"(?:{regex})" for regex in error_regexes) + ")")
+        if len(warning_regexes):
+            alternatives.append("(?P<warning>" + "|".join(f"(?:{regex})" for regex in warning_regexes) + ")")
+        if len(alternatives):
+            log_regexes[key] = re.compile("|".join(alternatives), re.MULTILINE)
+        else:
+            log_regexes[key] = None
+    return log_regexes[key]
+
+
+def get_log_regexes(simulator, step):
+    sim_str = common.get_simulator_short_name(simulator)
+    regexes = {
+        "viv" : {
+            "cmp"       : [vivado_cmp_log_error_regexes      , vivado_cmp_log_warning_regexes      ],
+            "elab"      : [vivado_elab_log_error_regexes     , vivado_elab_log_warning_regexes     ],
+            "gen-image" : [vivado_gen_image_log_error_regexes, vivado_gen_image_log_warning_regexes]
+        },
+        "mdc" : {
+            "cmp"       : [metrics_cmp_log_error_regexes      , metrics_cmp_log_warning_regexes      ],
+            "elab"      : [metrics_elab_log_error_regexes     , metrics_elab_log_warning_regexes     ],
+            "gen-image" : [metrics_gen_image_log_error_regexes, metrics_gen_image_log_warning_regexes]
+        },
+        "vcs" : {
+            "cmp"       : [vcs_cmp_log_error_regexes      , vcs_cmp_log_warning_regexes      ],
+            "elab"      : [vcs_elab_log_error_regexes     , vcs_elab_log_warning_regexes     ],
+            "gen-image" : [vcs_gen_image_log_error_regexes, vcs_gen_image_log_warning_regexes]
+        },
+        "xcl" : {
+            "cmp"       : [xcelium_cmp_log_error_regexes      , xcelium_cmp_log_warning_regexes      ],
+            "elab"      : [xcelium_elab_log_error_regexes     , xcelium_elab_log_warning_regexes     ],
+            "gen-image" : [xcelium_gen_image_log_error_regexes, xcelium_gen_image_log_warning_regexes]
+        },
+        "qst" : {
+            "cmp"       : [questa_cmp_log_error_regexes      , questa_cmp_log_warning_regexes      ],
+            "elab"      : [questa_elab_log_error_regexes     , questa_elab_log_warning_regexes     ],
+            "gen-image" : [questa_gen_image_log_error_regexes, questa_gen_image_log_warning_regexes]
+        },
+        "riv" : {
+            "cmp"       : [riviera_cmp_log_error_regexes      , riviera_cmp_log_warning_regexes      ],
+            "elab"      : [riviera_elab_log_error_regexes     , riviera_elab_log_warning_regexes     ],
+            "gen-image" : [riviera_gen_image_log_error_regexes, riviera_gen_image_log_warning_regexes]
+        }
+    }
+    return regexes[sim_str][step]
+
+
+def scan_log_file(log_file_path, sim_job, step):
+    error_regexes, warning_regexes = get_log_regexes(sim_job.simulator, step)
+    scanner = LogScanner(error_regexes, warning_regexes)
+    scanner.scan_file(log_file_path)
+    common.dbg(f"Found {scanner.num_errors} error(s) and {scanner.num_warnings} warning(s) in {log_file_path}")
+    return scanner
+
+
 def scan_cmp_log_file_for_errors(log_file_path, sim_job):
     common.dbg("Scanning compilation log file " + log_file_path + " for errors")
-    errors = []
-    if sim_job.simulator == common.simulators_enum.VIVADO:
-        regexes = vivado_cmp_log_error_regexes
-    elif sim_job.simulator == common.simulators_enum.VCS:
-        regexes = vcs_cmp_log_error_regexes
-    elif sim_job.simulator == common.simulators_enum.METRICS:
-        regexes = metrics_cmp_log_error_regexes
-    elif sim_job.simulator == common.simulators_enum.XCELIUM:
-        regexes = xcelium_cmp_log_error_regexes
-    elif sim_job.simulator == common.simulators_enum.QUESTA:
-        regexes = questa_cmp_log_error_regexes
-    elif sim_job.simulator == common.simulators_enum.RIVIERA:
-        regexes = riviera_cmp_log_error_regexes
     try:
-        for i, line in enumerate(open(log_file_path)):
-            for regex in regexes:
-                matches = re.search(regex, line)
-                if matches:
-                    errors.append(line.replace("\n", ""))
+        return scan_log_file(log_file_path, sim_job, "cmp").errors
     except Exception as e:
         common.fatal("Failed while parsing compilation log file " + log_file_path + ": " + str(e))
-    return errors
 
 
 def scan_elab_log_file_for_errors(log_file_path, sim_job):
     common.dbg("Scanning elaboration log file " + log_file_path + " for errors")
-    errors = []
-    if sim_job.simulator == common.simulators_enum.VIVADO:
-        regexes = vivado_elab_log_error_regexes
-    elif sim_job.simulator == common.simulators_enum.VCS:
-        regexes = vcs_elab_log_error_regexes
-    elif sim_job.simulator == common.simulators_enum.METRICS:
-        regexes = metrics_elab_log_error_regexes
-    elif sim_job.simulator == common.simulators_enum.XCELIUM:
-        regexes = xcelium_elab_log_error_regexes
-    elif sim_job.simulator == common.simulators_enum.QUESTA:
-        regexes = questa_elab_log_error_regexes
-    elif sim_job.simulator == common.simulators_enum.RIVIERA:
-        regexes = riviera_elab_log_error_regexes
     try:
-        for i, line in enumerate(open(log_file_path)):
-            for regex in regexes:
-                matches = re.search(regex, line)
-                if matches:
-                    errors.append(line.replace("\n", ""))
+        return scan_log_file(log_file_path, sim_job, "elab").errors
     except Exception as e:
         common.fatal("Failed while parsing elaboration log file " + log_file_path + ": " + str(e))
-    return errors
 
 
 def scan_gen_image_log_file_for_errors(log_file_path, sim_job):
-    common.dbg("Scanning compilation/elaborationn log file " + log_file_path + " for errors")
-    errors = []
-    if sim_job.simulator == common.simulators_enum.VIVADO:
-        regexes = vivado_gen_image_log_error_regexes
-    elif sim_job.simulator == common.simulators_enum.VCS:
-        regexes = vcs_gen_image_log_error_regexes
-    elif sim_job.simulator == common.simulators_enum.METRICS:
-        regexes = metrics_gen_image_log_error_regexes
-    elif sim_job.simulator == common.simulators_enum.XCELIUM:
-        regexes = xcelium_gen_image_log_error_regexes
-    elif sim_job.simulator == common.simulators_enum.QUESTA:
-        regexes = questa_gen_image_log_error_regexes
-    elif sim_job.simulator == common.simulators_enum.RIVIERA:
-        regexes = riviera_gen_image_log_error_regexes
+    common.dbg("Scanning compilation/elaboration log file " + log_file_path + " for errors")
     try:
-        for i, line in enumerate(open(log_file_path)):
-            for regex in regexes:
-                matches = re.search(regex, line)
-                if matches:
-                    errors.append(line.replace("\n", ""))
+        return scan_log_file(log_file_path, sim_job, "gen-image").errors
     except Exception as e:
         common.fatal("Failed while parsing compilation/elaboration log file " + log_file_path + ": " + str(e))
-    return errors
 
 
 def log_cmp_history_fsoc(core, log_path, sim_job, timestamp_start, timestamp_end):
     sim_str = common.get_simulator_short_name(sim_job.simulator)
     common.dbg("Updating history with FuseSoC core '" + core.name + "' compilation")
-    if core.name not in cfg.job_history:
-        cfg.job_history[core.name] = {}
-    if 'compilation' not in cfg.job_history[core.name]:
-        cfg.job_history[core.name]['compilation'] = []
-    cfg.job_history[core.name]['compilation'].append({
+    history.add_entry(core.name, 'compilation', {
         "simulator"       : sim_str,
         'timestamp_start' : timestamp_start,
         'timestamp_end'   : timestamp_end,
@@ -1600,11 +2041,7 @@ def log_cmp_history_ip(ip, log_path, sim_job, timestamp_start, timestamp_end):
     ip_str = f"{ip.vendor}/{ip.name}"
     sim_str = common.get_simulator_short_name(sim_job.simulator)
     common.dbg("Updating history with IP '" + ip_str + "' compilation")
-    if ip_str not in cfg.job_history:
-        cfg.job_history[ip_str] = {}
-    if 'compilation' not in cfg.job_history[ip_str]:
-        cfg.job_history[ip_str]['compilation'] = []
-    cfg.job_history[ip_str]['compilation'].append({
+    history.add_entry(ip_str, 'compilation', {
         "simulator"       : sim_str,
         'timestamp_start' : timestamp_start,
         'timestamp_end'   : timestamp_end,
@@ -1616,11 +2053,7 @@ def log_cmp_history_vivado_project(ip, log_path_vlog, log_path_vhdl, sim_job, ti
     ip_str = f"{ip.vendor}/{ip.name}"
     sim_str = common.get_simulator_short_name(sim_job.simulator)
     common.dbg("Updating history with Vivado Project IP '" + ip_str + "' compilation")
-    if ip_str not in cfg.job_history:
-        cfg.job_history[ip_str] = {}
-    if 'compilation' not in cfg.job_history[ip_str]:
-        cfg.job_history[ip_str]['compilation'] = []
-    cfg.job_history[ip_str]['compilation'].append({
+    history.add_entry(ip_str, 'compilation', {
         "simulator"       : sim_str,
         'timestamp_start' : timestamp_start,
         'timestamp_end'   : timestamp_end,
@@ -1633,11 +2066,7 @@ def log_elab_history(ip, log_path, sim_job, timestamp_start, timestamp_end):
     ip_str = f"{ip.vendor}/{ip.name}"
     sim_str = common.get_simulator_short_name(sim_job.simulator)
     common.dbg("Updating history with IP '" + ip_str + "' elaboration")
-    if ip_str not in cfg.job_history:
-        cfg.job_history[ip_str] = {}
-    if 'elaboration' not in cfg.job_history[ip_str]:
-        cfg.job_history[ip_str]['elaboration'] = []
-    cfg.job_history[ip_str]['elaboration'].append({
+    history.add_entry(ip_str, 'elaboration', {
         "simulator"            : sim_str,
         'timestamp_start'      : timestamp_start,
         'timestamp_end'        : timestamp_end,
@@ -1652,11 +2081,7 @@ def log_gen_image_history_ip(ip, log_path, sim_job, timestamp_start, timestamp_e
     ip_str = f"{ip.vendor}/{ip.name}"
     sim_str = common.get_simulator_short_name(sim_job.simulator)
     common.dbg("Updating history with IP '" + ip_str + "' compilation/elaboration")
-    if ip_str not in cfg.job_history:
-        cfg.job_history[ip_str] = {}
-    if 'gen-image' not in cfg.job_history[ip_str]:
-        cfg.job_history[ip_str]['gen-image'] = []
-    cfg.job_history[ip_str]['gen-image'].append({
+    history.add_entry(ip_str, 'gen-image', {
         "simulator"            : sim_str,
         'timestamp_start'      : timestamp_start,
         'timestamp_end'        : timestamp_end,
@@ -1671,11 +2096,7 @@ def log_sim_start_history(ip, sim_job, timestamp):
     ip_str = f"{ip.vendor}/{ip.name}"
     sim_str = common.get_simulator_short_name(sim_job.simulator)
     common.dbg("Updating history with IP '" + ip_str + "' simulation start")
-    if ip_str not in cfg.job_history:
-        cfg.job_history[ip_str] = {}
-    if 'simulation' not in cfg.job_history[ip_str]:
-        cfg.job_history[ip_str]['simulation'] = []
-    cfg.job_history[ip_str]['simulation'].append({
+    history.add_entry(ip_str, 'simulation', {
         "type"                 : "start",
         "simulator"            : sim_str,
         'timestamp'            : timestamp,
@@ -1695,11 +2116,6 @@ def log_sim_end_history(ip, sim_job, timestamp_start, timestamp_end):
     ip_str = f"{ip.vendor}/{ip.name}"
     sim_str = common.get_simulator_short_name(sim_job.simulator)
     common.dbg("Updating history with IP '" + ip_str + "' simulation end")
-    if ip_str not in cfg.job_history:
-        cfg.job_history[ip_str] = {}
-    if 'simulation' not in cfg.job_history[ip_str]:
-        cfg.job_history[ip_str]['simulation'] = []
-    common.dbg(f"{str(len(cfg.job_history[ip_str]['simulation']))} job history items before append()")
     entry = {
         "type"                 : "end",
         "simulator"            : sim_str,
@@ -1712,13 +2128,14 @@ def log_sim_end_history(ip, sim_job, timestamp_start, timestamp_end):
         'cov'                  : sim_job.cov,
         'gui'                  : sim_job.gui,
         'path'                 : sim_job.results_path,
+        'summary_path'         : sim_job.sim_summary_path,
+        'timed_out'            : sim_job.timed_out,
         "args"                 : plus_args_to_str(sim_job),
         "is_regression"        : sim_job.is_regression,
         "regression_name"      : sim_job.regression_name,
         "regression_timestamp" : sim_job.regression_timestamp
     }
-    cfg.job_history[ip_str]['simulation'].append(entry)
-    common.dbg(f"{str(len(cfg.job_history[ip_str]['simulation']))} job history items after append()")
+    history.add_entry(ip_str, 'simulation', entry)
 
 
 def plus_args_to_str(sim_job):
@@ -0,0 +1,254 @@
+# Copyright 2021-2023 Datum Technology Corporation
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.1
+########################################################################################################################
+
+
+from mio import eal
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, local
+from tqdm import tqdm
+import asyncio
+import json
+import sys
+import time
+
+
+# Each EDA step runs as a job on a worker thread while the event loop schedules the jobs and sends their events to the
+# consumers: start/finish when a job begins and ends, progress once a second and as its tool produces output.
+consumers       = []
+consumers_lock  = Lock()
+current         = local()
+output_interval = 0.5
+
+
+class Job:
+    """Job model"""
+
+    def __init__(self, name, ip_str, step, function, args=None, after=None, est_time=0):
+        self.name            = name
+        self.ip_str          = ip_str
+        self.step            = step
+        self.function        = function
+        self.args            = list(args or [])
+        self.after           = list(after or [])
+        self.est_time        = est_time
+        self.state           = "pending"
+        self.result          = None
+        self.phase           = ""
+        self.num_lines       = 0
+        self.num_errors      = 0
+        self.num_warnings    = 0
+        self.timestamp_start = 0
+        self.last_output     = 0
+
+    def get_elapsed(self):
+        if self.timestamp_start == 0:
+            return 0
+        return time.time() - self.timestamp_start
+
+
+class JobExit(Exception):
+    """Carries a job's SystemExit (ex: from common.fatal()) back to the thread that called run()"""
+
+    def __init__(self, exit):
+        super().__init__(str(exit))
+        self.exit = exit
+
+
+class Event:
+    """Event model"""
+
+    def __init__(self, kind, job, data):
+        self.kind      = kind
+        self.job       = job
+        self.timestamp = time.time()
+        self.data      = data
+
+    def to_dict(self):
+        event = {
+            "event"     : self.kind,
+            "job"       : self.job.name,
+            "ip"        : self.job.ip_str,
+            "step"      : self.job.step,
+            "timestamp" : round(self.timestamp, 3),
+            "elapsed"   : round(self.job.get_elapsed(), 3),
+            "phase"     : self.job.phase,
+            "lines"     : self.job.num_lines,
+            "errors"    : self.job.num_errors,
+            "warnings"  : self.job.num_warnings
+        }
+        event.update(self.data)
+        return event
+
+
+class ProgressBarConsumer:
+    """Progress Bar Consumer model"""
+
+    def __init__(self):
+        self.bars = {}
+
+    def consume(self, event):
+        job = event.job
+        if event.kind == "start":
+            if job.est_time > 0:
+                self.bars[job] = tqdm(total=job.est_time)
+        elif job in self.bars:
+            bar = self.bars[job]
+            if event.kind == "progress":
+                bar.n = min(int(job.get_elapsed()), job.est_time)
+                if job.num_lines > 0:
+                    bar.set_postfix(lines=job.num_lines, errors=job.num_errors, refresh=False)
+                bar.refresh()
+            elif event.kind == "finish":
+                if event.data["status"] == "passed":
+                    bar.n = job.est_time
+                bar.close()
+                del self.bars[job]
+
+
+class JsonEventConsumer:
+    """JSON Event Consumer model"""
+
+    def __init__(self, path):
+        if path == "-":
+            self.file = sys.stdout
+        else:
+            self.file = open(path, 'a')
+
+    def consume(self, event):
+        self.file.write(json.dumps(event.to_dict(), default=str) + "\n")
+        self.file.flush()
+
+    def close(self):
+        if self.file != sys.stdout:
+            self.file.close()
+
+
+def add_consumer(consumer):
+    with consumers_lock:
+        consumers.append(consumer)
+
+
+def remove_consumer(consumer):
+    with consumers_lock:
+        consumers.remove(consumer)
+
+
+def close_consumer(consumer):
+    remove_consumer(consumer)
+    consumer.close()
+
+
+def emit(kind, job, **data):
+    event = Event(kind, job, data)
+    with consumers_lock:
+        for consumer in consumers:
+            consumer.consume(event)
+
+
+def get_current_job():
+    return getattr(current, "job", None)
+
+
+def report_phase(phase):
+    # Called from the thread running a job, ex: when it launches an EDA tool
+    job = get_current_job()
+    if job != None:
+        job.phase = phase
+        emit("progress", job)
+
+
+def report_output(num_lines=1, num_errors=None, num_warnings=None):
+    # Called from the thread running a job as its tool produces output; events are throttled to 'output_interval'
+    job = get_current_job()
+    if job == None:
+        return
+    job.num_lines += num_lines
+    if num_errors != None:
+        job.num_errors = num_errors
+    if num_warnings != None:
+        job.num_warnings = num_warnings
+    now = time.time()
+    if now - job.last_output >= output_interval:
+        job.last_output = now
+        emit("progress", job)
+
+
+def run(jobs, max_workers=1, run_consumers=[]):
+    # Jobs must be listed after the jobs they depend on; results are returned in the same order
+    for consumer in run_consumers:
+        add_consumer(consumer)
+    loop = asyncio.new_event_loop()
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    try:
+        results = loop.run_until_complete(run_jobs(loop, executor, jobs))
+        executor.shutdown()
+        return results
+    except BaseException as e:
+        # Ex: Ctrl-C; the tools still running would otherwise keep their worker (and mio) alive until they are done
+        eal.kill_all_processes()
+        executor.shutdown(wait=False)
+        if isinstance(e, JobExit):
+            raise e.exit from None
+        raise
+    finally:
+        loop.close()
+        for consumer in run_consumers:
+            remove_consumer(consumer)
+
+
+async def run_jobs(loop, executor, jobs):
+    tasks = {}
+    for job in jobs:
+        prerequisites = [tasks[prerequisite] for prerequisite in job.after]
+        tasks[job] = asyncio.ensure_future(run_job(loop, executor, job, prerequisites), loop=loop)
+    heartbeat = asyncio.ensure_future(send_heartbeats(jobs), loop=loop)
+    try:
+        results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+    finally:
+        heartbeat.cancel()
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
+
+
+async def run_job(loop, executor, job, prerequisites):
+    try:
+        await asyncio.gather(*prerequisites)
+    except BaseException:
+        job.state = "cancelled"
+        emit("finish", job, status="cancelled")
+        raise
+    job.state = "running"
+    job.timestamp_start = time.time()
+    emit("start", job, est_time=job.est_time)
+    try:
+        job.result = await loop.run_in_executor(executor, run_in_thread, job)
+    except BaseException as e:
+        job.state = "failed"
+        emit("finish", job, status="failed", error=str(e))
+        raise
+    job.state = "passed"
+    emit("finish", job, status="passed")
+    return job.result
+
+
+def run_in_thread(job):
+    current.job = job
+    try:
+        return job.function(*job.args)
+    except SystemExit as e:
+        # asyncio lets a SystemExit escape the event loop and leaves its tasks pending
+        raise JobExit(e)
+    finally:
+        current.job = None
+
+
+async def send_heartbeats(jobs):
+    while True:
+        await asyncio.sleep(1)
+        for job in jobs:
+            if job.state == "running":
+                emit("progress", job)
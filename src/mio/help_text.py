@@ -15,7 +15,7 @@ main_help_text = f"""
               https://mooreio.com - Copyright 2021-2023 Datum Technology Corporation - https://datumtc.ca
 Usage:
   mio [--version] [--help]
-  mio [--wd WD] [--dbg] CMD [OPTIONS]
+  mio [--wd WD] [--dbg] [--events PATH] CMD [OPTIONS]
 
 Options:
   -v, --version
@@ -29,6 +29,9 @@ Options:
    
   --dbg
     Enables debugging outputs from mio.
+  
+  --events PATH
+    Writes start/progress/finish events for each EDA step (compilation, elaboration, ...) as JSON lines to PATH ('-' for stdout).
 
 Full Command List (`mio help CMD` for help on a specific command):
    Help and Shell/Editor Integration
@@ -103,6 +106,7 @@ Options:
    -w          , --waves                Enable wave capture to disk.
    -c          , --cov                  Enable code & functional coverage capture.
    -g          , --gui                  Invokes simulator in graphical or 'GUI' mode.
+   -j JOBS     , --jobs      JOBS       Maximum number of IP dependencies compiled in parallel.  [default: one per CPU]
    
    -S   Simulate  target IP.
    -E   Elaborate target IP.
@@ -117,6 +121,7 @@ Examples:
    mio sim uvmt_my_ip -S -t smoke -s 42 -v high -g    # Only simulates test 'uvmt_my_ip_smoke_test_c' for IP 'uvmt_my_ip'
                                                       # with seed '42' and UVM_HIGH verbosity using the simulator in GUI mode.
    mio sim uvmt_my_ip -C                              # Only compile 'uvmt_my_ip'.
+   mio sim uvmt_my_ip -C -j 8                         # Only compile 'uvmt_my_ip', compiling up to 8 dependencies at a time.
    mio sim uvmt_my_ip -E                              # Only elaborate 'uvmt_my_ip'.
    mio sim uvmt_my_ip -CE                             # Compile and elaborate 'uvmt_my_ip'."""
 
@@ -130,12 +135,17 @@ Usage:
    mio regr IP [TARGET.]REGRESSION [OPTIONS]
    
 Options:
-   -d, --dry-run  Compiles, elaborates, but only prints the tests mio would normally run (does not actually run them).
+   -d, --dry-run          Compiles, elaborates, but only prints the tests mio would normally run (does not actually run them).
+       --abort-failures N   Aborts the regression after N failed tests.  Queued tests are dropped and running simulations killed.
+       --abort-rate PCT     Aborts the regression when more than PCT percent of completed tests have failed.
+       --abort-min-tests M  Number of tests that must complete before --abort-rate is checked (default: 10).
+       --abort-on-fatal     Aborts the regression as soon as a test ends with a fatal error.
    
 Examples:
-   mio regr uvmt_my_ip sanity            # Run sanity regression for IP 'uvm_my_ip', from test suite 'ts.yml'
-   mio regr uvmt_my_ip apb_xc.sanity     # Run sanity regression for IP 'uvm_my_ip', from test suite 'apb_xc.ts.yml'
-   mio regr uvmt_my_ip axi_xc.sanity -d  # Dry-run sanity regression for IP 'uvm_my_ip', from test suite 'axi_xc.ts.yml'"""
+   mio regr uvmt_my_ip sanity                      # Run sanity regression for IP 'uvm_my_ip', from test suite 'ts.yml'
+   mio regr uvmt_my_ip apb_xc.sanity               # Run sanity regression for IP 'uvm_my_ip', from test suite 'apb_xc.ts.yml'
+   mio regr uvmt_my_ip axi_xc.sanity -d            # Dry-run sanity regression for IP 'uvm_my_ip', from test suite 'axi_xc.ts.yml'
+   mio regr uvmt_my_ip sanity --abort-failures 1   # Stop the sanity regression at the first failure"""
 
 
 
@@ -197,11 +207,13 @@ Options:
    -g         , --global             # Installs IP dependencies for all user projects
    -u USERNAME, --username USERNAME  # Specifies Moore.io username (must be combined with -p)
    -p PASSWORD, --password PASSWORD  # Specifies Moore.io password (must be combined with -u)
+   -f         , --frozen             # Installs the dependency versions pinned in ip.lock.yml without querying the catalog
    
 Examples:
    mio install uvmt_my_ip                          # Install IP dependencies for 'uvmt_my_ip' locally.
    mio install uvmt_another_ip                     # Install IP dependencies for 'uvmt_another_ip' globally.
-   mio install uvmt_my_ip -u jenkins -p )Kq3)fkqm  # Specify credentials for Jenkins job."""
+   mio install uvmt_my_ip -u jenkins -p )Kq3)fkqm  # Specify credentials for Jenkins job.
+   mio install uvmt_my_ip -f                       # Reproduce the dependencies locked for 'uvmt_my_ip' (ex: in CI)."""
 
 
 
@@ -291,9 +303,11 @@ Usage:
    mio results IP REPORT_NAME [OPTIONS]
    
 Options:
+   -f LIMIT, --failure-limit LIMIT  # Stop parsing a simulation log after LIMIT errors and fatals (0: parse entire logs)
    
 Examples:
-   mio results my_ip sim_results  # Parse simulation results for 'my_ip' and generate reports under 'sim_results' filenames."""
+   mio results my_ip sim_results       # Parse simulation results for 'my_ip' and generate reports under 'sim_results' filenames.
+   mio results my_ip sim_results -f 1  # Only read each log up to its first error or fatal."""
 
 
 
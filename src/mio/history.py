@@ -0,0 +1,235 @@
+# Copyright 2021-2023 Datum Technology Corporation
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.1
+########################################################################################################################
+
+
+from mio import cfg
+from mio import common
+
+from datetime import datetime, timedelta
+from threading import Lock
+import sqlite3
+import json
+import os
+import yaml
+from yaml.loader import SafeLoader
+
+
+history_db      = None
+history_db_lock = Lock()
+
+# Entries are appended as jobs complete: each insert is committed immediately and nothing is ever rewritten in full
+history_db_schema = [
+    """CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)""",
+    """CREATE TABLE IF NOT EXISTS job (
+           id                   INTEGER PRIMARY KEY AUTOINCREMENT,
+           ip                   TEXT NOT NULL,
+           step                 TEXT NOT NULL,
+           simulator            TEXT NOT NULL DEFAULT '',
+           timestamp            TEXT NOT NULL,
+           regression_name      TEXT NOT NULL DEFAULT '',
+           regression_timestamp TEXT NOT NULL DEFAULT '',
+           test_name            TEXT NOT NULL DEFAULT '',
+           seed                 INTEGER,
+           entry                TEXT NOT NULL
+       )""",
+    """CREATE INDEX IF NOT EXISTS job_ip_step    ON job (ip, step, simulator)""",
+    """CREATE INDEX IF NOT EXISTS job_regression ON job (regression_name, regression_timestamp)""",
+    """CREATE INDEX IF NOT EXISTS job_timestamp  ON job (timestamp)""",
+    """CREATE TABLE IF NOT EXISTS timing (
+           ip        TEXT NOT NULL,
+           simulator TEXT NOT NULL,
+           step      TEXT NOT NULL,
+           key       TEXT NOT NULL,
+           count     INTEGER NOT NULL,
+           ewma      REAL NOT NULL,
+           recent    TEXT NOT NULL,
+           PRIMARY KEY (ip, simulator, step, key)
+       )""",
+]
+
+# Durations are folded into the timing table as jobs end, so estimates never require rescanning the job history
+timing_ewma_weight = 0.3
+timing_window_size = 20
+
+
+def get_db():
+    global history_db
+    if history_db == None:
+        history_db = sqlite3.connect(cfg.job_history_db_path, check_same_thread=False)
+        # Regressions from several mio processes can share the same project
+        history_db.execute("PRAGMA journal_mode=WAL")
+        history_db.execute("PRAGMA synchronous=NORMAL")
+        for statement in history_db_schema:
+            history_db.execute(statement)
+        history_db.commit()
+        import_yml_history()
+        build_timing()
+        prune()
+    return history_db
+
+
+insert_job_statement = """INSERT INTO job (ip, step, simulator, timestamp, regression_name, regression_timestamp,
+                          test_name, seed, entry) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+
+def convert_entry_to_row(ip_str, step, entry):
+    timestamp = entry.get("timestamp_start") or entry.get("timestamp") or common.timestamp()
+    return (
+        ip_str, step, entry.get("simulator") or "", timestamp, entry.get("regression_name") or "",
+        entry.get("regression_timestamp") or "", entry.get("test_name") or "", entry.get("seed"), json.dumps(entry, default=str)
+    )
+
+
+def add_entry(ip_str, step, entry):
+    row = convert_entry_to_row(ip_str, step, entry)
+    with history_db_lock:
+        db = get_db()
+        with db:
+            db.execute(insert_job_statement, row)
+            update_timing(db, ip_str, step, entry)
+
+
+def get_entries(ip_str, step, simulator="", regression_name="", regression_timestamp="", since="", limit=0):
+    where  = "ip = ? AND step = ?"
+    params = [ip_str, step]
+    if simulator != "":
+        where += " AND simulator = ?"
+        params.append(simulator)
+    if regression_name != "":
+        where += " AND regression_name = ?"
+        params.append(regression_name)
+    if regression_timestamp != "":
+        where += " AND regression_timestamp = ?"
+        params.append(regression_timestamp)
+    if since != "":
+        where += " AND timestamp >= ?"
+        params.append(since)
+    if limit > 0:
+        # Most recent entries, returned in chronological order
+        query = f"SELECT entry FROM (SELECT id, entry FROM job WHERE {where} ORDER BY id DESC LIMIT ?) ORDER BY id"
+        params.append(limit)
+    else:
+        query = f"SELECT entry FROM job WHERE {where} ORDER BY id"
+    with history_db_lock:
+        rows = get_db().execute(query, params).fetchall()
+    entries = []
+    for row in rows:
+        entries.append(json.loads(row[0]))
+    return entries
+
+
+def get_timing_keys(step, entry):
+    # Simulations are also tracked per test and per test+seed for the regression scheduler
+    keys = [""]
+    if (step == 'simulation') and entry.get("test_name"):
+        keys.append(entry["test_name"])
+        keys.append(f"{entry['test_name']}.{entry.get('seed')}")
+    return keys
+
+
+def get_entry_duration(entry):
+    try:
+        start = datetime.strptime(entry['timestamp_start'], "%Y/%m/%d-%H:%M:%S")
+        end   = datetime.strptime(entry['timestamp_end'  ], "%Y/%m/%d-%H:%M:%S")
+    except (KeyError, TypeError, ValueError):
+        return None
+    return max(0, (end - start).total_seconds())
+
+
+def update_timing(db, ip_str, step, entry):
+    duration = get_entry_duration(entry)
+    if duration == None:
+        return
+    simulator = entry.get("simulator") or ""
+    for key in get_timing_keys(step, entry):
+        row = db.execute("SELECT count, ewma, recent FROM timing WHERE ip = ? AND simulator = ? AND step = ? AND key = ?",
+                         (ip_str, simulator, step, key)).fetchone()
+        if row == None:
+            count  = 1
+            ewma   = duration
+            recent = [duration]
+        else:
+            count  = row[0] + 1
+            ewma   = (timing_ewma_weight * duration) + ((1 - timing_ewma_weight) * row[1])
+            recent = (json.loads(row[2]) + [duration])[-timing_window_size:]
+        db.execute("INSERT OR REPLACE INTO timing (ip, simulator, step, key, count, ewma, recent) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                   (ip_str, simulator, step, key, count, ewma, json.dumps(recent)))
+
+
+def get_timing(ip_str, step, simulator="", key=""):
+    # Duration statistics in seconds, or None if this kind of job never completed
+    query  = "SELECT count, ewma, recent FROM timing WHERE ip = ? AND step = ? AND key = ?"
+    params = [ip_str, step, key]
+    if simulator != "":
+        query += " AND simulator = ?"
+        params.append(simulator)
+    with history_db_lock:
+        rows = get_db().execute(query, params).fetchall()
+    if len(rows) == 0:
+        return None
+    count  = 0
+    ewma   = 0
+    recent = []
+    for row in rows:
+        count  += row[0]
+        ewma   += row[1] * row[0]
+        recent += json.loads(row[2])
+    recent.sort()
+    return {
+        "count" : count,
+        "ewma"  : ewma / count,
+        "mean"  : sum(recent) / len(recent),
+        "p90"   : recent[min(len(recent) - 1, int(len(recent) * 0.9))],
+        "max"   : recent[-1]
+    }
+
+
+def build_timing():
+    # Timing statistics are derived once from existing entries, oldest first
+    row = history_db.execute("SELECT value FROM meta WHERE key = 'timing_built'").fetchone()
+    if row != None:
+        return
+    with history_db:
+        history_db.execute("DELETE FROM timing")
+        for ip_str, step, entry in history_db.execute("SELECT ip, step, entry FROM job ORDER BY id").fetchall():
+            update_timing(history_db, ip_str, step, json.loads(entry))
+        history_db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('timing_built', '1')")
+
+
+def prune():
+    # Runs at most once a day; timestamps are stored as '%Y/%m/%d-%H:%M:%S' and therefore sort chronologically
+    if cfg.job_history_retention_days <= 0:
+        return
+    today = datetime.now().strftime("%Y/%m/%d")
+    row = history_db.execute("SELECT value FROM meta WHERE key = 'last_prune'").fetchone()
+    if (row != None) and (row[0] == today):
+        return
+    cutoff = (datetime.now() - timedelta(days=cfg.job_history_retention_days)).strftime("%Y/%m/%d-%H:%M:%S")
+    with history_db:
+        num_pruned = history_db.execute("DELETE FROM job WHERE timestamp < ?", (cutoff,)).rowcount
+        history_db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_prune', ?)", (today,))
+    if num_pruned > 0:
+        common.dbg(f"Pruned {num_pruned} job history entries older than {cfg.job_history_retention_days} days")
+        history_db.execute("VACUUM")
+
+
+def import_yml_history():
+    # One-time import of the job history written by earlier versions of mio
+    if not os.path.exists(cfg.job_history_file_path):
+        return
+    try:
+        with open(cfg.job_history_file_path, 'r') as yaml_file_read:
+            yml = yaml.load(yaml_file_read, Loader=SafeLoader)
+        rows = []
+        if yml and yml.get('history'):
+            for ip_str in yml['history']:
+                for step in yml['history'][ip_str]:
+                    for entry in yml['history'][ip_str][step]:
+                        rows.append(convert_entry_to_row(ip_str, step, entry))
+        with history_db:
+            history_db.executemany(insert_job_statement, rows)
+        os.replace(cfg.job_history_file_path, cfg.job_history_file_path + ".imported")
+        common.dbg(f"Imported {len(rows)} job history entries from '{cfg.job_history_file_path}'")
+    except Exception as e:
+        common.warning(f"Could not import job history from '{cfg.job_history_file_path}': {e}")
@@ -10,18 +10,25 @@ from mio import user
 import yaml
 from yaml import SafeLoader
 
+import atexit
 import requests
 import getpass
 import tarfile
 import json
+import hashlib
+import io
+import re
 from pathlib import Path
 from base64 import b64decode
 import os
 import shutil
 from tqdm import tqdm
+from threading import Lock, get_ident
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 
-base_url          = "https://mooreio.com"#"http://localhost:8080"
+# MIO_MARKETPLACE_URL points mio at another marketplace instance (ex: a local mock server for testing)
+base_url          = os.getenv("MIO_MARKETPLACE_URL", "https://mooreio.com").rstrip("/")
 jwt_endpoint      = base_url + "/api/authenticate"
 ips_endpoint      = base_url + "/api/ips"
 versions_endpoint = base_url + "/api/versions"
@@ -29,99 +36,416 @@ version_endpoint  = base_url + "/api/version/"
 licenses_endpoint = base_url + "/api/licenses"
 headers = {}
 
+# Payloads are decoded and extracted this many base64 characters at a time
+payload_chunk_size = 1024 * 1024
 
-def install_ip(vendor, name, global_install, username="", password=""):
+# Installed IP versions are kept extracted under 'cfg.download_cache_path' and hard-linked into the IP directories:
+#   <cache>/<ip id>@<semver>[+license.<id>]/tree      : extracted payload
+#   <cache>/<ip id>@<semver>[+license.<id>]/.mio_entry: payload checksum and size, touched on every install (LRU)
+download_entry_marker_file_name = ".mio_entry"
+download_cache_lock_file_name   = ".lock"
+download_cache_needs_eviction   = False
+
+# All marketplace requests of an invocation share one pooled session; dependencies are downloaded and extracted
+# 'max_downloads' at a time
+max_downloads = 8
+session       = None
+session_lock  = Lock()
+
+
+class Catalog:
+    """Marketplace Catalog model"""
+    
+    def __init__(self, username="", password=""):
+        self.username = username
+        self.password = password
+        self.headers      = None
+        self.headers_lock = Lock()
+        self.lock         = Lock()
+        self.ips      = None
+        self.versions = None
+        self.licenses = None
+    
+    def get_headers(self):
+        # The token is only resolved (and the user only asked to log in) once something has to be requested
+        with self.headers_lock:
+            if self.headers == None:
+                token = user.get_token()
+                if token == None:
+                    token = user.login(self.username, self.password)
+                self.headers = {'Authorization':'Bearer ' + token}
+        return self.headers
+    
+    def get_list(self, endpoint):
+        response = get_session().get(endpoint + "?page=0&size=1000000", headers=self.get_headers())
+        common.dbg(f"Response from Moore.io IP Marketplace: '{response}'")
+        response.raise_for_status()
+        return response.json()
+    
+    def get_ips(self, name):
+        with self.lock:
+            if self.ips == None:
+                self.ips = {}
+                for ip in self.get_list(ips_endpoint):
+                    self.ips.setdefault(ip['name'], []).append(ip)
+        return self.ips.get(name, [])
+    
+    def get_version(self, ip_id):
+        with self.lock:
+            if self.versions == None:
+                self.versions = {}
+                for version in self.get_list(versions_endpoint):
+                    self.versions.setdefault(version['ip']['id'], version)
+        return self.versions.get(ip_id)
+    
+    def get_licenses(self, ip_id):
+        with self.lock:
+            if self.licenses == None:
+                self.licenses = {}
+                for license in self.get_list(licenses_endpoint):
+                    self.licenses.setdefault(license['targetIp']['id'], []).append(license)
+        return self.licenses.get(ip_id, [])
+
+
+def get_session():
+    global session
+    with session_lock:
+        if session == None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_downloads)
+            session.mount("http://" , adapter)
+            session.mount("https://", adapter)
+        return session
+
+
+def get_catalog(username="", password=""):
+    catalog = Catalog(username, password)
+    catalog.get_headers()
+    return catalog
+
+
+def install_ip(vendor, name, global_install, username="", password="", catalog=None):
     if global_install:
         location = cfg.user_global_ips_path
     else:
         location = cfg.dependencies_path
     common.dbg(f"Installing IP '{vendor}/{name}' under '{location}'")
-    query = {'name': name}
-    
-    token = user.get_token()
-    if token == None:
-        token = user.login(username, password)
+    if catalog == None:
+        catalog = get_catalog(username, password)
     
-    headers = {'Authorization':'Bearer ' + token}
-    response = requests.get(ips_endpoint + "?page=0&size=1000000", params=query, headers=headers)
-    json_data = response.json()
-    common.dbg(f"Response from Moore.io IP Marketplace: '{response}'")
-    payload = None
-    found_payload = False
-    version_str = ""
-    for ip in json_data:
-        if ip['name'] == name:
-            ip_id = ip['id']
-            common.dbg("Found IP! name=" + name + " id=" + str(ip_id))
-            license_type = ip['licenseType']
-            if license_type == "FREE_OPEN_SOURCE":
-                versions = requests.get(versions_endpoint + "?page=0&size=1000000", headers=headers).json()
-                for version in versions:
-                    if version['ip']['id'] == ip_id:
-                        version_str = version['semver']
-                        common.dbg("Found IP version on server: " + name + " v" + version_str)
-                        payload = version['publicPayload']
-                        found_payload = True
-                        filename = Path(location + "/" + vendor + "__" + name + '.tgz')
-                        filename.write_bytes(b64decode(payload))
-                        tar = tarfile.open(filename, "r:gz")
-                        ip_destination_path = f"{location}/{vendor}__{name}"
-                        common.remove_dir(ip_destination_path)
-                        common.create_dir(ip_destination_path)
-                        tar.extractall(ip_destination_path)
-                        tar.close()
-                        common.remove_file(filename)
-                        break
-            if license_type == "COMMERCIAL":
-                licenses = requests.get(licenses_endpoint + "?page=0&size=1000000", headers=headers).json()
-                for license in licenses:
-                    if license['targetIp']['id'] == ip_id:
-                        version_str = license['version']['semver']
-                        common.dbg("Found IP license on server: " + name)
-                        payload = license['payload']
-                        found_payload = True
-                        filename = Path(location + "/" + vendor + "__" + name + '.tgz')
-                        filename.write_bytes(b64decode(payload))
-                        tar = tarfile.open(filename, "r:gz")
-                        ip_destination_path = f"{location}/{vendor}__{name}"
-                        common.remove_dir(ip_destination_path)
-                        common.create_dir(ip_destination_path)
-                        tar.extractall(ip_destination_path)
-                        tar.close()
-                        common.remove_file(filename)
-    if not found_payload:
+    try:
+        ips = catalog.get_ips(name)
+    except Exception as e:
+        common.fatal(f"Failed to query Moore.io IP Marketplace: '{e}'")
+    resolution = None
+    ip_destination_path = f"{location}/{vendor}__{name}"
+    for ip in ips:
+        ip_id = ip['id']
+        common.dbg("Found IP! name=" + name + " id=" + str(ip_id))
+        license_type = ip['licenseType']
+        if license_type == "FREE_OPEN_SOURCE":
+            version = catalog.get_version(ip_id)
+            if version != None:
+                common.dbg("Found IP version on server: " + name + " v" + version['semver'])
+                resolution = {'kind' : "version", 'ip-id' : ip_id, 'id' : version['id'], 'version' : version['semver']}
+                resolution['sha256'] = install_payload(version, 'publicPayload', resolution, catalog, ip_destination_path)
+        if license_type == "COMMERCIAL":
+            for license in catalog.get_licenses(ip_id):
+                common.dbg("Found IP license on server: " + name)
+                resolution = {'kind' : "license", 'ip-id' : ip_id, 'id' : license['id'], 'version' : license['version']['semver']}
+                resolution['sha256'] = install_payload(license, 'payload', resolution, catalog, ip_destination_path)
+    if resolution == None:
         common.fatal(f"Could not find IP '{vendor}/{name}' on Moore.io IP Marketplace")
     
-    return version_str
+    return resolution
+
+
+def get_payload_url(resolution):
+    if resolution['kind'] == "license":
+        return licenses_endpoint + "/" + str(resolution['id'])
+    return version_endpoint + str(resolution['id'])
+
+
+def get_payload_field(resolution):
+    if resolution['kind'] == "license":
+        return 'payload'
+    return 'publicPayload'
+
+
+def get_download_cache_entry_path(resolution):
+    # Licensed payloads are specific to their license
+    key = f"{resolution['ip-id']}@{resolution['version']}"
+    if resolution['kind'] == "license":
+        key += f"+license.{resolution['id']}"
+    return cfg.download_cache_path + "/" + key
+
+
+def install_payload(entry, field, resolution, catalog, ip_destination_path):
+    global download_cache_needs_eviction
+    url    = get_payload_url(resolution)
+    sha256 = entry.get('payloadSha256', "")
+    try:
+        if cfg.download_cache_path == "":
+            return extract_payload(get_payload_chunks(entry, field, url, catalog), ip_destination_path, sha256)
+        entry_path = get_download_cache_entry_path(resolution)
+        with download_cache_lock():
+            if is_download_cached(entry_path, sha256):
+                common.dbg(f"Installing '{ip_destination_path}' from download cache entry '{entry_path}'")
+                link_tree(entry_path + "/tree", ip_destination_path)
+                os.utime(entry_path + "/" + download_entry_marker_file_name)
+                return get_download_cache_marker(entry_path)["sha256"]
+        digest = extract_payload(get_payload_chunks(entry, field, url, catalog), entry_path + "/tree", sha256)
+        with download_cache_lock():
+            with open(entry_path + "/" + download_entry_marker_file_name, 'w') as marker_file:
+                json.dump({"sha256" : digest, "size" : get_tree_size(entry_path + "/tree"), "timestamp" : common.timestamp()}, marker_file)
+            link_tree(entry_path + "/tree", ip_destination_path)
+        download_cache_needs_eviction = True
+        return digest
+    except Exception as e:
+        common.fatal(f"Failed to install payload into '{ip_destination_path}': {e}")
+
+
+def get_payload_chunks(entry, field, url, catalog):
+    # Catalog lists may omit payloads: those are then streamed from the version/license itself
+    if field in entry:
+        return iter_string_chunks(entry[field])
+    return iter_json_field_chunks(url, field, catalog.get_headers())
+
+
+def download_cache_lock(exclusive=False):
+    os.makedirs(cfg.download_cache_path, exist_ok=True)
+    return common.file_lock(cfg.download_cache_path + "/" + download_cache_lock_file_name, exclusive)
+
+
+def get_download_cache_marker(entry_path):
+    with open(entry_path + "/" + download_entry_marker_file_name, 'r') as marker_file:
+        return json.load(marker_file)
+
+
+def is_download_cached(entry_path, sha256=""):
+    if not os.path.exists(entry_path + "/" + download_entry_marker_file_name):
+        return False
+    marker = get_download_cache_marker(entry_path)
+    if (sha256 != "") and (marker.get("sha256") != sha256):
+        common.dbg(f"Download cache entry '{entry_path}' does not match the marketplace's payload")
+        return False
+    # Installed files are hard links to the entry's: an entry modified through one of its installs is not reused
+    if get_tree_size(entry_path + "/tree") != marker.get("size"):
+        common.warning(f"Download cache entry '{entry_path}' has been modified, downloading it again")
+        return False
+    return True
+
+
+def get_tree_size(path):
+    size = 0
+    for dir_path, dir_names, file_names in os.walk(path):
+        for file_name in file_names:
+            file_path = os.path.join(dir_path, file_name)
+            if not os.path.islink(file_path):
+                size += os.path.getsize(file_path)
+    return size
+
+
+def link_tree(src_path, ip_destination_path):
+    # Hard-link (or copy, across file systems) a tree into a temporary directory that then replaces the IP
+    temp_path = f"{ip_destination_path}.{os.getpid()}.{get_ident()}.tmp"
+    common.remove_dir(temp_path)
+    try:
+        for dir_path, dir_names, file_names in os.walk(src_path):
+            dest_dir_path = os.path.join(temp_path, os.path.relpath(dir_path, src_path))
+            os.makedirs(dest_dir_path, exist_ok=True)
+            for name in file_names + [name for name in dir_names if os.path.islink(os.path.join(dir_path, name))]:
+                file_path      = os.path.join(dir_path     , name)
+                dest_file_path = os.path.join(dest_dir_path, name)
+                if os.path.islink(file_path):
+                    os.symlink(os.readlink(file_path), dest_file_path)
+                else:
+                    try:
+                        os.link(file_path, dest_file_path)
+                    except OSError:
+                        shutil.copy2(file_path, dest_file_path)
+        common.remove_dir(ip_destination_path)
+        os.rename(temp_path, ip_destination_path)
+    finally:
+        common.remove_dir(temp_path)
+
+
+def get_download_cache_entries():
+    entries = []
+    for key in os.listdir(cfg.download_cache_path):
+        marker_path = cfg.download_cache_path + "/" + key + "/" + download_entry_marker_file_name
+        if os.path.exists(marker_path):
+            with open(marker_path, 'r') as marker_file:
+                size = json.load(marker_file).get("size", 0)
+            entries.append((os.path.getmtime(marker_path), size, cfg.download_cache_path + "/" + key))
+    return entries
+
+
+def evict_downloads():
+    # Delete the least recently used entries until the cache fits within its size limit
+    if (cfg.download_cache_path == "") or (cfg.download_cache_max_size_gb == 0):
+        return
+    max_size = cfg.download_cache_max_size_gb * (1024 ** 3)
+    try:
+        with download_cache_lock(exclusive=True):
+            entries = sorted(get_download_cache_entries())
+            size = sum([entry[1] for entry in entries])
+            for mtime, entry_size, entry_path in entries:
+                if size <= max_size:
+                    break
+                common.dbg(f"Evicting download cache entry '{entry_path}'")
+                shutil.rmtree(entry_path, ignore_errors=True)
+                size -= entry_size
+    except OSError as e:
+        common.warning(f"Failed to evict entries from the download cache: {e}")
+
+
+def evict_downloads_if_needed():
+    if download_cache_needs_eviction:
+        evict_downloads()
+atexit.register(evict_downloads_if_needed)
+
+
+class Base64Reader(io.RawIOBase):
+    """Base64 Reader model"""
+    
+    def __init__(self, chunks):
+        self.chunks  = chunks
+        self.pending = b""
+        self.data    = memoryview(b"")
+        self.hash    = hashlib.sha256()
+        self.size    = 0
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        while len(self.data) == 0:
+            chunk = next(self.chunks, None)
+            if chunk == None:
+                if len(self.pending) > 0:
+                    raise ValueError("Truncated base64 payload")
+                return 0
+            if type(chunk) is str:
+                chunk = chunk.encode("ascii")
+            # Decode whole 4-character groups only: the rest waits for the next chunk
+            chunk = self.pending + chunk.replace(b"\n", b"").replace(b"\r", b"")
+            length = len(chunk) - (len(chunk) % 4)
+            self.pending = chunk[length:]
+            decoded = b64decode(chunk[:length], validate=True)
+            self.hash.update(decoded)
+            self.size += len(decoded)
+            self.data = memoryview(decoded)
+        length = min(len(buffer), len(self.data))
+        buffer[:length] = self.data[:length]
+        self.data = self.data[length:]
+        return length
+
+
+def iter_string_chunks(payload):
+    for start in range(0, len(payload), payload_chunk_size):
+        yield payload[start:start + payload_chunk_size]
+
+
+def iter_json_field_chunks(url, field, headers):
+    # Yields the value of a string field from a JSON response as it is received, without parsing the whole document
+    response = get_session().get(url, headers=headers, stream=True)
+    response.raise_for_status()
+    field_regex = re.compile(b'"' + re.escape(field.encode()) + b'"\\s*:\\s*"')
+    buffer = b""
+    found  = False
+    with response:
+        for chunk in response.iter_content(chunk_size=payload_chunk_size):
+            buffer += chunk
+            if not found:
+                match = field_regex.search(buffer)
+                if match == None:
+                    buffer = buffer[-(len(field) + 64):]
+                    continue
+                found  = True
+                buffer = buffer[match.end():]
+            end = buffer.find(b'"')
+            if end != -1:
+                yield buffer[:end].replace(b"\\/", b"/")
+                return
+            # JSON may escape '/' as '\/': never split such a sequence
+            if buffer.endswith(b"\\"):
+                yield buffer[:-1].replace(b"\\/", b"/")
+                buffer = buffer[-1:]
+            else:
+                yield buffer.replace(b"\\/", b"/")
+                buffer = b""
+    raise ValueError(f"Field '{field}' not found in response from '{url}'")
+
+
+def extract_payload(chunks, ip_destination_path, sha256=""):
+    # The payload is decoded and extracted as it arrives into a temporary directory that only replaces the IP once the
+    # archive has been verified
+    temp_path = f"{ip_destination_path}.{os.getpid()}.{get_ident()}.tmp"
+    common.remove_dir(temp_path)
+    os.makedirs(temp_path)
+    try:
+        reader = Base64Reader(chunks)
+        with tarfile.open(fileobj=reader, mode="r|gz") as tar:
+            tar.extractall(temp_path)
+        while reader.read(payload_chunk_size):
+            pass
+        digest = reader.hash.hexdigest()
+        if (sha256 != "") and (digest != sha256):
+            raise ValueError(f"Checksum mismatch: expected '{sha256}', got '{digest}'")
+        common.remove_dir(ip_destination_path)
+        os.rename(temp_path, ip_destination_path)
+    finally:
+        common.remove_dir(temp_path)
+    return digest
 
 
 def install_ip_dep_list(ip, ip_list, global_install, username="", password=""):
-    versions = {}
+    versions    = {}
+    resolutions = {}
     if len(ip_list) > 0:
-        #with alive_bar(len(ip_list), bar = 'smooth') as bar:
-        with tqdm(ip_list) as pbar:
-            for dep_ip in ip_list:
-                vendor, name = common.parse_dep(dep_ip)
-                ip_str = f"{vendor}/{name}"
-                pbar.set_description(ip_str)
-                versions[ip_str] = install_ip(vendor, name, global_install, username="", password="")
-                pbar.update(1)
+        # The token and the catalog are resolved once, before any download starts
+        catalog = get_catalog(username, password)
+        with tqdm(total=len(ip_list)) as pbar:
+            with ThreadPoolExecutor(max_workers=max_downloads) as executor:
+                futures = {}
+                for dep_ip in ip_list:
+                    vendor, name = common.parse_dep(dep_ip)
+                    ip_str = f"{vendor}/{name}"
+                    futures[executor.submit(install_ip, vendor, name, global_install, catalog=catalog)] = ip_str
+                for future in as_completed(futures):
+                    ip_str = futures[future]
+                    resolutions[ip_str] = future.result()
+                    versions[ip_str]    = resolutions[ip_str]['version']
+                    pbar.set_description(ip_str)
+                    pbar.update(1)
         cache.scan_and_load_ip_metadata()
-        update_lock_file(ip, versions)
+        update_lock_file(ip, versions, resolutions)
 
 
-def install_ip_and_deps(vendor, name, global_install, username="", password=""):
+def install_ip_and_deps(vendor, name, global_install, username="", password="", frozen=False):
     ip = {}
     if vendor == "":
         ip = cache.get_anon_ip(name)
     else:
         ip = cache.get_ip(vendor, name)
     if ip == None:
+        if frozen:
+            common.fatal(f"IP '{vendor}/{name}' must be present in the project to install its dependencies with '--frozen'")
         common.banner(f"Installing IP '{vendor}/{name}'")
-        install_ip(vendor, name, global_install, username="", password="")
+        install_ip(vendor, name, global_install, username, password)
         cache.scan_and_load_ip_metadata()
         ip = cache.get_ip(vendor, name)
     
+    ip_list = get_dep_list(ip)
+    if frozen:
+        install_frozen_dep_list(ip, ip_list, global_install, username, password)
+    else:
+        common.info(f"Installing {len(ip_list)} dependencies")
+        install_ip_dep_list(ip, ip_list, global_install, username, password)
+
+
+def get_dep_list(ip):
     ip_list = []
     for dep in ip.dependencies:
         if dep.target_ip_model == None:
@@ -131,24 +455,78 @@ def install_ip_and_deps(vendor, name, global_install, username="", password=""):
             if dep.target_ip_model.is_local == False:
                 ip_str = f"{dep.vendor}/{dep.target_ip}"
                 ip_list.append(ip_str)
-    common.info(f"Installing {len(ip_list)} dependencies")
-    install_ip_dep_list(ip, ip_list, global_install, username="", password="")
+    return ip_list
+
+
+def read_lock_file_resolutions(ip):
+    lock_file_path = ip.path + "/ip.lock.yml"
+    if not os.path.exists(lock_file_path):
+        return {}
+    try:
+        with open(lock_file_path, 'r') as yaml_file_read:
+            ymlr = yaml.load(yaml_file_read, Loader=SafeLoader)
+    except Exception as e:
+        common.fatal(f"Failed to read '{lock_file_path}': {e}")
+    if (type(ymlr) is not dict) or (type(ymlr.get('resolution')) is not dict):
+        return {}
+    return ymlr['resolution']
 
 
-def update_lock_file(ip, versions={}):
+def is_dep_installed(ip_str, resolution):
+    vendor, name = common.parse_dep(ip_str)
+    dep_ip = cache.get_ip(vendor, name)
+    return (dep_ip != None) and (not dep_ip.is_local) and (str(dep_ip.version) == str(resolution['version']))
+
+
+def install_frozen_dep_list(ip, ip_list, global_install, username="", password=""):
+    # Dependencies are installed exactly as resolved in 'ip.lock.yml': only the payloads missing from the vendors
+    # directories and from the download cache are fetched, without any catalog query
+    resolutions = read_lock_file_resolutions(ip)
+    for ip_str in ip_list:
+        if ip_str not in resolutions:
+            common.fatal(f"Dependency '{ip_str}' is not pinned in '{ip.path}/ip.lock.yml': run 'mio install' without '--frozen' to update it")
+    missing = [ip_str for ip_str in ip_list if not is_dep_installed(ip_str, resolutions[ip_str])]
+    common.info(f"Installing {len(missing)} of {len(ip_list)} locked dependencies")
+    if len(missing) == 0:
+        return
+    # Only used to authenticate payload downloads: nothing is requested when all payloads are in the download cache
+    catalog = Catalog(username, password)
+    if global_install:
+        location = cfg.user_global_ips_path
+    else:
+        location = cfg.dependencies_path
+    with tqdm(total=len(missing)) as pbar:
+        with ThreadPoolExecutor(max_workers=max_downloads) as executor:
+            futures = {}
+            for ip_str in missing:
+                vendor, name = common.parse_dep(ip_str)
+                resolution = resolutions[ip_str]
+                entry      = {'payloadSha256' : resolution.get('sha256', "")}
+                futures[executor.submit(install_payload, entry, get_payload_field(resolution), resolution, catalog, f"{location}/{vendor}__{name}")] = ip_str
+            for future in as_completed(futures):
+                future.result()
+                pbar.set_description(futures[future])
+                pbar.update(1)
+    cache.scan_and_load_ip_metadata()
+
+
+def update_lock_file(ip, versions={}, resolutions={}):
     ip_file_path   = ip.path + "/ip.yml"
     lock_file_path = ip.path + "/ip.lock.yml"
+    # Resolutions of dependencies that were not installed this time are kept as long as their version is unchanged
+    previous_resolutions = read_lock_file_resolutions(ip)
     try:
         common.copy_file(ip_file_path, lock_file_path)
         with open(lock_file_path, 'r') as yaml_file_read:
             ymlr = yaml.load(yaml_file_read, Loader=SafeLoader)
+            resolution = {}
             if 'dependencies' in ymlr:
                 if type(ymlr['dependencies']) is dict:
                     for dep in ymlr['dependencies']:
+                        vendor, name = common.parse_dep(dep.strip().lower().replace("@", ""))
                         if dep in versions:
                             ymlr['dependencies'][dep] = versions[dep]
                         else:
-                            vendor, name = common.parse_dep(dep.strip().lower().replace("@", ""))
                             if vendor == "":
                                 dep_ip = cache.get_anon_ip(name, True)
                             else:
@@ -157,8 +535,15 @@ def update_lock_file(ip, versions={}):
                                 ymlr['dependencies'][dep] = '@local'
                             else:
                                 ymlr['dependencies'][dep] = dep_ip.version
+                        ip_str = f"{vendor}/{name}"
+                        if ip_str in resolutions:
+                            resolution[ip_str] = resolutions[ip_str]
+                        elif ip_str in previous_resolutions:
+                            if str(previous_resolutions[ip_str].get('version')) == str(ymlr['dependencies'][dep]):
+                                resolution[ip_str] = previous_resolutions[ip_str]
+            if len(resolution) > 0:
+                ymlr['resolution'] = resolution
         with open(lock_file_path, 'w') as yaml_file_write:
             yaml.dump(ymlr, yaml_file_write)
     except Exception as e:
         common.fatal(f"Failed to update '{lock_file_path}': {e}")
-
@@ -0,0 +1,169 @@
+# Copyright 2021-2023 Datum Technology Corporation
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.1
+########################################################################################################################
+
+
+from mio import cfg
+from mio import common
+
+import atexit
+import hashlib
+import json
+import os
+import shutil
+from threading import get_ident
+
+
+# Compiled libraries of external IPs shared between workspaces (ex: on NFS):
+#   <cache>/<simulator>/<vendor>__<name>/<key>/lib       : compiled library
+#   <cache>/<simulator>/<vendor>__<name>/<key>/cmp.log   : compilation log
+#   <cache>/<simulator>/<vendor>__<name>/<key>/.mio_entry: written last, touched on every fetch (LRU)
+# Entries are published with an atomic rename; '.lock' keeps eviction from deleting entries being fetched.
+entry_marker_file_name = ".mio_entry"
+lock_file_name         = ".lock"
+needs_eviction         = False
+
+
+def is_enabled(ip, sim_job):
+    if (cfg.library_cache_path == "") or ip.is_local or sim_job.dry_run or sim_job.bwrap:
+        return False
+    return get_library_path(ip, sim_job) != ""
+
+
+def get_library_path(ip, sim_job):
+    # Only simulators that compile each IP into its own library can share them
+    sim_str = common.get_simulator_short_name(sim_job.simulator)
+    if sim_job.simulator == common.simulators_enum.VIVADO:
+        return cfg.sim_output_dir + "/" + sim_str + "/cmp_out/" + f"{ip.vendor}__{ip.name}"
+    elif sim_job.simulator == common.simulators_enum.QUESTA:
+        return cfg.sim_output_dir + "/" + sim_str + "/sim_wd/" + ip.name
+    return ""
+
+
+def get_compiler_path(sim_job):
+    if sim_job.simulator == common.simulators_enum.VIVADO:
+        return cfg.vivado_home + "/xvlog"
+    elif sim_job.simulator == common.simulators_enum.QUESTA:
+        return cfg.questa_home + "/vlog"
+    return ""
+
+
+def get_simulator_version(sim_job):
+    # Installations are identified by their compiler binary rather than by running it to query its version
+    path = os.path.realpath(os.path.expandvars(get_compiler_path(sim_job)))
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return path
+    return f"{path}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def get_entry_key(build_key, sim_job):
+    # 'build_key' already covers the IP contents, defines, compilation arguments and dependency builds
+    return hashlib.md5(f"{build_key}\n{get_simulator_version(sim_job)}".encode()).hexdigest()
+
+
+def get_entry_path(ip, sim_job, build_key):
+    sim_str = common.get_simulator_short_name(sim_job.simulator)
+    return cfg.library_cache_path + "/" + sim_str + "/" + f"{ip.vendor}__{ip.name}" + "/" + get_entry_key(build_key, sim_job)
+
+
+def lock(exclusive=False):
+    os.makedirs(cfg.library_cache_path, exist_ok=True)
+    return common.file_lock(cfg.library_cache_path + "/" + lock_file_name, exclusive)
+
+
+def fetch(ip, sim_job, build_key, log_file_path):
+    entry_path = get_entry_path(ip, sim_job, build_key)
+    lib_path   = get_library_path(ip, sim_job)
+    try:
+        with lock():
+            if not os.path.exists(entry_path + "/" + entry_marker_file_name):
+                return False
+            if os.path.exists(lib_path):
+                shutil.rmtree(lib_path)
+            shutil.copytree(entry_path + "/lib", lib_path, symlinks=True)
+            shutil.copyfile(entry_path + "/cmp.log", log_file_path)
+    except OSError as e:
+        common.warning(f"Failed to fetch IP '{ip.vendor}/{ip.name}' from the library cache: {e}")
+        return False
+    try:
+        os.utime(entry_path + "/" + entry_marker_file_name)
+    except OSError:
+        pass
+    common.dbg(f"Fetched IP '{ip.vendor}/{ip.name}' from library cache entry '{entry_path}'")
+    return True
+
+
+def publish(ip, sim_job, build_key, log_file_path):
+    global needs_eviction
+    entry_path = get_entry_path(ip, sim_job, build_key)
+    if os.path.exists(entry_path):
+        return
+    temp_path = f"{entry_path}.{os.getpid()}.{get_ident()}.tmp"
+    try:
+        shutil.copytree(get_library_path(ip, sim_job), temp_path + "/lib", symlinks=True)
+        shutil.copyfile(log_file_path, temp_path + "/cmp.log")
+        with open(temp_path + "/" + entry_marker_file_name, 'w') as marker_file:
+            json.dump({"ip" : f"{ip.vendor}/{ip.name}", "size" : get_size(temp_path), "timestamp" : common.timestamp()}, marker_file)
+        os.rename(temp_path, entry_path)
+        needs_eviction = True
+        common.dbg(f"Published IP '{ip.vendor}/{ip.name}' to library cache entry '{entry_path}'")
+    except OSError as e:
+        # Ex: another workspace published the same entry first
+        common.dbg(f"Did not publish IP '{ip.vendor}/{ip.name}' to the library cache: {e}")
+    finally:
+        if os.path.exists(temp_path):
+            shutil.rmtree(temp_path, ignore_errors=True)
+
+
+def get_size(path):
+    size = 0
+    for dir_path, dir_names, file_names in os.walk(path):
+        for file_name in file_names:
+            file_path = os.path.join(dir_path, file_name)
+            if not os.path.islink(file_path):
+                size += os.path.getsize(file_path)
+    return size
+
+
+def get_entries():
+    entries = []
+    for sim_str in os.listdir(cfg.library_cache_path):
+        sim_path = cfg.library_cache_path + "/" + sim_str
+        if not os.path.isdir(sim_path):
+            continue
+        for ip_dir_name in os.listdir(sim_path):
+            ip_path = sim_path + "/" + ip_dir_name
+            for key in os.listdir(ip_path):
+                marker_path = ip_path + "/" + key + "/" + entry_marker_file_name
+                if os.path.exists(marker_path):
+                    with open(marker_path, 'r') as marker_file:
+                        size = json.load(marker_file).get("size", 0)
+                    entries.append((os.path.getmtime(marker_path), size, ip_path + "/" + key))
+    return entries
+
+
+def evict():
+    # Delete the least recently used entries until the cache fits within its size limit
+    if (cfg.library_cache_path == "") or (cfg.library_cache_max_size_gb == 0):
+        return
+    max_size = cfg.library_cache_max_size_gb * (1024 ** 3)
+    try:
+        with lock(exclusive=True):
+            entries = sorted(get_entries())
+            size = sum([entry[1] for entry in entries])
+            for mtime, entry_size, entry_path in entries:
+                if size <= max_size:
+                    break
+                common.dbg(f"Evicting library cache entry '{entry_path}'")
+                shutil.rmtree(entry_path, ignore_errors=True)
+                size -= entry_size
+    except OSError as e:
+        common.warning(f"Failed to evict entries from the library cache: {e}")
+
+
+def evict_if_needed():
+    if needs_eviction:
+        evict()
+atexit.register(evict_if_needed)
@@ -22,10 +22,11 @@ from base64 import b64encode
 import os
 import shutil
 from tqdm import tqdm
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import fileinput
 
 
-base_url          = "https://mooreio.com"#"http://localhost:8080"
+base_url          = os.getenv("MIO_MARKETPLACE_URL", "https://mooreio.com").rstrip("/")
 jwt_endpoint      = base_url + "/api/authenticate"
 ips_endpoint      = base_url + "/api/ips"
 versions_endpoint = base_url + "/api/versions"
@@ -189,35 +190,29 @@ def package_ip(ip, encrypt=False, destination="", create_tarball=True, org_id=""
         src_dir = temp_location + "/" + ip.src_path
         insert_key_checks(src_dir, ip, org_id, ip_id, ip_key)
         
-        if ip.simulators_supported[common.simulators_enum.VIVADO] != "":
-            viv_src_dir = src_dir + ".viv"
-            common.copy_directory(src_dir, viv_src_dir)
-            eal.encrypt_tree(ip_name, viv_src_dir, "viv")
-        
-        if ip.simulators_supported[common.simulators_enum.VCS] != "":
-            vcs_src_dir = src_dir + ".vcs"
-            common.copy_directory(src_dir, vcs_src_dir)
-            eal.encrypt_tree(ip_name, vcs_src_dir, "vcs")
-        
-        if ip.simulators_supported[common.simulators_enum.METRICS] != "":
-            mtr_src_dir = src_dir + ".mdc"
-            common.copy_directory(src_dir, mtr_src_dir)
-            eal.encrypt_tree(ip_name, mtr_src_dir, "mdc")
-        
-        if ip.simulators_supported[common.simulators_enum.QUESTA] != "":
-            qst_src_dir = src_dir + ".qst"
-            common.copy_directory(src_dir, qst_src_dir)
-            eal.encrypt_tree(ip_name, qst_src_dir, "qst")
-        
-        if ip.simulators_supported[common.simulators_enum.XCELIUM] != "":
-            xcl_src_dir = src_dir + ".xcl"
-            common.copy_directory(src_dir, xcl_src_dir)
-            eal.encrypt_tree(ip_name, xcl_src_dir, "xcl")
-        
-        if ip.simulators_supported[common.simulators_enum.RIVIERA] != "":
-            riv_src_dir = src_dir + ".riv"
-            common.copy_directory(src_dir, riv_src_dir)
-            eal.encrypt_tree(ip_name, riv_src_dir, "riv")
+        viv_src_dir = src_dir + ".viv"
+        vcs_src_dir = src_dir + ".vcs"
+        mtr_src_dir = src_dir + ".mdc"
+        qst_src_dir = src_dir + ".qst"
+        xcl_src_dir = src_dir + ".xcl"
+        riv_src_dir = src_dir + ".riv"
+        sim_src_dirs = {
+            common.simulators_enum.VIVADO : [viv_src_dir, "viv"],
+            common.simulators_enum.VCS    : [vcs_src_dir, "vcs"],
+            common.simulators_enum.METRICS: [mtr_src_dir, "mdc"],
+            common.simulators_enum.QUESTA : [qst_src_dir, "qst"],
+            common.simulators_enum.XCELIUM: [xcl_src_dir, "xcl"],
+            common.simulators_enum.RIVIERA: [riv_src_dir, "riv"]
+        }
+        # Each simulator encrypts its own copy of the sources: the copies are encrypted concurrently
+        with ThreadPoolExecutor(max_workers=sims_supported) as executor:
+            futures = []
+            for simulator in sim_src_dirs:
+                if ip.simulators_supported[simulator] != "":
+                    sim_src_dir, app = sim_src_dirs[simulator]
+                    futures.append(executor.submit(encrypt_src_dir, ip_name, src_dir, sim_src_dir, app))
+            for future in as_completed(futures):
+                future.result()
         
         if create_tarball:
             try:
@@ -288,6 +283,31 @@ def package_ip(ip, encrypt=False, destination="", create_tarball=True, org_id=""
         return destination + "/" + ip.name
 
 
+def encrypt_src_dir(ip_name, src_dir, sim_src_dir, app):
+    stage_src_dir(src_dir, sim_src_dir)
+    eal.encrypt_tree(ip_name, sim_src_dir, app)
+
+
+def stage_src_dir(src_dir, sim_src_dir):
+    # Only the HDL files are rewritten by encryption: they are copied while all other files are hard-linked
+    for dir_path, dir_names, file_names in os.walk(src_dir, followlinks=True):
+        dest_dir_path = os.path.join(sim_src_dir, os.path.relpath(dir_path, src_dir))
+        os.makedirs(dest_dir_path, exist_ok=True)
+        for file_name in file_names:
+            file_path      = os.path.join(dir_path     , file_name)
+            dest_file_path = os.path.join(dest_dir_path, file_name)
+            if os.path.lexists(dest_file_path):
+                os.remove(dest_file_path)
+            if eal.is_hdl_file(file_path) or os.path.islink(file_path):
+                shutil.copy2(file_path, dest_file_path)
+            else:
+                try:
+                    os.link(file_path, dest_file_path)
+                except OSError:
+                    # Ex: file system without hard links
+                    shutil.copy2(file_path, dest_file_path)
+
+
 def publish_ip(ip_str, username="", password="", org=""):
     vendor, name = common.parse_dep(ip_str)
     if vendor == "":
@@ -11,24 +11,20 @@ from mio import cov
 from mio import cfg
 from mio import results
 from mio import cli
+from mio import history
 
 import yaml
 from yaml.loader import SafeLoader
 from tqdm import tqdm
-from multiprocessing import Process
-import threading
-from threading import BoundedSemaphore
-from threading import Thread
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed, TimeoutError
 import os
 import random
 import math
-import time
 from datetime import datetime
 
 
 bar = None
-sem = None
-sem_cfg = None
 
 
 class TestSuite:
@@ -50,6 +46,12 @@ class TestSuite:
         self.cov               = []
         self.max_durations     = []
         self.max_jobs          = []
+        self.abort_failures    = {}
+        self.abort_rates       = {}
+        self.abort_min_tests   = {}
+        self.abort_on_fatal    = []
+        self.test_durations    = {}
+        self.test_cpu_times    = {}
         if simulator == "viv":
             self.simulator = common.simulators_enum.VIVADO
         elif simulator == "mdc":
@@ -172,6 +174,64 @@ class TestSuite:
         else:
             common.fatal("No 'max-jobs' entry in test-suite settings!")
         
+        if 'abort-on-failures' in yml['test-suite']['settings']:
+            self.abort_failures = yml['test-suite']['settings']['abort-on-failures']
+            if type(self.abort_failures) is not dict:
+                common.fatal("'abort-on-failures' must be a dictionary!")
+            for abort in self.abort_failures:
+                if not isinstance(abort, str):
+                    common.fatal("'abort-on-failures' entry key is not a string!")
+                if not (type(self.abort_failures[abort]) == int):
+                    common.fatal("'abort-on-failures' entry is not an integer!")
+        
+        if 'abort-on-failure-rate' in yml['test-suite']['settings']:
+            self.abort_rates = yml['test-suite']['settings']['abort-on-failure-rate']
+            if type(self.abort_rates) is not dict:
+                common.fatal("'abort-on-failure-rate' must be a dictionary!")
+            for abort in self.abort_rates:
+                if not isinstance(abort, str):
+                    common.fatal("'abort-on-failure-rate' entry key is not a string!")
+                if not (type(self.abort_rates[abort]) in [int, float]):
+                    common.fatal("'abort-on-failure-rate' entry is not a number!")
+        
+        if 'abort-min-tests' in yml['test-suite']['settings']:
+            self.abort_min_tests = yml['test-suite']['settings']['abort-min-tests']
+            if type(self.abort_min_tests) is not dict:
+                common.fatal("'abort-min-tests' must be a dictionary!")
+            for abort in self.abort_min_tests:
+                if not isinstance(abort, str):
+                    common.fatal("'abort-min-tests' entry key is not a string!")
+                if not (type(self.abort_min_tests[abort]) == int):
+                    common.fatal("'abort-min-tests' entry is not an integer!")
+        
+        if 'max-test-duration' in yml['test-suite']['settings']:
+            self.test_durations = yml['test-suite']['settings']['max-test-duration']
+            if type(self.test_durations) is not dict:
+                common.fatal("'max-test-duration' must be a dictionary!")
+            for duration in self.test_durations:
+                if not isinstance(duration, str):
+                    common.fatal("'max-test-duration' entry key is not a string!")
+                if not (type(self.test_durations[duration]) in [int, float]):
+                    common.fatal("'max-test-duration' entry is not a number!")
+        
+        if 'max-test-cpu-time' in yml['test-suite']['settings']:
+            self.test_cpu_times = yml['test-suite']['settings']['max-test-cpu-time']
+            if type(self.test_cpu_times) is not dict:
+                common.fatal("'max-test-cpu-time' must be a dictionary!")
+            for duration in self.test_cpu_times:
+                if not isinstance(duration, str):
+                    common.fatal("'max-test-cpu-time' entry key is not a string!")
+                if not (type(self.test_cpu_times[duration]) in [int, float]):
+                    common.fatal("'max-test-cpu-time' entry is not a number!")
+        
+        if 'abort-on-fatal' in yml['test-suite']['settings']:
+            self.abort_on_fatal = yml['test-suite']['settings']['abort-on-fatal']
+            if type(self.abort_on_fatal) is not list:
+                common.fatal("'abort-on-fatal' must be a list!")
+            for abort in self.abort_on_fatal:
+                if not isinstance(abort, str):
+                    common.fatal("'abort-on-fatal' entry is not a string")
+        
         set_count = 0
         common.dbg("Parsing sets")
         for set in yml:
@@ -210,13 +270,13 @@ class TestSuite:
                                     common.fatal(f"value of '{regr_item}' is less than 1: '{set}.{group}.{test}.{regr}'")
                                 for ii in range(regr_item):
                                     seed = random.randint(1, 2147483646)
-                                    regression.add_test(test, seed, args)
+                                    regression.add_test(test, seed, args, group_obj)
                             elif type(regr_item) is list:
                                 # Specifying specific seeds to run
                                 for seed in regr_item:
                                     if not (type(seed) == int):
                                         common.fatal(f"seed value '{str(seed)}' is not an integer: '{set}.{group}.{test}.{regr}'!")
-                                    regression.add_test(test, seed, args)
+                                    regression.add_test(test, seed, args, group_obj)
                             else:
                                 common.fatal(f"Illegal regression entry: '{set}.{group}.{test}.{regr}'")
                         else:
@@ -239,13 +299,13 @@ class TestSuite:
                                         common.fatal(f"'seeds' value '{regr_item['seeds']}' is less than 1: '{set}.{group}.{test}.{regr}'")
                                     for ii in range(regr_item['seeds']):
                                         seed = random.randint(1, 2147483646)
-                                        regression.add_test(test, seed, args)
+                                        regression.add_test(test, seed, args, group_obj)
                                 elif type(regr_item['seeds']) is list:
                                     # Specifying specific seeds to run
                                     for seed in regr['seeds']:
                                         if not (type(seed) == int):
                                             common.fatal(f"seed value '{str(seed)}' is not an integer: '{set}.{group}.{test}.{regr}'!")
-                                        regression.add_test(test, seed, args)
+                                        regression.add_test(test, seed, args, group_obj)
                                 else:
                                     common.fatal(f"Illegal regression entry: '{set}.{group}.{test}.{regr}'")
 
@@ -283,6 +343,18 @@ class TestSuite:
             #    common.fatal(f"'max-jobs' entry '{max}' is not a regression declared in this test suite")
             if max in self.regr:
                 self.regr[max].max_jobs = self.max_jobs[max]
+        for abort in self.abort_failures:
+            if abort in self.regr:
+                self.regr[abort].abort_failures = self.abort_failures[abort]
+        for abort in self.abort_rates:
+            if abort in self.regr:
+                self.regr[abort].abort_rate = self.abort_rates[abort]
+        for abort in self.abort_min_tests:
+            if abort in self.regr:
+                self.regr[abort].abort_min_tests = self.abort_min_tests[abort]
+        for abort in self.abort_on_fatal:
+            if abort in self.regr:
+                self.regr[abort].abort_on_fatal = True
     
     def add_test_set(self, set):
         if set.name in self.sets:
@@ -340,11 +412,18 @@ class TestSuite:
             sim_job.cov = False
         return sim_job
     
+    def get_test_limit(self, limits, test_group):
+        # Limits are specified in minutes for 'set.group', 'group' or 'default', and returned in seconds
+        for key in [f"{test_group.set.name}.{test_group.name}", test_group.name, "default"]:
+            if key in limits:
+                return int(limits[key] * 60)
+        return 0
+    
     def get_regression(self, regr_name):
         for reg in self.regr:
             if self.regr[reg].name == regr_name:
                 return self.regr[reg]
-        commmon.fatal(f"Could not find regression '{regr_name}'")
+        common.fatal(f"Could not find regression '{regr_name}'")
 
 
 class TestSet:
@@ -385,40 +464,47 @@ class Regression:
     """Regression model"""
 
     def __init__(self, name, group, set, suite):
-        self.name         = name
-        self.tests        = []
-        self.set          = set
-        self.group        = group
-        self.suite        = suite
-        self.max_duration = 0
-        self.max_jobs     = 1
+        self.name            = name
+        self.tests           = []
+        self.set             = set
+        self.group           = group
+        self.suite           = suite
+        self.max_duration    = 0
+        self.max_jobs        = 1
+        self.abort_failures  = 0
+        self.abort_rate      = 0
+        self.abort_min_tests = 10
+        self.abort_on_fatal  = False
     
-    def add_test(self, name, seed, args):
-        test = RegressionTest(name, self, self.group, self.set, self.suite, seed, args)
+    def add_test(self, name, seed, args, group):
+        test = RegressionTest(name, self, group, self.set, self.suite, seed, args)
         self.tests.append(test)
-        common.dbg(f"Test '{name}' added to group '{self.group.name}'")
+        common.dbg(f"Test '{name}' added to group '{group.name}'")
     
     def get_tests(self):
         return self.tests
     
+    def get_abort_reason(self, num_done, num_failed, summary):
+        if self.abort_on_fatal and (summary.get("num_fatals", 0) > 0):
+            return f"test '{summary.get('test_name')}' (seed {summary.get('seed')}) ended with a fatal error"
+        if (self.abort_failures > 0) and (num_failed >= self.abort_failures):
+            return f"{num_failed} test(s) failed"
+        if (self.abort_rate > 0) and (num_done >= self.abort_min_tests):
+            failure_rate = (num_failed * 100) / num_done
+            if failure_rate > self.abort_rate:
+                return f"{failure_rate:.1f}% of {num_done} test(s) failed"
+        return ""
+    
     def reduce(self):
-        removal_list = []
-        ii = 0
-        for curr_test in self.tests:
-            jj = 0
-            for other_test in self.tests:
-                if other_test == curr_test:
-                    continue
-                else:
-                    if (jj not in removal_list):
-                        if curr_test.is_equal(other_test):
-                            removal_list.append(ii)
-                jj += 1
-            ii += 1
-        if len(removal_list) > 0:
-            common.warning(f"Found {len(removal_list)} redundancies in regression '{name}'")
-            for index in removal_list:
-                self.tests[index].remove(index)
+        unique_tests = {}
+        for test in self.tests:
+            key = test.get_key()
+            if key not in unique_tests:
+                unique_tests[key] = test
+        num_redundancies = len(self.tests) - len(unique_tests)
+        if num_redundancies > 0:
+            common.warning(f"Found {num_redundancies} redundancies in regression '{self.name}'")
+            self.tests = list(unique_tests.values())
 
 
 class RegressionTest:
@@ -446,6 +532,8 @@ class RegressionTest:
         sim_job.gui       = False
         sim_job.simulator = self.suite.simulator
         sim_job.raw_args  = self.args
+        sim_job.max_duration = self.suite.get_test_limit(self.suite.test_durations, self.test_group)
+        sim_job.max_cpu_time = self.suite.get_test_limit(self.suite.test_cpu_times, self.test_group)
         if cfg.regression_name in self.suite.waves:
             sim_job.waves = True
         else:
@@ -461,22 +549,11 @@ class RegressionTest:
         
         return sim_job
     
+    def get_key(self):
+        return (self.name, self.seed, tuple(sorted(str(arg) for arg in self.args)))
+    
     def is_equal(self, other):
-        if self.name != other.name:
-            return False
-        if self.regression != other.regression:
-            return False
-        if self.test_group != other.test_group:
-            return False
-        if self.set != other.set:
-            return False
-        if self.suite != other.suite:
-            return False
-        if self.seed != other.seed:
-            return False
-        if self.args.sort() != other.args.sort():
-            return False
-        return True
+        return self.get_key() == other.get_key()
 
 
 def main(ip_str, regression, simulator, dry_mode):
@@ -492,27 +569,72 @@ def main(ip_str, regression, simulator, dry_mode):
     timestamp_start = datetime.now()
     test_suite = scan_target_ip_for_test_suite(ip, simulator)
     regression = test_suite.get_regression(cfg.cli_args.regr)
+    apply_cli_abort_policies(regression)
     regression.reduce()
-    tests      = regression.get_tests()
+    tests      = order_tests_by_duration(ip, test_suite, regression.get_tests())
     prep_target_ip(ip, test_suite)
     
     sim_job_list = []
     for test in tests:
         sim_job_list.append(test.get_sim_job())
     
-    launch_sim_jobs(ip, test_suite, regression, sim_job_list, dry_mode)
+    abort_reason = launch_sim_jobs(ip, test_suite, regression, sim_job_list, dry_mode)
     timestamp_end = datetime.now()
     if not dry_mode:
         regr_results = results.main(f"{ip.vendor}/{ip.name}", "", True, test_suite.name, regression.name, test_suite.timestamp)
         cov_report_path = cov.gen_cov_report(f"{ip.vendor}/{ip.name}", True, test_suite.name, regression.name, test_suite.timestamp)
         print_end_of_regression_msg(ip, regr_results, cov_report_path, test_suite, regression, sim_job_list, timestamp_start, timestamp_end)
+    if abort_reason != "":
+        common.fatal(f"Regression aborted: {abort_reason}")
+
+
+def apply_cli_abort_policies(regression):
+    if cfg.cli_args.abort_failures != None:
+        regression.abort_failures = cfg.cli_args.abort_failures
+    if cfg.cli_args.abort_rate != None:
+        regression.abort_rate = cfg.cli_args.abort_rate
+    if cfg.cli_args.abort_min_tests != None:
+        regression.abort_min_tests = cfg.cli_args.abort_min_tests
+    if cfg.cli_args.abort_on_fatal:
+        regression.abort_on_fatal = True
+
+
+def order_tests_by_duration(ip, test_suite, tests):
+    # Longest job first: tests are taken from the work queue in this order, which packs long tests onto the
+    # 'max-jobs' slots early instead of leaving one of them to stretch the end of the regression
+    ip_str  = f"{ip.vendor}/{ip.name}"
+    sim_str = common.get_simulator_short_name(test_suite.simulator)
+    estimates       = {}
+    test_estimates  = {}
+    group_estimates = {}
+    for test in tests:
+        timing = history.get_timing(ip_str, 'simulation', sim_str, f"{test.name}.{test.seed}")
+        if timing == None:
+            if test.name not in test_estimates:
+                test_estimates[test.name] = history.get_timing(ip_str, 'simulation', sim_str, test.name)
+            timing = test_estimates[test.name]
+        if timing != None:
+            estimates[test] = timing["ewma"]
+            group_estimates.setdefault(test.test_group.name, []).append(timing["ewma"])
+    timing = history.get_timing(ip_str, 'simulation', sim_str)
+    if timing == None:
+        default_estimate = 0
+    else:
+        default_estimate = timing["ewma"]
+    num_estimated = len(estimates)
+    for test in tests:
+        if test not in estimates:
+            if test.test_group.name in group_estimates:
+                group_durations = group_estimates[test.test_group.name]
+                estimates[test] = sum(group_durations) / len(group_durations)
+            else:
+                estimates[test] = default_estimate
+    common.dbg(f"Ordering {len(tests)} test(s) by estimated duration ({num_estimated} from their own history)")
+    return sorted(tests, key=lambda test: estimates[test], reverse=True)
 
 
 def launch_sim_jobs(ip, test_suite, regression, sim_job_list, dry_mode):
     global bar
-    global sem
-    global sem_cfg
-    threads = []
     regression_name = ""
     if cfg.test_suite_name == "":
         regression_name = f"{cfg.regression_name}"
@@ -523,33 +645,62 @@ def launch_sim_jobs(ip, test_suite, regression, sim_job_list, dry_mode):
     
     common.create_dir(cfg.regr_results_dir + "/" + cfg.target_ip_name + "_" + regression_name)
     common.create_dir(cfg.regr_results_dir + "/" + cfg.target_ip_name + "_" + regression_name + "/" + test_suite.timestamp)
-    sem = BoundedSemaphore(regression.max_jobs)
-    sem_cfg = BoundedSemaphore(1)
+    if regression.max_duration > 0:
+        timeout = regression.max_duration * 3600
+    else:
+        timeout = None
+    # Tests are fed to 'max-jobs' workers as slots free up; each one only touches its own SimulationJob
+    executor   = ThreadPoolExecutor(max_workers=max(1, regression.max_jobs))
+    futures      = {}
+    num_passed   = 0
+    num_failed   = 0
+    abort_reason = ""
     with tqdm(sim_job_list) as bar:
-    #with alive_bar(len(sim_job_list), bar = 'smooth') as bar:
         for sim_job in sim_job_list:
-            common.dbg("Launching test threads")
-            thread = Thread(target=launch_test, args=(ip,test_suite,sim_job,dry_mode,))
-            thread.daemon = True
-            threads.append(thread)
-            thread.start()
-            time.sleep(10) # HACK!!!!! or else threads step on top of each other
-        timeout = Thread(target=timeout_process, args=(regression.max_duration,))
-        timeout.daemon = True
-        timeout.start()
-        common.dbg("Waiting for threads to end")
-        for thread in threads:
-            if thread.is_alive():
-                thread.join()
-
-
-def timeout_process(hours):
-    total_minutes = 0
-    common.dbg(f"Starting timeout process for {str(hours)} hour(s)")
-    for n in range(math.ceil(hours*60)):
-        time.sleep(60)
-        total_minutes += 1
-    common.fatal(f"Regression timed out after {str(hours)} hour(s)")
+            futures[executor.submit(launch_test, ip, test_suite, sim_job, dry_mode)] = sim_job
+        common.dbg(f"Queued {len(futures)} test(s) for {regression.max_jobs} job(s)")
+        try:
+            for future in as_completed(futures, timeout=timeout):
+                future.result()
+                summary    = futures[future].sim_summary
+                conclusion = summary.get("conclusion")
+                if conclusion == "passed":
+                    num_passed += 1
+                elif conclusion != None:
+                    num_failed += 1
+                if conclusion != None:
+                    bar.set_postfix(passed=num_passed, failed=num_failed, refresh=False)
+                bar.update(1)
+                if conclusion != None:
+                    abort_reason = regression.get_abort_reason(num_passed + num_failed, num_failed, summary)
+                    if abort_reason != "":
+                        break
+        except TimeoutError:
+            stop_sim_jobs(executor, futures)
+            common.fatal(f"Regression timed out after {str(regression.max_duration)} hour(s)")
+        except BaseException:
+            stop_sim_jobs(executor, futures)
+            raise
+    if abort_reason != "":
+        common.warning(f"Aborting regression: {abort_reason}")
+        num_cancelled = stop_sim_jobs(executor, futures, wait=True)
+        if num_cancelled > 0:
+            common.warning(f"{num_cancelled} queued test(s) were not run")
+    executor.shutdown()
+    return abort_reason
+
+
+def stop_sim_jobs(executor, futures, wait=False):
+    # Queued tests are dropped; tests already running are flagged as aborted before their simulator is killed
+    num_cancelled = 0
+    for future in futures:
+        if future.cancel():
+            num_cancelled += 1
+        elif not future.done():
+            futures[future].aborted = True
+    eal.kill_all_processes()
+    executor.shutdown(wait=wait)
+    return num_cancelled
 
 
 def prep_target_ip(ip, test_suite):
@@ -566,35 +717,18 @@ def prep_target_ip(ip, test_suite):
 
 
 def launch_test(ip, test_suite, sim_job, dry_mode):
-    global sem_cfg
-    sem_cfg.acquire()
     if cfg.test_suite_name != "":
         regression_name = cfg.test_suite_name + "_" + cfg.regression_name
     else:
         regression_name = cfg.regression_name
     sim_job.regression_name = regression_name
-    plus_args = sim.convert_cli_args_to_plusargs(sim_job)
-    common.dbg("Waiting turn for simulating:\n" + str(sim_job))
-    sem_cfg.release()
-    wait_for_turn()
-    common.dbg("Done waiting. Starting thread for simulating:\n" + str(sim_job))
+    sim.convert_cli_args_to_plusargs(sim_job)
+    common.dbg("Starting simulation:\n" + str(sim_job))
     if dry_mode:
         common.info(f"  dry-run: test='{sim_job.test}' seed='{str(sim_job.seed)}' args='{str(sim_job.args)}' waves='{str(sim_job.waves)}' cov='{str(sim_job.cov)}'")
     else:
         eal.simulate(ip, sim_job)
     common.dbg("Done simulating:\n" + str(sim_job))
-    bar.update(1)
-    done_with_turn()
-
-
-def wait_for_turn():
-    global sem
-    sem.acquire()
-
-
-def done_with_turn():
-    global sem
-    sem.release()
 
 
 
@@ -10,6 +10,7 @@ from mio import clean
 from mio import cov
 from mio import dox
 from mio import sim
+from mio import history
 
 import yaml
 from yaml.loader import SafeLoader
@@ -19,6 +20,9 @@ from jinja2 import Template
 import xml.etree.cElementTree as ET
 from datetime import datetime
 import re
+import json
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
 
 uvm_warning_regex = "UVM_WARNING(?! \: )"
@@ -27,6 +31,10 @@ uvm_fatal_regex   = "UVM_FATAL(?! \: )"
 viv_fatal_error   = "FATAL_ERROR\:"
 mdc_fatal_errors  = ["FATAL_ERROR\:", "=F:"]
 
+# Single pass over sim logs: UVM_FATAL and simulator fatal errors are both reported as fatals
+sim_log_regex = re.compile(f"(?P<warning>{uvm_warning_regex})|(?P<error>{uvm_error_regex})|(?P<fatal>{uvm_fatal_regex}|{viv_fatal_error})")
+max_failure_messages = 100
+
 uvm_gen_dir = re.sub("results.py", "", os.path.realpath(__file__)) + ".."
 relative_path_to_template = uvm_gen_dir + "/templates/"
 
@@ -46,7 +54,7 @@ class RegressionResults:
         self.xml_report_path  = xml_report_path
 
 
-def main(ip_str, filename="", is_regression=False, test_suite="", regression_name="", regression_timestamp=""):
+def main(ip_str, filename="", is_regression=False, test_suite="", regression_name="", regression_timestamp="", failure_limit=None):
     vendor, name = common.parse_dep(ip_str)
     if vendor == "":
         ip = cache.get_anon_ip(name, True)
@@ -85,55 +93,59 @@ def main(ip_str, filename="", is_regression=False, test_suite="", regression_nam
     
     common.dbg(f"Parsing results for '{snapshot}'")
     try:
-        if snapshot in cfg.job_history:
-            if 'simulation' in cfg.job_history[snapshot]:
-                for sim in cfg.job_history[snapshot]['simulation']:
-                    common.dbg("sim job history entry:\n" + str(sim))
-                    if sim['type'] == "end":
-                        if is_regression:
-                            if not sim['is_regression']:
-                                continue
-                            if not sim["regression_name"] == regression_name:
-                                continue
-                            if not sim["regression_timestamp"] == regression_timestamp:
-                                continue
-                        
-                        sim_log_path = sim['log_path']
-                        
-                        start = datetime.strptime(sim['timestamp_start'], "%Y/%m/%d-%H:%M:%S")
-                        end   = datetime.strptime(sim['timestamp_end'  ], "%Y/%m/%d-%H:%M:%S")
-                        duration = end - start
-                        duration = divmod(duration.seconds, 60)[1]
-                        total_duration = total_duration + duration
-                        
-                        testcase = ET.SubElement(testsuite, "testcase")
-                        testcase.set('id', snapshot + "." + sim['test_name'])
-                        testcase.set('name', sim['test_name'])
-                        testcase.set('time', str(duration))
-                        testcase.set('seed', str(sim['seed']))
-                        
-                        testcase_model = {}
-                        suite_model['tests'].append(testcase_model)
-                        testcase_model['name'] = sim['test_name']
-                        testcase_model['seed'] = sim['seed']
-                        testcase_model['time'] = duration
-                        testcase_model['index'] = test_count
-                        
-                        args = ET.SubElement(testcase, "args")
-                        testcase_model['args'] = []
-                        if sim['args'] != None:
-                            for arg in sim['args']:
-                                arg_e = ET.SubElement(args, "arg")
-                                arg_e.text = arg
-                                testcase_model['args'].append(arg)
-                        
-                        passed = parse_sim_results(sim_log_path, testcase, testcase_model)
-                        if passed == "failed" or passed == "inconclusive":
-                            failure_count = failure_count + 1
-                            testcase_model['passed'] = False
-                        else:
-                            testcase_model['passed'] = True
-                        test_count = test_count + 1
+        if is_regression:
+            sim_entries = history.get_entries(snapshot, 'simulation', regression_name=regression_name, regression_timestamp=regression_timestamp)
+        else:
+            sim_entries = history.get_entries(snapshot, 'simulation')
+        sims = []
+        for sim in sim_entries:
+            common.dbg("sim job history entry:\n" + str(sim))
+            if sim['type'] == "end":
+                if is_regression:
+                    if not sim['is_regression']:
+                        continue
+                    if not sim["regression_name"] == regression_name:
+                        continue
+                    if not sim["regression_timestamp"] == regression_timestamp:
+                        continue
+                sims.append(sim)
+        
+        summaries = load_sim_summaries(sims, failure_limit)
+        for sim, summary in zip(sims, summaries):
+            duration = summary.get("duration")
+            if duration == None:
+                duration = int(history.get_entry_duration(sim) or 0)
+            total_duration = total_duration + duration
+            
+            testcase = ET.SubElement(testsuite, "testcase")
+            testcase.set('id', snapshot + "." + sim['test_name'])
+            testcase.set('name', sim['test_name'])
+            testcase.set('time', str(duration))
+            testcase.set('seed', str(sim['seed']))
+            
+            testcase_model = {}
+            suite_model['tests'].append(testcase_model)
+            testcase_model['name'] = sim['test_name']
+            testcase_model['seed'] = sim['seed']
+            testcase_model['time'] = duration
+            testcase_model['expected_time'] = get_expected_duration(snapshot, sim)
+            testcase_model['index'] = test_count
+            
+            args = ET.SubElement(testcase, "args")
+            testcase_model['args'] = []
+            if sim['args'] != None:
+                for arg in sim['args']:
+                    arg_e = ET.SubElement(args, "arg")
+                    arg_e.text = arg
+                    testcase_model['args'].append(arg)
+            
+            passed = add_sim_results(summary, testcase, testcase_model)
+            if passed == "failed" or passed == "inconclusive" or passed == "aborted" or passed == "timeout":
+                failure_count = failure_count + 1
+                testcase_model['passed'] = False
+            else:
+                testcase_model['passed'] = True
+            test_count = test_count + 1
     except Exception as e:
         common.fatal("Failed to parse history log: " + str(e))
     testsuites.set('tests', str(test_count))
@@ -183,43 +195,152 @@ def main(ip_str, filename="", is_regression=False, test_suite="", regression_nam
     return results_obj
 
 
-def parse_sim_results(sim_log_path, testcase, testcase_model):
-    test_result = "passed"
-    num_warnings=0
-    num_errors = 0
-    num_fatals=0
-    for i, line in enumerate(open(sim_log_path)):
-        matches = re.search(uvm_warning_regex, line)
-        if matches:
-            num_warnings = num_warnings + 1
-        matches = re.search(uvm_error_regex, line)
-        if matches:
-            failure = ET.SubElement(testcase, "failure")
-            failure.set("message", line)
-            failure.set("type", "ERROR")
-            test_result = "failed"
-            num_errors = num_errors + 1
-        matches = re.search(uvm_fatal_regex, line)
-        if matches:
-            failure = ET.SubElement(testcase, "failure")
-            failure.set("message", line)
-            failure.set("type", "FATAL")
-            test_result = "failed"
-            num_fatals = num_errors + 1
-        matches = re.search(viv_fatal_error, line)
-        if matches:
-            failure = ET.SubElement(testcase, "failure")
-            failure.set("message", line)
-            failure.set("type", "FATAL")
-            test_result = "failed"
-            num_fatals = num_errors + 1
-        
-    
-    testcase.set("warnings", str(num_warnings))
-    testcase.set("errors", str(num_errors))
-    testcase.set("fatals", str(num_fatals))
-    testcase_model['num_warnings'] = num_warnings
-    testcase_model['num_errors'] = num_errors
-    testcase_model['num_fatals'] = num_fatals
-    testcase_model['conclusion'] = test_result
-    return test_result
+def get_expected_duration(ip_str, sim):
+    # Typical duration from the timing model (test+seed, then test), as used by the regression scheduler
+    simulator = sim.get('simulator') or ""
+    timing = history.get_timing(ip_str, 'simulation', simulator, f"{sim['test_name']}.{sim['seed']}")
+    if timing == None:
+        timing = history.get_timing(ip_str, 'simulation', simulator, sim['test_name'])
+    if timing == None:
+        return ""
+    return int(round(timing["ewma"]))
+
+
+def write_sim_summary(sim_job, timestamp_start, timestamp_end):
+    # Written by each simulation as it ends so that reports never have to re-read the logs
+    try:
+        summary = parse_sim_log(sim_job.sim_log_file_path, stop_after_failures=cfg.sim_log_failure_limit)
+    except OSError as e:
+        common.warning(f"Could not parse simulation log '{sim_job.sim_log_file_path}': {e}")
+        summary = {
+            "conclusion"   : "inconclusive",
+            "num_warnings" : 0,
+            "num_errors"   : 0,
+            "num_fatals"   : 0,
+            "failures"     : []
+        }
+    if sim_job.timed_out:
+        summary["conclusion"] = "timeout"
+    elif sim_job.aborted:
+        summary["conclusion"] = "aborted"
+    start = datetime.strptime(timestamp_start, "%Y/%m/%d-%H:%M:%S")
+    end   = datetime.strptime(timestamp_end  , "%Y/%m/%d-%H:%M:%S")
+    summary["test_name"      ] = sim_job.test
+    summary["seed"           ] = sim_job.seed
+    summary["timestamp_start"] = timestamp_start
+    summary["timestamp_end"  ] = timestamp_end
+    summary["duration"       ] = int((end - start).total_seconds())
+    summary_path = sim_job.results_path + "/sim_summary.json"
+    try:
+        with open(summary_path + ".tmp", 'w') as summary_file:
+            json.dump(summary, summary_file)
+        os.replace(summary_path + ".tmp", summary_path)
+        sim_job.sim_summary_path = summary_path
+    except OSError as e:
+        common.warning(f"Could not write simulation summary '{summary_path}': {e}")
+    sim_job.sim_summary = summary
+    return summary
+
+
+def load_sim_summaries(sims, failure_limit=None):
+    # Logs are only parsed for simulations that did not leave a summary behind (ex: older versions of mio)
+    if failure_limit == None:
+        failure_limit = cfg.sim_log_failure_limit
+    summaries = []
+    missing   = []
+    for sim in sims:
+        summary = None
+        summary_path = sim.get('summary_path') or ""
+        if (summary_path != "") and os.path.exists(summary_path):
+            try:
+                with open(summary_path, 'r') as summary_file:
+                    summary = json.load(summary_file)
+            except (OSError, ValueError) as e:
+                common.dbg(f"Ignoring unreadable simulation summary '{summary_path}': {e}")
+        if summary == None:
+            missing.append(len(summaries))
+        summaries.append(summary)
+    parsed = parse_sim_logs([sims[index]['log_path'] for index in missing], failure_limit)
+    for index, summary in zip(missing, parsed):
+        summaries[index] = summary
+    return summaries
+
+
+def parse_sim_logs(sim_log_paths, failure_limit=0):
+    # Logs are parsed in parallel by worker processes, which only send back compact summaries
+    if len(sim_log_paths) <= 1:
+        return [parse_sim_log(path, stop_after_failures=failure_limit) for path in sim_log_paths]
+    num_workers = min(len(sim_log_paths), os.cpu_count() or 1)
+    chunksize   = max(1, len(sim_log_paths) // (num_workers * 4))
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        return list(executor.map(parse_sim_log, sim_log_paths, repeat(max_failure_messages), repeat(failure_limit), chunksize=chunksize))
+
+
+def parse_sim_log(sim_log_path, max_failure_messages=max_failure_messages, stop_after_failures=0):
+    summary = {
+        "conclusion"   : "passed",
+        "num_warnings" : 0,
+        "num_errors"   : 0,
+        "num_fatals"   : 0,
+        "failures"     : []
+    }
+    partial_line = ""
+    with open(sim_log_path, 'r', errors='replace') as log_file:
+        while True:
+            chunk = log_file.read(1024*1024)
+            if not chunk:
+                text = partial_line
+                end  = len(text)
+            else:
+                text = partial_line + chunk
+                end  = text.rfind("\n") + 1
+                partial_line = text[end:]
+            if end > 0:
+                scan_sim_log_text(text, end, summary, max_failure_messages)
+            if not chunk:
+                break
+            if (stop_after_failures > 0) and (summary["num_errors"] + summary["num_fatals"] >= stop_after_failures):
+                break
+    if summary["num_errors"] + summary["num_fatals"] > 0:
+        summary["conclusion"] = "failed"
+    return summary
+
+
+def scan_sim_log_text(text, end, summary, max_failure_messages):
+    # Each category is counted at most once per line, like the original line-by-line search
+    last_line_start = {}
+    for match in sim_log_regex.finditer(text, 0, end):
+        category   = match.lastgroup
+        line_start = text.rfind("\n", 0, match.start()) + 1
+        if last_line_start.get(category) == line_start:
+            continue
+        last_line_start[category] = line_start
+        if category == "warning":
+            summary["num_warnings"] += 1
+            continue
+        line_end = text.find("\n", match.start(), end)
+        if line_end < 0:
+            line_end = end
+        if category == "error":
+            summary["num_errors"] += 1
+            failure_type = "ERROR"
+        else:
+            summary["num_fatals"] += 1
+            failure_type = "FATAL"
+        if len(summary["failures"]) < max_failure_messages:
+            summary["failures"].append([failure_type, text[line_start:line_end+1]])
+
+
+def add_sim_results(summary, testcase, testcase_model):
+    for failure_type, message in summary["failures"]:
+        failure = ET.SubElement(testcase, "failure")
+        failure.set("message", message)
+        failure.set("type", failure_type)
+    testcase.set("warnings", str(summary["num_warnings"]))
+    testcase.set("errors", str(summary["num_errors"]))
+    testcase.set("fatals", str(summary["num_fatals"]))
+    testcase_model['num_warnings'] = summary["num_warnings"]
+    testcase_model['num_errors'] = summary["num_errors"]
+    testcase_model['num_fatals'] = summary["num_fatals"]
+    testcase_model['conclusion'] = summary["conclusion"]
+    return summary["conclusion"]
@@ -13,13 +13,15 @@ from mio import results
 from mio import cache
 from mio import common
 from mio import eal
+from mio import history
+from mio import engine
 from mio import install
 from mio import doctor
 from tqdm import tqdm
 from tqdm import trange
 from threading import Thread
-from multiprocessing.pool import ThreadPool
-from threading import BoundedSemaphore
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait, FIRST_COMPLETED
 import threading
 import time
 import os
@@ -45,7 +47,6 @@ regex_define_pattern  = "\+define\+((?:\w|_|\d)+)(?:\=((?:\w|_|\d)+))?"
 regex_plusarg_pattern = "\+((?:\w|_|\d)+)(?:\=((?:\w|_|\d)+))?"
 seconds_waited = 0
 num_deps_to_compile = 0
-sem = BoundedSemaphore(1)
 pbar = None
 
 
@@ -81,6 +82,9 @@ class SimulationJob:
         self.test            = ""
         self.seed            = 0
         self.max_errors      = 0
+        self.max_cmp_jobs    = 0
+        self.max_duration    = 0
+        self.max_cpu_time    = 0
         self.gui             = False
         self.verbosity       = ""
         self.waves           = False
@@ -107,13 +111,16 @@ class SimulationJob:
         self.cmp_log_file_path  = ""
         self.elab_log_file_path = ""
         self.sim_log_file_path  = ""
+        self.sim_summary_path   = ""
+        self.sim_summary        = {}
+        self.aborted            = False
+        self.timed_out          = False
         
 
 
 
 
 def main(sim_job):
-    global est_time
     sim_str = common.get_simulator_short_name(sim_job.simulator)
     common.dbg(f"Starting simulation job: '{sim_job.vendor}/{sim_job.ip}'")
     if sim_job.vendor == "":
@@ -173,7 +180,6 @@ def main(sim_job):
 
 
 def one_step_sim(sim_job):
-    global est_time
     sim_str = common.get_simulator_short_name(sim_job.simulator)
     if sim_job.vendor == "":
         ip = cache.get_anon_ip(sim_job.ip, True)
@@ -198,8 +204,12 @@ def one_step_sim(sim_job):
             if ip.dut.target_ip_model.sub_type == "vivado":
                 common.fatal("Vivado Project DUTs are not yet amenable to single-step compilation/elaboration flow.")
     
-    common.info(f"Compiling+Elaborating {ip_str} ...")
-    eal.gen_ip_image(ip, sim_job, fsoc_core_name, flist_path)
+    if eal.needs_gen_image(ip, sim_job):
+        common.info(f"Compiling+Elaborating {ip_str} ...")
+        engine.run([engine.Job(f"{ip_str} compilation+elaboration", ip_str, 'gen-image', eal.gen_ip_image, [ip, sim_job, fsoc_core_name, flist_path],
+                               est_time=get_est_time(ip_str, 'gen-image', sim_job))], run_consumers=[engine.ProgressBarConsumer()])
+    else:
+        common.info(f"Image of {ip_str} is up-to-date, skipping compilation+elaboration")
     if not sim_job.is_regression:
         common.banner(f"Simulating {ip_str} ...")
         eal.simulate(ip, sim_job)
@@ -207,7 +217,6 @@ def one_step_sim(sim_job):
 
 
 def multi_step_sim(sim_job):
-    global est_time
     sim_str = common.get_simulator_short_name(sim_job.simulator)
     if sim_job.vendor == "":
         ip = cache.get_anon_ip(sim_job.ip, True)
@@ -217,110 +226,25 @@ def multi_step_sim(sim_job):
         common.fatal(f"Cannot find IP '{sim_job.vendor}/{sim_job.ip}'")
     ip_str = f"{ip.vendor}/{ip.name}"
     
-    cmp_ip_count = 0
+    jobs = []
     if sim_job.compile:
         if ip.has_dut:
-            compile_dut = True
             if ip.dut_ip_type == "fsoc":
-                compile_dut = True #ip.dut_core.is_compiled[sim_job.simulator]
-            else:
-                compile_dut = True #ip.is_compiled[sim_job.simulator]
-            if compile_dut:
-                cmp_ip_count = cmp_ip_count + 1
-                if ip.dut_ip_type == "fsoc":
-                    dut_str = f"{ip.dut_fsoc_name}"
-                else:
-                    dut_str = f"{ip.dut.vendor}/{ip.dut.target_ip}"
-                if (not sim_job.dry_run) and (dut_str in cfg.job_history):
-                    est_time = 0
-                    curr_est_time = 0
-                    if 'compilation' in cfg.job_history[dut_str]:
-                        for job in cfg.job_history[dut_str]['compilation']:
-                            start = datetime.strptime(job['timestamp_start'], "%Y/%m/%d-%H:%M:%S")
-                            end   = datetime.strptime(job['timestamp_end'  ], "%Y/%m/%d-%H:%M:%S")
-                            curr_est_time = end - start
-                            curr_est_time = divmod(curr_est_time.seconds, 60)[1]
-                            est_time += curr_est_time
-                        est_time = math.ceil(est_time / len(cfg.job_history[dut_str]['compilation']))
-                        if est_time > 0:
-                            pool = ThreadPool(processes=1)
-                            pool.apply_async(progress_bar)
-                            cmp_dut(ip, sim_job)
-                            pool.terminate()
-                            pool.join()
-                        else:
-                            cmp_dut(ip, sim_job)
-                    else:
-                        cmp_dut(ip, sim_job)
-                else:
-                    cmp_dut(ip, sim_job)
-        
-        cmp_ip_count = cmp_ip_count + cmp_dependencies(ip, sim_job)
-        
-        #if not ip.is_compiled[sim_job.simulator]:
-        if True:
-            if not sim_job.is_regression:
-                common.banner("Compiling IP '" + ip_str + "'")
-            cmp_ip_count = cmp_ip_count + 1
-            if (not sim_job.dry_run) and (ip_str in cfg.job_history):
-                if 'compilation' in cfg.job_history[ip_str]:
-                    est_time = 0
-                    curr_est_time = 0
-                    for job in cfg.job_history[ip_str]['compilation']:
-                        start = datetime.strptime(job['timestamp_start'], "%Y/%m/%d-%H:%M:%S")
-                        end   = datetime.strptime(job['timestamp_end'  ], "%Y/%m/%d-%H:%M:%S")
-                        curr_est_time = end - start
-                        curr_est_time = divmod(curr_est_time.seconds, 60)[1]
-                        est_time += curr_est_time
-                    est_time = math.ceil(est_time / len(cfg.job_history[ip_str]['compilation']))
-                    if est_time > 0:
-                        pool = ThreadPool(processes=1)
-                        pool.apply_async(progress_bar)
-                        cmp_target_ip(ip, sim_job)
-                        pool.terminate()
-                        pool.join()
-                    else:
-                        cmp_target_ip(ip, sim_job)
-                else:
-                    cmp_target_ip(ip, sim_job)
-            else:
-                cmp_target_ip(ip, sim_job)
-    
-    needs_elaboration = True #not ip.is_elaborated[sim_job.simulator]
-    #if cmp_ip_count > 0:
-    #    needs_elaboration = True
-    
-    if sim_job.elaborate and needs_elaboration:
-        if sim_job.is_regression:
-            common.info("Elaborating IP '" + ip_str + "'")
-        else:
-            common.banner("Elaborating IP '" + ip_str + "'")
-        est_time = 0
-        curr_est_time = 0
-        if ip_str in cfg.job_history:
-            if (not sim_job.dry_run) and ('elaboration' in cfg.job_history[ip_str]):
-                for job in cfg.job_history[ip_str]['elaboration']:
-                    start = datetime.strptime(job['timestamp_start'], "%Y/%m/%d-%H:%M:%S")
-                    end   = datetime.strptime(job['timestamp_end'  ], "%Y/%m/%d-%H:%M:%S")
-                    curr_est_time = end - start
-                    curr_est_time = divmod(curr_est_time.seconds, 60)[1]
-                    est_time += curr_est_time
-                est_time = math.ceil(est_time / len(cfg.job_history[ip_str]['elaboration']))
-                if est_time > 0:
-                    pool = ThreadPool(processes=1)
-                    pool.apply_async(progress_bar)
-                    eal.elaborate(ip, sim_job)
-                    pool.terminate()
-                    pool.join()
-                else:
-                    eal.elaborate(ip, sim_job)
+                dut_str = f"{ip.dut_fsoc_name}"
             else:
-                eal.elaborate(ip, sim_job)
-        else:
-            eal.elaborate(ip, sim_job)
-    else:
-        if sim_job.simulate == False and not sim_job.is_regression:
-            print_end_of_compilation_message(ip, sim_job)
+                dut_str = f"{ip.dut.vendor}/{ip.dut.target_ip}"
+            jobs.append(engine.Job(f"{dut_str} compilation", dut_str, 'compilation', cmp_dut, [ip, sim_job],
+                                   est_time=get_est_time(dut_str, 'compilation', sim_job)))
+        jobs.append(engine.Job(f"{ip_str} dependencies compilation", ip_str, 'dependencies', cmp_dependencies, [ip, sim_job],
+                               after=jobs[-1:]))
+        jobs.append(engine.Job(f"{ip_str} compilation", ip_str, 'compilation', cmp_target_ip_if_needed, [ip, sim_job],
+                               after=jobs[-1:], est_time=get_est_time(ip_str, 'compilation', sim_job)))
+    if sim_job.elaborate:
+        jobs.append(engine.Job(f"{ip_str} elaboration", ip_str, 'elaboration', elaborate_if_needed, [ip, sim_job],
+                               after=jobs[-1:], est_time=get_est_time(ip_str, 'elaboration', sim_job)))
+    engine.run(jobs, run_consumers=[engine.ProgressBarConsumer()])
+    if (not sim_job.elaborate) and (not sim_job.simulate) and (not sim_job.is_regression):
+        print_end_of_compilation_message(ip, sim_job)
     
     if sim_job.simulate:
         if sim_job.gui and sim_job.simulator == common.simulators_enum.METRICS:
@@ -423,27 +347,39 @@ atexit.register(kill_progress_bar)
 
 
 
-def progress_bar():
-    global pbar
-    global seconds_waited
-    with tqdm(total=est_time) as pbar:
-        for i in range(est_time):
-            sleep(1)
-            pbar.update(1)
-    #with tqdm(total=seconds) as pbar:
-    #    for i in range(seconds):
-    #        sleep(1)
-    #        pbar.update(1)
-        
-    #with alive_bar(seconds, bar = 'smooth', stats="{eta} estimated", monitor=False, elapsed=True) as bar:
-    #    bar.text("estimated")
-    #    for x in range(seconds):
-    #        time.sleep(1)
-    #        seconds_waited += 1
-    #        bar()
+def cmp_target_ip_if_needed(ip, sim_job):
+    ip_str = f"{ip.vendor}/{ip.name}"
+    if not eal.needs_compilation(ip, sim_job):
+        common.info(f"IP '{ip_str}' is up-to-date, skipping compilation")
+    else:
+        if not sim_job.is_regression:
+            common.banner("Compiling IP '" + ip_str + "'")
+        cmp_target_ip(ip, sim_job)
 
 
 
+def elaborate_if_needed(ip, sim_job):
+    ip_str = f"{ip.vendor}/{ip.name}"
+    if not eal.needs_elaboration(ip, sim_job):
+        common.info(f"Elaboration of IP '{ip_str}' is up-to-date, skipping elaboration")
+    else:
+        if sim_job.is_regression:
+            common.info("Elaborating IP '" + ip_str + "'")
+        else:
+            common.banner("Elaborating IP '" + ip_str + "'")
+        eal.elaborate(ip, sim_job)
+
+
+
+def get_est_time(ip_str, step, sim_job):
+    if sim_job.dry_run:
+        return 0
+    timing = history.get_timing(ip_str, step, common.get_simulator_short_name(sim_job.simulator))
+    if timing == None:
+        return 0
+    return math.ceil(timing["ewma"])
+
+
 
 def convert_cli_args_to_defines(sim_job):
     defines = {}
@@ -538,30 +474,35 @@ def create_sim_directories():
     common.create_dir(cfg.sim_output_dir + "/viv"                     )
     common.create_dir(cfg.sim_output_dir + "/viv/cov_wd"              )
     common.create_dir(cfg.sim_output_dir + "/viv/cmp_out"             )
+    common.create_dir(cfg.sim_output_dir + "/viv/cmp_wd"              )
     common.create_dir(cfg.sim_output_dir + "/viv/sim_wd"              )
     common.create_dir(cfg.sim_output_dir + "/viv/regr_wd"             )
     common.create_dir(cfg.sim_output_dir + "/viv/so_libs"             )
     common.create_dir(cfg.sim_output_dir + "/vcs"                     )
     common.create_dir(cfg.sim_output_dir + "/vcs/cov_wd"              )
     common.create_dir(cfg.sim_output_dir + "/vcs/cmp_out"             )
+    common.create_dir(cfg.sim_output_dir + "/vcs/cmp_wd"              )
     common.create_dir(cfg.sim_output_dir + "/vcs/sim_wd"              )
     common.create_dir(cfg.sim_output_dir + "/vcs/regr_wd"             )
     common.create_dir(cfg.sim_output_dir + "/vcs/so_libs"             )
     common.create_dir(cfg.sim_output_dir + "/xcl"                     )
     common.create_dir(cfg.sim_output_dir + "/xcl/cov_wd"              )
     common.create_dir(cfg.sim_output_dir + "/xcl/cmp_out"             )
+    common.create_dir(cfg.sim_output_dir + "/xcl/cmp_wd"              )
     common.create_dir(cfg.sim_output_dir + "/xcl/sim_wd"              )
     common.create_dir(cfg.sim_output_dir + "/xcl/regr_wd"             )
     common.create_dir(cfg.sim_output_dir + "/xcl/so_libs"             )
     common.create_dir(cfg.sim_output_dir + "/qst"                     )
     common.create_dir(cfg.sim_output_dir + "/qst/cov_wd"              )
     common.create_dir(cfg.sim_output_dir + "/qst/cmp_out"             )
+    common.create_dir(cfg.sim_output_dir + "/qst/cmp_wd"              )
     common.create_dir(cfg.sim_output_dir + "/qst/sim_wd"              )
     common.create_dir(cfg.sim_output_dir + "/qst/regr_wd"             )
     common.create_dir(cfg.sim_output_dir + "/qst/so_libs"             )
     common.create_dir(cfg.sim_output_dir + "/riv"                     )
     common.create_dir(cfg.sim_output_dir + "/riv/cov_wd"              )
     common.create_dir(cfg.sim_output_dir + "/riv/cmp_out"             )
+    common.create_dir(cfg.sim_output_dir + "/riv/cmp_wd"              )
     common.create_dir(cfg.sim_output_dir + "/riv/sim_wd"              )
     common.create_dir(cfg.sim_output_dir + "/riv/regr_wd"             )
     common.create_dir(cfg.sim_output_dir + "/riv/so_libs"             )
@@ -582,8 +523,6 @@ def check_dependencies(ip):
 
 
 def cmp_dependencies(ip, sim_job):
-    global bar
-    global est_time
     global num_deps_to_compile
     deps = ip.get_ordered_deps()
     deps_to_cmp = []
@@ -603,33 +542,85 @@ def cmp_dependencies(ip, sim_job):
     else:
         return 0
     
-    sim_str = common.get_simulator_short_name(sim_job.simulator)
-    defines = sim_job.cmp_args
-    est_time = num_deps
+    num_jobs = get_num_cmp_jobs(sim_job, num_deps)
+    common.dbg(f"Compiling {num_deps} dependencies with {num_jobs} job(s)")
     num_deps_to_compile = num_deps
-    with tqdm(deps_to_cmp) as pbar:
-        for dep in tqdm(deps_to_cmp):
-            dep_str = f"{dep.vendor}/{dep.name}"
-            pbar.set_description(dep_str)
-            eal.compile_ip(dep, sim_job)
-    #with alive_bar(num_deps, bar = 'smooth', stats="{eta} estimated", monitor=True, elapsed=True) as bar:
-    #    for dep in deps_to_cmp:
-    #        dep_str = f"{dep.vendor}/{dep.name}"
-    #        bar.text(dep_str)
-    #        eal.compile_ip(dep, sim_job)
-    #        bar()
-    return num_deps_to_compile
-
-
-def cmp_dep(dep, sim_job):
-    global num_deps_to_compile
-    dep_str = f"{dep.vendor}/{dep.name}"
-    common.dbg(f"Compiling IP dependency '{dep_str}'")
-    eal.compile_ip(dep, sim_job)
-    sem.acquire()
-    bar.text(dep_str)
-    num_deps_to_compile = num_deps_to_compile - 1
-    sem.release()
+    prerequisites = {}
+    for dep in deps_to_cmp:
+        prerequisites[dep] = []
+        for dep_model in get_dep_models(dep):
+            if dep_model in deps_to_cmp:
+                prerequisites[dep].append(dep_model)
+    
+    # Workers only run the compiler and scan its log; history, IP model updates and error reporting happen here, on
+    # the main thread, once the worker is done.
+    compiled           = []
+    running            = {}
+    failure            = None
+    failed_compilation = None
+    executor = ThreadPoolExecutor(max_workers=num_jobs)
+    with tqdm(total=num_deps) as pbar:
+        while len(compiled) < num_deps:
+            if (failure == None) and (failed_compilation == None):
+                for dep in deps_to_cmp:
+                    if len(running) >= num_jobs:
+                        break
+                    if (dep in compiled) or (dep in running.values()):
+                        continue
+                    if all(prerequisite in compiled for prerequisite in prerequisites[dep]):
+                        common.dbg(f"Scheduling compilation of dependency '{dep.vendor}/{dep.name}'")
+                        running[executor.submit(eal.launch_ip_compilation, dep, sim_job)] = dep
+            if len(running) == 0:
+                break
+            finished, pending = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in finished:
+                dep = running.pop(future)
+                error = future.exception()
+                if error != None:
+                    if failure == None:
+                        failure = error
+                    continue
+                compilation = future.result()
+                if len(compilation.errors):
+                    if failed_compilation == None:
+                        failed_compilation = compilation
+                    continue
+                eal.end_ip_compilation(compilation, sim_job)
+                compiled.append(dep)
+                num_deps_to_compile = num_deps_to_compile - 1
+                pbar.set_description(f"{dep.vendor}/{dep.name}")
+                pbar.update(1)
+    executor.shutdown()
+    if failure != None:
+        raise failure
+    if failed_compilation != None:
+        eal.end_ip_compilation(failed_compilation, sim_job)
+    if len(compiled) < num_deps:
+        common.fatal("Could not schedule compilation of all dependencies: circular dependency detected")
+    return num_deps
+
+
+def get_dep_models(ip):
+    dep_models = []
+    if ip.has_dut and (ip.dut_ip_type == "") and (ip.dut != None):
+        if ip.dut.target_ip_model != None:
+            dep_models.append(ip.dut.target_ip_model)
+    for dep in ip.dependencies:
+        if dep.target_ip_model != None:
+            dep_models.append(dep.target_ip_model)
+    return dep_models
+
+
+def get_num_cmp_jobs(sim_job, num_deps):
+    if sim_job.simulator != common.simulators_enum.VIVADO:
+        # Other simulators map libraries through their shared working directory (or remote workspace)
+        return 1
+    num_jobs = sim_job.max_cmp_jobs
+    if num_jobs <= 0:
+        num_jobs = cfg.compilation_jobs
+    if num_jobs <= 0:
+        num_jobs = os.cpu_count() or 1
+    return max(1, min(num_jobs, num_deps))
 
 
 def cmp_dut(ip, sim_job):
@@ -647,14 +638,11 @@ def cmp_dut(ip, sim_job):
             if ip.dut.target_ip_model == None:
                 common.fatal(f"Did not resolve DUT dependency ('{ip.dut.vendor}/{ip.dut.target_ip}')!")
             dut_ip_str = f"{ip.dut.vendor}/{ip.dut.target_ip}"
-            compile_dut = False
             if ip.dut.target_ip_model.is_local:
                 common.dbg("Found local IP DUT '" + dut_ip_str + "'")
-                compile_dut = True
             else:
                 common.dbg("Found external IP DUT '" + dut_ip_str + "'")
-                if not ip.dut.target_ip_model.is_compiled[sim_job.simulator]:
-                    compile_dut = True
+            compile_dut = eal.needs_compilation(ip.dut.target_ip_model, sim_job)
             if compile_dut:
                 if ip.dut.target_ip_model.sub_type == "vivado":
                     common.info("Compiling Vivado Project DUT IP '" + dut_ip_str + "'")
@@ -673,7 +661,7 @@ def cmp_target_ip(ip, sim_job):
     ip_str = f"{ip.vendor}/{ip.name}"
     if ip.sub_type == "vivado":
         #common.info(f"Compiling Vivado Project '{ip_str}'")
-        eal.compile_vivado_project(ip_yml, sim_job)
+        eal.compile_vivado_project(ip, sim_job)
     else:
         #common.info(f"Compiling '{ip_str}'")
         eal.compile_ip(ip, sim_job)
@@ -22,16 +22,44 @@ import os
 import sys
 import shutil
 from tqdm import tqdm
+from threading import RLock
 
 
-base_url      = "https://mooreio.com"
+base_url      = os.getenv("MIO_MARKETPLACE_URL", "https://mooreio.com").rstrip("/")
 jwt_endpoint  = base_url + "/api/authenticate"
 user_data = {}
 org_name = ""
 org_full_name = ""
+login_lock = RLock()
 
+# Token resolved once per invocation, before any job is launched, and then only read by the jobs
+session_token        = None
+token_refresh_margin = datetime.timedelta(days=1)
 
-def login(username="", password="", force=False):
+
+def login(username="", password="", force=False, margin=datetime.timedelta(0)):
+    # Concurrent simulations all need a token: only the first one may prompt for credentials or query the server
+    with login_lock:
+        return do_login(username, password, force, margin)
+
+
+def resolve_session_token():
+    # Must be called from the main thread: a token expiring within 'token_refresh_margin' is renewed now rather than
+    # prompting for credentials in the middle of a long regression
+    global session_token
+    with login_lock:
+        session_token = login(margin=token_refresh_margin)
+        return session_token
+
+
+def get_session_token():
+    # Safe to call from worker threads: neither prompts nor queries the server once the token has been resolved
+    if session_token == None:
+        return resolve_session_token()
+    return session_token
+
+
+def do_login(username="", password="", force=False, margin=datetime.timedelta(0)):
     global user_data
     ask_username = True
     ask_password = True
@@ -42,7 +70,7 @@ def login(username="", password="", force=False):
                 ask_username = False
                 if user_data['token'] != "":
                     expiration_date = common.parse_timestamp(user_data['expiration'])
-                    if expiration_date > date.now():
+                    if expiration_date > (date.now() + margin):
                         token    = user_data['token']
                         username = user_data['username']
                         common.dbg(f"User credentials and token are still valid.  Using token '{token}'")
@@ -0,0 +1,113 @@
+# Copyright 2021-2023 Datum Technology Corporation
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.1
+########################################################################################################################
+
+
+import gzip
+import io
+import json
+import tarfile
+import threading
+from base64 import b64encode
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_payload(files):
+    # gzip headers hold a modification time: it is fixed so that identical files always give identical payloads
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb", mtime=0) as gzip_file:
+        with tarfile.open(fileobj=gzip_file, mode="w") as tar:
+            for name, contents in files.items():
+                data = contents.encode()
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+class MockMarketplace:
+    """Minimal Moore.io IP Marketplace serving IPs from memory and counting the requests it receives"""
+
+    def __init__(self, embed_payloads=True):
+        self.ips      = []
+        self.versions = []
+        self.licenses = []
+        self.payloads = {}
+        self.requests = []
+        self.embed_payloads = embed_payloads
+        marketplace = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def send_json(self, data):
+                body = json.dumps(data).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                marketplace.requests.append(("POST", self.path))
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self.send_json({"id_token" : "token"})
+
+            def do_GET(self):
+                marketplace.requests.append(("GET", self.path))
+                if self.headers.get("Authorization") != "Bearer token":
+                    self.send_response(401)
+                    self.end_headers()
+                    return
+                path = self.path.split("?")[0]
+                if path == "/api/ips":
+                    self.send_json(marketplace.ips)
+                elif path == "/api/versions":
+                    self.send_json(marketplace.list(marketplace.versions, "publicPayload"))
+                elif path == "/api/licenses":
+                    self.send_json(marketplace.list(marketplace.licenses, "payload"))
+                elif path.startswith("/api/version/"):
+                    self.send_json(marketplace.find(marketplace.versions, path, "publicPayload"))
+                elif path.startswith("/api/licenses/"):
+                    self.send_json(marketplace.find(marketplace.licenses, path, "payload"))
+                else:
+                    self.send_response(404)
+                    self.end_headers()
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url    = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def add_ip(self, name, semver, files, commercial=False, sha256=""):
+        ip_id = len(self.ips) + 1
+        self.payloads[ip_id] = b64encode(make_payload(files)).decode()
+        self.ips.append({"id" : ip_id, "name" : name, "licenseType" : "COMMERCIAL" if commercial else "FREE_OPEN_SOURCE"})
+        if commercial:
+            entry = {"id" : ip_id, "targetIp" : {"id" : ip_id}, "version" : {"semver" : semver}}
+            self.licenses.append(entry)
+        else:
+            entry = {"id" : ip_id, "semver" : semver, "ip" : {"id" : ip_id}}
+            self.versions.append(entry)
+        if sha256 != "":
+            entry["payloadSha256"] = sha256
+        return ip_id
+
+    def list(self, entries, field):
+        if self.embed_payloads:
+            return [dict(entry, **{field : self.payloads[entry["id"]]}) for entry in entries]
+        return entries
+
+    def find(self, entries, path, field):
+        for entry in entries:
+            if str(entry["id"]) == path.split("/")[-1]:
+                return dict(entry, **{field : self.payloads[entry["id"]]})
+        return {}
+
+    def count(self, path):
+        return len([request for request in self.requests if request[1].split("?")[0] == path])
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,161 @@
+# Copyright 2021-2023 Datum Technology Corporation
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.1
+########################################################################################################################
+
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from mio import sim  # Must be imported first to resolve the circular imports between mio modules
+from mio import common
+from mio import eal
+
+
+class FakeDep:
+    def __init__(self, target_ip_model):
+        self.target_ip_model = target_ip_model
+
+
+class FakeIp:
+    def __init__(self, name, deps=[]):
+        self.vendor         = "acme"
+        self.name           = name
+        self.has_dut        = False
+        self.dut            = None
+        self.dut_ip_type    = ""
+        self.dependencies   = [FakeDep(dep) for dep in deps]
+        self.is_compiled    = {}
+        self.build_manifest = {}
+        self.ordered_deps   = []
+
+    def get_ordered_deps(self):
+        return self.ordered_deps
+
+    def __repr__(self):
+        return self.name
+
+
+class Fatal(Exception):
+    pass
+
+
+class FakeCompiler:
+    def __init__(self, duration=0.05, failing=[], raising=[]):
+        self.duration    = duration
+        self.failing     = failing
+        self.raising     = raising
+        self.lock        = threading.Lock()
+        self.started     = []
+        self.finished    = []
+        self.running     = 0
+        self.max_running = 0
+
+    def launch(self, ip, sim_job):
+        with self.lock:
+            self.started.append(ip.name)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.duration)
+        if ip.name in self.raising:
+            with self.lock:
+                self.running -= 1
+            raise OSError(f"{ip.name} crashed")
+        compilation = eal.IpCompilation(ip)
+        if ip.name in self.failing:
+            compilation.errors = [f"ERROR: {ip.name} failed"]
+        with self.lock:
+            self.running -= 1
+            self.finished.append(ip.name)
+        return compilation
+
+    def end(self, compilation, sim_job):
+        if len(compilation.errors):
+            common.fatal(compilation.errors[0])
+        compilation.ip.is_compiled[sim_job.simulator] = True
+
+
+def fatal(msg, dump_cache=True):
+    raise Fatal(msg)
+
+
+@pytest.fixture
+def diamond():
+    # base <- left, right <- top ; target depends on all of them
+    base   = FakeIp("base")
+    left   = FakeIp("left" , [base])
+    right  = FakeIp("right", [base])
+    top    = FakeIp("top"  , [left, right])
+    target = FakeIp("target", [top])
+    target.ordered_deps = [top, left, right, base]
+    return target
+
+
+def run(monkeypatch, target, compiler, max_jobs=0):
+    sim_job = sim.SimulationJob("target")
+    sim_job.simulator    = common.simulators_enum.VIVADO
+    sim_job.max_cmp_jobs = max_jobs
+    monkeypatch.setattr(eal, "launch_ip_compilation", compiler.launch)
+    monkeypatch.setattr(eal, "end_ip_compilation", compiler.end)
+    monkeypatch.setattr(common, "fatal", fatal)
+    monkeypatch.setattr(common, "info", lambda msg: None)
+    return sim.cmp_dependencies(target, sim_job)
+
+
+def test_diamond_respects_dependency_order(monkeypatch, diamond):
+    compiler = FakeCompiler()
+    assert run(monkeypatch, diamond, compiler, max_jobs=4) == 4
+    started  = compiler.started
+    finished = compiler.finished
+    assert started[0] == "base"
+    assert started[-1] == "top"
+    assert finished.index("base") < started.index("left")
+    assert finished.index("base") < started.index("right")
+    assert finished.index("left") < started.index("top")
+    assert finished.index("right") < started.index("top")
+
+
+def test_independent_dependencies_compile_in_parallel(monkeypatch, diamond):
+    compiler = FakeCompiler()
+    run(monkeypatch, diamond, compiler, max_jobs=4)
+    assert compiler.max_running == 2
+
+
+def test_jobs_cap(monkeypatch, diamond):
+    compiler = FakeCompiler()
+    run(monkeypatch, diamond, compiler, max_jobs=1)
+    assert compiler.max_running == 1
+    assert len(compiler.finished) == 4
+
+
+def test_failure_stops_scheduling(monkeypatch, diamond):
+    compiler = FakeCompiler(failing=["left"])
+    with pytest.raises(Fatal, match="left failed"):
+        run(monkeypatch, diamond, compiler, max_jobs=4)
+    assert "top" not in compiler.started
+    # The sibling already running is allowed to finish before the failure is reported
+    assert "right" in compiler.finished
+
+
+def test_worker_exception_is_raised_on_main_thread(monkeypatch, diamond):
+    compiler = FakeCompiler(raising=["base"])
+    with pytest.raises(OSError, match="base crashed"):
+        run(monkeypatch, diamond, compiler, max_jobs=4)
+    assert compiler.started == ["base"]
+
+
+def test_cycle_is_detected(monkeypatch):
+    a = FakeIp("a")
+    b = FakeIp("b", [a])
+    a.dependencies.append(FakeDep(b))
+    target = FakeIp("target", [a, b])
+    target.ordered_deps = [a, b]
+    compiler = FakeCompiler()
+    with pytest.raises(Fatal, match="circular dependency"):
+        run(monkeypatch, target, compiler, max_jobs=2)
+    assert compiler.started == []
@@ -0,0 +1,121 @@
+# Copyright 2021-2023 Datum Technology Corporation
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.1
+########################################################################################################################
+
+
+import os
+import subprocess
+import time
+from contextlib import ExitStack
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from mio import sim  # Must be imported first to resolve the circular imports between mio modules
+from mio import common
+from mio import eal
+
+
+@pytest.fixture(autouse=True)
+def quiet(monkeypatch):
+    monkeypatch.setattr(common, "dbg", lambda msg: None)
+    monkeypatch.setattr(common, "warning", lambda msg: None)
+
+
+def test_build_argv_splits_fragments_like_the_shell(monkeypatch):
+    monkeypatch.setenv("MIO_TEST_HOME", "/tools/sim")
+    argv = eal.build_argv("$MIO_TEST_HOME/xsim", ["-l sim.log", "-testplusarg \"SEED=1\"", "dsim -a ' -top tb -L uvm'"])
+    assert argv == ["/tools/sim/xsim", "-l", "sim.log", "-testplusarg", "SEED=1", "dsim", "-a", " -top tb -L uvm"]
+
+
+def test_launch_passes_environment_and_working_directory(tmp_path):
+    eal.launch_eda_bin("sh", ["-c 'echo $MIO_TEST_VALUE > out.txt'"], str(tmp_path), env={"MIO_TEST_VALUE" : "42"})
+    assert (tmp_path / "out.txt").read_text() == "42\n"
+
+
+def test_output_is_scanned_while_the_tool_runs(tmp_path):
+    scanner = eal.LogScanner(["^ERROR:"], ["^WARNING:"], stop_on_errors=2)
+    script  = "for i in 1 2 3 4; do echo WARNING: w$i; echo ERROR: e$i; done; sleep 30"
+    eal.launch_eda_bin("sh", [f"-c '{script}'"], str(tmp_path), log_scanner=scanner, timeout=20)
+    assert scanner.stopped
+    assert scanner.errors == ["ERROR: e1", "ERROR: e2"]
+    assert eal.eda_processes == []
+
+
+def test_wall_clock_timeout_kills_the_tool(tmp_path):
+    with pytest.raises(subprocess.TimeoutExpired):
+        eal.launch_eda_bin("sleep", ["30"], str(tmp_path), timeout=0.2)
+    assert eal.eda_processes == []
+
+
+def test_dry_run_only_returns_the_commands(tmp_path):
+    commands = eal.launch_eda_bin("false", ["-x"], str(tmp_path), dry_run=True)
+    assert commands == [f"cd {tmp_path}", "false -x"]
+
+
+class FakeIp:
+    def __init__(self):
+        self.vendor         = "acme"
+        self.name           = "tb"
+        self.has_dut        = False
+        self.is_elaborated  = {}
+        self.build_manifest = {}
+
+
+def elaborate_regression(monkeypatch, tmp_path, key, timestamp, keep_running=False):
+    # Each regression holds its snapshot until it ends, like a mio process does until it exits
+    snapshot_locks = ExitStack()
+    monkeypatch.setattr(eal, "snapshot_locks", snapshot_locks)
+    elaborations = []
+    def do_elaborate(ip, sim_job, wd):
+        elaborations.append(wd)
+        os.makedirs(wd + "/xsim.dir/tb")
+        with open(wd + "/xsim.dir/tb/xsimk", 'w') as file:
+            file.write(key)
+        return wd + "/elab.log"
+    monkeypatch.setattr(eal, "do_elaborate", do_elaborate)
+    monkeypatch.setattr(eal, "scan_elab_log_file_for_errors", lambda path, sim_job: [])
+    monkeypatch.setattr(eal, "log_elab_history", lambda *args: None)
+    monkeypatch.setattr(eal, "calc_build_key", lambda ip, sim_job, step: key)
+    monkeypatch.setattr(eal.cfg, "sim_output_dir", str(tmp_path))
+    monkeypatch.setattr(eal.cfg, "elaboration_snapshots", 2)
+    monkeypatch.setattr(common, "info", lambda msg: None)
+    os.makedirs(tmp_path / "viv" / "regr_wd", exist_ok=True)
+    sim_job = sim.SimulationJob("acme/tb")
+    sim_job.simulator            = common.simulators_enum.VIVADO
+    sim_job.is_regression        = True
+    sim_job.regression_name      = "nightly"
+    sim_job.regression_timestamp = timestamp
+    elab_out = eal.elaborate(FakeIp(), sim_job)
+    with open(elab_out + "/xsim.dir/tb/xsimk") as file:
+        assert file.read() == key
+    if not keep_running:
+        snapshot_locks.close()
+    return elaborations
+
+
+def test_regressions_reuse_elaboration_snapshots(monkeypatch, tmp_path):
+    assert len(elaborate_regression(monkeypatch, tmp_path, "k1", "t1")) == 1
+    assert len(elaborate_regression(monkeypatch, tmp_path, "k1", "t2")) == 0
+    assert len(elaborate_regression(monkeypatch, tmp_path, "k2", "t3")) == 1
+
+
+def test_least_recently_used_snapshots_are_pruned(monkeypatch, tmp_path):
+    for key in ["k1", "k2", "k3"]:
+        elaborate_regression(monkeypatch, tmp_path, key, key)
+        time.sleep(0.01)
+    snapshots_path = tmp_path / "viv" / "elab_out" / "regressions" / "acme__tb"
+    assert sorted(os.listdir(snapshots_path)) == ["k2", "k3"]
+
+
+def test_snapshots_in_use_are_not_pruned(monkeypatch, tmp_path):
+    elaborate_regression(monkeypatch, tmp_path, "k1", "k1", keep_running=True)
+    time.sleep(0.01)
+    for key in ["k2", "k3"]:
+        elaborate_regression(monkeypatch, tmp_path, key, key)
+        time.sleep(0.01)
+    snapshots_path = tmp_path / "viv" / "elab_out" / "regressions" / "acme__tb"
+    assert sorted(os.listdir(snapshots_path)) == ["k1", "k2", "k3"]
+    assert (tmp_path / "viv" / "regr_wd" / "acme__tb__nightly" / "k1" / "xsim.dir" / "tb" / "xsimk").read_text() == "k1"
@@ -0,0 +1,95 @@
+# Copyright 2021-2023 Datum Technology Corporation
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.1
+########################################################################################################################
+
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from mio import sim  # Must be imported first to resolve the circular imports between mio modules
+from mio import engine
+
+
+class RecordingConsumer:
+    def __init__(self):
+        self.events = []
+
+    def consume(self, event):
+        self.events.append((event.kind, event.job.name, event.data.get("status", "")))
+
+
+def test_jobs_run_after_their_prerequisites():
+    order = []
+    cmp  = engine.Job("cmp" , "acme/tb", "compilation", order.append, ["cmp"])
+    elab = engine.Job("elab", "acme/tb", "elaboration", order.append, ["elab"], after=[cmp])
+    assert engine.run([cmp, elab], max_workers=4) == [None, None]
+    assert order == ["cmp", "elab"]
+    assert (cmp.state, elab.state) == ("passed", "passed")
+
+
+def test_events_are_sent_to_consumers():
+    consumer = RecordingConsumer()
+    def step():
+        engine.report_phase("xvlog")
+        engine.report_output(10, num_errors=0, num_warnings=2)
+        return 42
+    job = engine.Job("cmp", "acme/tb", "compilation", step)
+    assert engine.run([job], run_consumers=[consumer]) == [42]
+    assert consumer.events[0] == ("start", "cmp", "")
+    assert ("progress", "cmp", "") in consumer.events
+    assert consumer.events[-1] == ("finish", "cmp", "passed")
+    assert (job.phase, job.num_lines, job.num_warnings) == ("xvlog", 10, 2)
+    assert engine.consumers == []
+
+
+def test_failure_cancels_dependent_jobs():
+    consumer = RecordingConsumer()
+    def fail():
+        raise RuntimeError("compilation failed")
+    cmp  = engine.Job("cmp" , "acme/tb", "compilation", fail)
+    elab = engine.Job("elab", "acme/tb", "elaboration", lambda: None, after=[cmp])
+    with pytest.raises(RuntimeError):
+        engine.run([cmp, elab], run_consumers=[consumer])
+    assert (cmp.state, elab.state) == ("failed", "cancelled")
+    assert ("finish", "elab", "cancelled") in consumer.events
+
+
+def test_json_events(tmp_path):
+    path     = str(tmp_path / "events.jsonl")
+    consumer = engine.JsonEventConsumer(path)
+    engine.run([engine.Job("cmp", "acme/tb", "compilation", lambda: None)], run_consumers=[consumer])
+    consumer.close()
+    assert consumer.file.closed
+    with open(path) as file:
+        events = [json.loads(line) for line in file]
+    assert [event["event"] for event in events] == ["start", "finish"]
+    assert events[-1]["ip"] == "acme/tb"
+    assert events[-1]["step"] == "compilation"
+    assert events[-1]["status"] == "passed"
+
+
+def test_reports_outside_of_jobs_are_ignored():
+    engine.report_phase("xsim")
+    engine.report_output()
+
+
+def test_fatal_errors_exit_from_the_calling_thread():
+    def fatal():
+        sys.exit(0)
+    job = engine.Job("cmp", "acme/tb", "compilation", fatal)
+    with pytest.raises(SystemExit):
+        engine.run([job])
+    assert job.state == "failed"
+
+
+def test_jobs_do_not_share_default_lists():
+    cmp  = engine.Job("cmp" , "acme/tb", "compilation", lambda: None)
+    elab = engine.Job("elab", "acme/tb", "elaboration", lambda: None)
+    cmp.after.append(elab)
+    assert elab.after == []
+    assert cmp.args is not elab.args
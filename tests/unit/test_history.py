@@ -0,0 +1,82 @@
+# Copyright 2021-2023 Datum Technology Corporation
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.1
+########################################################################################################################
+
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from mio import sim  # Must be imported first to resolve the circular imports between mio modules
+from mio import cfg
+from mio import history
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(cfg, "job_history_db_path", str(tmp_path / "job_history.db"))
+    monkeypatch.setattr(cfg, "job_history_file_path", str(tmp_path / "job_history.yml"))
+    monkeypatch.setattr(cfg, "job_history_retention_days", 0)
+    monkeypatch.setattr(history, "history_db", None)
+    yield
+    history.history_db.close()
+
+
+def job(start, end, simulator="viv", test_name="", seed=0):
+    return {
+        "type"            : "end",
+        "simulator"       : simulator,
+        "timestamp_start" : start,
+        "timestamp_end"   : end,
+        "test_name"       : test_name,
+        "seed"            : seed
+    }
+
+
+def test_no_timing_without_history(db):
+    assert history.get_timing("acme/tb", "compilation", "viv") == None
+
+
+def test_durations_are_not_truncated_to_minutes(db):
+    history.add_entry("acme/tb", "compilation", job("2024/01/01-10:00:00", "2024/01/01-10:02:05"))
+    timing = history.get_timing("acme/tb", "compilation", "viv")
+    assert timing["count"] == 1
+    assert timing["ewma"] == 125
+    assert timing["p90"] == 125
+
+
+def test_ewma_favors_recent_jobs(db):
+    history.add_entry("acme/tb", "elaboration", job("2024/01/01-10:00:00", "2024/01/01-10:00:10"))
+    history.add_entry("acme/tb", "elaboration", job("2024/01/01-11:00:00", "2024/01/01-11:01:50"))
+    timing = history.get_timing("acme/tb", "elaboration", "viv")
+    assert timing["mean"] == 60
+    assert timing["ewma"] == pytest.approx(10 + (history.timing_ewma_weight * 100))
+    assert timing["max"] == 110
+
+
+def test_simulators_are_tracked_separately(db):
+    history.add_entry("acme/tb", "compilation", job("2024/01/01-10:00:00", "2024/01/01-10:00:10", simulator="viv"))
+    history.add_entry("acme/tb", "compilation", job("2024/01/01-10:00:00", "2024/01/01-10:00:30", simulator="vcs"))
+    assert history.get_timing("acme/tb", "compilation", "viv")["ewma"] == 10
+    assert history.get_timing("acme/tb", "compilation", "vcs")["ewma"] == 30
+    assert history.get_timing("acme/tb", "compilation")["count"] == 2
+
+
+def test_simulations_are_tracked_per_test_and_seed(db):
+    history.add_entry("acme/tb", "simulation", job("2024/01/01-10:00:00", "2024/01/01-10:00:10", test_name="smoke", seed=1))
+    history.add_entry("acme/tb", "simulation", job("2024/01/01-10:00:00", "2024/01/01-10:00:20", test_name="smoke", seed=2))
+    assert history.get_timing("acme/tb", "simulation", "viv", "smoke.1")["ewma"] == 10
+    assert history.get_timing("acme/tb", "simulation", "viv", "smoke")["count"] == 2
+    assert history.get_timing("acme/tb", "simulation", "viv", "stress") == None
+
+
+def test_timing_window_is_bounded(db):
+    for ii in range(history.timing_window_size + 5):
+        history.add_entry("acme/tb", "compilation", job("2024/01/01-10:00:00", f"2024/01/01-10:00:{ii:02}"))
+    timing = history.get_timing("acme/tb", "compilation", "viv")
+    assert timing["count"] == history.timing_window_size + 5
+    assert timing["max"] == history.timing_window_size + 4
+    assert timing["mean"] == pytest.approx(sum(range(5, history.timing_window_size + 5)) / history.timing_window_size)
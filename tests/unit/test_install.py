@@ -0,0 +1,208 @@
+# Copyright 2021-2023 Datum Technology Corporation
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.1
+########################################################################################################################
+
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from mio import sim  # Must be imported first to resolve the circular imports between mio modules
+from mio import cache
+from mio import cfg
+from mio import common
+from mio import install
+from mio import user
+
+from mock_marketplace import MockMarketplace, make_payload
+
+import hashlib
+from base64 import b64decode, b64encode
+
+update_lock_file = install.update_lock_file
+
+
+@pytest.fixture(params=[True, False], ids=["embedded-payloads", "streamed-payloads"])
+def marketplace(request, tmp_path, monkeypatch):
+    marketplace = MockMarketplace(embed_payloads=request.param)
+    for name in ["jwt_endpoint", "ips_endpoint", "versions_endpoint", "version_endpoint", "licenses_endpoint"]:
+        monkeypatch.setattr(install, name, getattr(install, name).replace(install.base_url, marketplace.url))
+    monkeypatch.setattr(install, "session", None)
+    monkeypatch.setattr(user, "get_token", lambda: "token")
+    monkeypatch.setattr(cfg, "dependencies_path", str(tmp_path / "vendors"))
+    monkeypatch.setattr(cache, "scan_and_load_ip_metadata", lambda: None)
+    monkeypatch.setattr(install, "update_lock_file", lambda ip, versions, resolutions: marketplace.locked.update(versions))
+    monkeypatch.setattr(common, "dbg", lambda msg: None)
+    os.makedirs(tmp_path / "vendors")
+    marketplace.locked = {}
+    yield marketplace
+    marketplace.close()
+
+
+def test_dependencies_are_installed_with_one_catalog_query(marketplace, tmp_path, monkeypatch):
+    monkeypatch.setattr(install, "payload_chunk_size", 5)
+    marketplace.add_ip("uvma_a", "1.0.0", {"ip.yml" : "a"})
+    marketplace.add_ip("uvma_b", "2.1.0", {"ip.yml" : "b", "src/b.sv" : "module b; endmodule"})
+    marketplace.add_ip("uvma_c", "0.3.0", {"ip.yml" : "c"}, commercial=True)
+    install.install_ip_dep_list(None, ["acme/uvma_a", "acme/uvma_b", "acme/uvma_c"], False)
+    assert marketplace.locked == {"acme/uvma_a" : "1.0.0", "acme/uvma_b" : "2.1.0", "acme/uvma_c" : "0.3.0"}
+    assert (tmp_path / "vendors" / "acme__uvma_b" / "src" / "b.sv").read_text() == "module b; endmodule"
+    assert (tmp_path / "vendors" / "acme__uvma_c" / "ip.yml").read_text() == "c"
+    assert marketplace.count("/api/ips") == 1
+    assert marketplace.count("/api/versions") == 1
+    assert marketplace.count("/api/licenses") == 1
+    assert sorted(os.listdir(tmp_path / "vendors")) == ["acme__uvma_a", "acme__uvma_b", "acme__uvma_c"]
+
+
+def test_unknown_ip_is_fatal(marketplace):
+    with pytest.raises(SystemExit):
+        install.install_ip_dep_list(None, ["acme/uvma_missing"], False)
+
+
+def test_payloads_are_decoded_across_chunk_boundaries(monkeypatch, tmp_path):
+    monkeypatch.setattr(common, "dbg", lambda msg: None)
+    payload = make_payload({"ip.yml" : "x" * 100000, "src/a.sv" : "module a; endmodule"})
+    monkeypatch.setattr(install, "payload_chunk_size", 7)
+    digest = install.extract_payload(install.iter_string_chunks(b64encode(payload).decode()), str(tmp_path / "ip"))
+    assert digest == hashlib.sha256(payload).hexdigest()
+    assert (tmp_path / "ip" / "src" / "a.sv").read_text() == "module a; endmodule"
+
+
+def test_checksum_mismatch_keeps_the_installed_ip(marketplace, tmp_path):
+    os.makedirs(tmp_path / "vendors" / "acme__uvma_a")
+    (tmp_path / "vendors" / "acme__uvma_a" / "ip.yml").write_text("old")
+    marketplace.add_ip("uvma_a", "1.0.0", {"ip.yml" : "new"}, sha256="0" * 64)
+    with pytest.raises(SystemExit):
+        install.install_ip_dep_list(None, ["acme/uvma_a"], False)
+    assert os.listdir(tmp_path / "vendors") == ["acme__uvma_a"]
+    assert (tmp_path / "vendors" / "acme__uvma_a" / "ip.yml").read_text() == "old"
+
+
+def test_downloads_are_reused_from_the_cache(marketplace, tmp_path, monkeypatch):
+    monkeypatch.setattr(cfg, "download_cache_path", str(tmp_path / "downloads"))
+    monkeypatch.setattr(install, "download_cache_needs_eviction", False)
+    a_id = marketplace.add_ip("uvma_a", "1.0.0", {"ip.yml" : "a", "src/a.sv" : "module a; endmodule"})
+    c_id = marketplace.add_ip("uvma_c", "0.3.0", {"ip.yml" : "c"}, commercial=True)
+    install.install_ip_dep_list(None, ["acme/uvma_a", "acme/uvma_c"], False)
+    num_requests = len(marketplace.requests)
+    common.remove_dir(str(tmp_path / "vendors" / "acme__uvma_a"))
+    install.install_ip_dep_list(None, ["acme/uvma_a", "acme/uvma_c"], False)
+    payload_requests = [request for request in marketplace.requests[num_requests:] if request[1].startswith(("/api/version/", "/api/licenses/"))]
+    assert payload_requests == []
+    installed = tmp_path / "vendors" / "acme__uvma_a" / "src" / "a.sv"
+    assert installed.read_text() == "module a; endmodule"
+    assert os.path.samefile(installed, tmp_path / "downloads" / f"{a_id}@1.0.0" / "tree" / "src" / "a.sv")
+    assert sorted(os.listdir(tmp_path / "downloads")) == [".lock", f"{a_id}@1.0.0", f"{c_id}@0.3.0+license.{c_id}"]
+
+
+def test_modified_cache_entries_are_downloaded_again(marketplace, tmp_path, monkeypatch):
+    monkeypatch.setattr(cfg, "download_cache_path", str(tmp_path / "downloads"))
+    monkeypatch.setattr(install, "download_cache_needs_eviction", False)
+    marketplace.add_ip("uvma_a", "1.0.0", {"ip.yml" : "a"})
+    install.install_ip_dep_list(None, ["acme/uvma_a"], False)
+    (tmp_path / "vendors" / "acme__uvma_a" / "ip.yml").write_text("edited")
+    install.install_ip_dep_list(None, ["acme/uvma_a"], False)
+    assert (tmp_path / "vendors" / "acme__uvma_a" / "ip.yml").read_text() == "a"
+
+
+def test_least_recently_used_downloads_are_evicted(tmp_path, monkeypatch):
+    monkeypatch.setattr(common, "dbg", lambda msg: None)
+    monkeypatch.setattr(cfg, "download_cache_path", str(tmp_path / "downloads"))
+    payload = b64encode(make_payload({"ip.yml" : "x" * 1000})).decode()
+    for version, mtime in [("1.0.0", 0), ("1.1.0", 1), ("1.2.0", 2)]:
+        resolution = {"kind" : "version", "ip-id" : 1, "id" : 1, "version" : version}
+        install.install_payload({"publicPayload" : payload}, 'publicPayload', resolution, None, str(tmp_path / version))
+        os.utime(tmp_path / "downloads" / f"1@{version}" / install.download_entry_marker_file_name, (mtime, mtime))
+    monkeypatch.setattr(cfg, "download_cache_max_size_gb", 2500 / (1024 ** 3))
+    install.evict_downloads()
+    assert sorted([os.path.basename(entry[2]) for entry in install.get_download_cache_entries()]) == ["1@1.1.0", "1@1.2.0"]
+
+
+class FakeIp:
+    def __init__(self, path, version="1.0.0", is_local=False):
+        self.path     = path
+        self.version  = version
+        self.is_local = is_local
+
+
+def lock(tmp_path, monkeypatch, deps):
+    # Resolves 'deps' through the catalog and records them in the lock file of IP 'uvmt_tb'
+    ip_path = tmp_path / "uvmt_tb"
+    os.makedirs(ip_path)
+    (ip_path / "ip.yml").write_text("ip:\n  name: uvmt_tb\ndependencies:\n" + "".join([f"  {dep}: '*'\n" for dep in deps]))
+    monkeypatch.setattr(install, "update_lock_file", update_lock_file)
+    ip = FakeIp(str(ip_path))
+    install.install_ip_dep_list(ip, deps, False)
+    return ip
+
+
+def test_lock_file_records_resolutions(marketplace, tmp_path, monkeypatch):
+    a_id = marketplace.add_ip("uvma_a", "1.0.0", {"ip.yml" : "a"})
+    c_id = marketplace.add_ip("uvma_c", "0.3.0", {"ip.yml" : "c"}, commercial=True)
+    ip = lock(tmp_path, monkeypatch, ["acme/uvma_a", "acme/uvma_c"])
+    resolutions = install.read_lock_file_resolutions(ip)
+    assert resolutions["acme/uvma_a"]["kind"] == "version"
+    assert resolutions["acme/uvma_a"]["ip-id"] == a_id
+    assert resolutions["acme/uvma_c"]["kind"] == "license"
+    assert resolutions["acme/uvma_c"]["version"] == "0.3.0"
+    assert resolutions["acme/uvma_c"]["sha256"] == hashlib.sha256(b64decode(marketplace.payloads[c_id])).hexdigest()
+
+
+def test_frozen_install_only_fetches_missing_dependencies(marketplace, tmp_path, monkeypatch):
+    marketplace.add_ip("uvma_a", "1.0.0", {"ip.yml" : "a"})
+    marketplace.add_ip("uvma_b", "2.1.0", {"ip.yml" : "b"})
+    marketplace.add_ip("uvma_c", "0.3.0", {"ip.yml" : "c"}, commercial=True)
+    ip = lock(tmp_path, monkeypatch, ["acme/uvma_a", "acme/uvma_b", "acme/uvma_c"])
+    common.remove_dir(str(tmp_path / "vendors"))
+    marketplace.requests.clear()
+    installed = {"uvma_a" : FakeIp(str(tmp_path / "vendors" / "acme__uvma_a"), "1.0.0")}
+    monkeypatch.setattr(cache, "get_ip", lambda vendor, name, fail_if_not_found=False: installed.get(name))
+    install.install_frozen_dep_list(ip, ["acme/uvma_a", "acme/uvma_b", "acme/uvma_c"], False)
+    assert sorted(os.listdir(tmp_path / "vendors")) == ["acme__uvma_b", "acme__uvma_c"]
+    assert (tmp_path / "vendors" / "acme__uvma_c" / "ip.yml").read_text() == "c"
+    assert marketplace.count("/api/ips") + marketplace.count("/api/versions") + marketplace.count("/api/licenses") == 0
+    assert len([request for request in marketplace.requests if request[0] == "GET"]) == 2
+
+
+def test_frozen_install_checks_locked_checksums(marketplace, tmp_path, monkeypatch):
+    marketplace.add_ip("uvma_a", "1.0.0", {"ip.yml" : "a"})
+    ip = lock(tmp_path, monkeypatch, ["acme/uvma_a"])
+    common.remove_dir(str(tmp_path / "vendors" / "acme__uvma_a"))
+    marketplace.payloads[1] = b64encode(make_payload({"ip.yml" : "republished"})).decode()
+    monkeypatch.setattr(cache, "get_ip", lambda vendor, name, fail_if_not_found=False: None)
+    with pytest.raises(SystemExit):
+        install.install_frozen_dep_list(ip, ["acme/uvma_a"], False)
+    assert not os.path.exists(tmp_path / "vendors" / "acme__uvma_a")
+
+
+def test_frozen_install_requires_pinned_dependencies(marketplace, tmp_path, monkeypatch):
+    marketplace.add_ip("uvma_a", "1.0.0", {"ip.yml" : "a"})
+    marketplace.add_ip("uvma_b", "2.1.0", {"ip.yml" : "b"})
+    ip = lock(tmp_path, monkeypatch, ["acme/uvma_a"])
+    with pytest.raises(SystemExit):
+        install.install_frozen_dep_list(ip, ["acme/uvma_a", "acme/uvma_b"], False)
+
+
+def test_frozen_install_from_the_download_cache_needs_no_token(marketplace, tmp_path, monkeypatch):
+    monkeypatch.setattr(cfg, "download_cache_path", str(tmp_path / "downloads"))
+    monkeypatch.setattr(install, "download_cache_needs_eviction", False)
+    a_id = marketplace.add_ip("uvma_a", "1.0.0", {"ip.yml" : "a"})
+    marketplace.add_ip("uvma_b", "2.1.0", {"ip.yml" : "b"})
+    ip = lock(tmp_path, monkeypatch, ["acme/uvma_a", "acme/uvma_b"])
+    common.remove_dir(str(tmp_path / "vendors"))
+    monkeypatch.setattr(cache, "get_ip", lambda vendor, name, fail_if_not_found=False: None)
+    tokens = []
+    monkeypatch.setattr(user, "get_token", lambda: tokens.append("token") or "token")
+    marketplace.requests.clear()
+    install.install_frozen_dep_list(ip, ["acme/uvma_a", "acme/uvma_b"], False)
+    assert (tmp_path / "vendors" / "acme__uvma_b" / "ip.yml").read_text() == "b"
+    assert (marketplace.requests, tokens) == ([], [])
+    # An entry evicted since the lock file was written is downloaded again
+    common.remove_dir(str(tmp_path / "downloads" / f"{a_id}@1.0.0"))
+    common.remove_dir(str(tmp_path / "vendors"))
+    install.install_frozen_dep_list(ip, ["acme/uvma_a", "acme/uvma_b"], False)
+    assert (tmp_path / "vendors" / "acme__uvma_a" / "ip.yml").read_text() == "a"
+    assert (marketplace.requests, tokens) == ([("GET", f"/api/version/{a_id}")], ["token"])
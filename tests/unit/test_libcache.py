@@ -0,0 +1,133 @@
+# Copyright 2021-2023 Datum Technology Corporation
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.1
+########################################################################################################################
+
+
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from mio import sim  # Must be imported first to resolve the circular imports between mio modules
+from mio import cfg
+from mio import common
+from mio import libcache
+
+
+class FakeIp:
+    def __init__(self, is_local=False):
+        self.vendor   = "acme"
+        self.name     = "agent"
+        self.is_local = is_local
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(cfg, "library_cache_path", str(tmp_path / "cache"))
+    monkeypatch.setattr(cfg, "library_cache_max_size_gb", 0)
+    monkeypatch.setattr(cfg, "vivado_home", str(tmp_path / "vivado"))
+    monkeypatch.setattr(libcache, "needs_eviction", False)
+    monkeypatch.setattr(common, "dbg", lambda msg: None)
+    os.makedirs(tmp_path / "vivado")
+    (tmp_path / "vivado" / "xvlog").write_text("v1")
+    return tmp_path
+
+
+def use_workspace(monkeypatch, tmp_path, name):
+    monkeypatch.setattr(cfg, "sim_output_dir", str(tmp_path / name / "sim"))
+    sim_job = sim.SimulationJob("acme/agent")
+    sim_job.simulator = common.simulators_enum.VIVADO
+    return sim_job
+
+
+def build(sim_job, tmp_path, contents):
+    lib_path = libcache.get_library_path(FakeIp(), sim_job)
+    os.makedirs(lib_path)
+    with open(lib_path + "/agent.sdb", 'w') as file:
+        file.write(contents)
+    log_file_path = str(tmp_path / "cmp.log")
+    with open(log_file_path, 'w') as file:
+        file.write("compiled\n")
+    return log_file_path
+
+
+def test_libraries_are_shared_between_workspaces(cache, monkeypatch):
+    sim_job = use_workspace(monkeypatch, cache, "a")
+    assert not libcache.fetch(FakeIp(), sim_job, "key", str(cache / "a.log"))
+    libcache.publish(FakeIp(), sim_job, "key", build(sim_job, cache, "lib"))
+    sim_job = use_workspace(monkeypatch, cache, "b")
+    os.makedirs(cache / "b" / "sim" / "viv" / "cmp_out")
+    assert libcache.fetch(FakeIp(), sim_job, "key", str(cache / "b.log"))
+    assert (cache / "b" / "sim" / "viv" / "cmp_out" / "acme__agent" / "agent.sdb").read_text() == "lib"
+    assert (cache / "b.log").read_text() == "compiled\n"
+
+
+def test_simulator_installation_is_part_of_the_key(cache, monkeypatch):
+    sim_job = use_workspace(monkeypatch, cache, "a")
+    libcache.publish(FakeIp(), sim_job, "key", build(sim_job, cache, "lib"))
+    (cache / "vivado" / "xvlog").write_text("v2")
+    assert not libcache.fetch(FakeIp(), sim_job, "key", str(cache / "a.log"))
+
+
+def test_only_external_ips_are_cached(cache, monkeypatch):
+    sim_job = use_workspace(monkeypatch, cache, "a")
+    assert libcache.is_enabled(FakeIp(), sim_job)
+    assert not libcache.is_enabled(FakeIp(is_local=True), sim_job)
+    sim_job.simulator = common.simulators_enum.VCS
+    assert not libcache.is_enabled(FakeIp(), sim_job)
+
+
+def test_least_recently_used_entries_are_evicted(cache, monkeypatch):
+    sim_job = use_workspace(monkeypatch, cache, "a")
+    log_file_path = build(sim_job, cache, "x" * 1000)
+    for key in ["k1", "k2", "k3"]:
+        libcache.publish(FakeIp(), sim_job, key, log_file_path)
+    entries = sorted(libcache.get_entries())
+    os.utime(entries[0][2] + "/" + libcache.entry_marker_file_name, (0, 0))
+    os.utime(entries[1][2] + "/" + libcache.entry_marker_file_name, (1, 1))
+    monkeypatch.setattr(cfg, "library_cache_max_size_gb", 2500 / (1024 ** 3))
+    libcache.evict()
+    assert sorted([entry[2] for entry in libcache.get_entries()]) == sorted([entries[1][2], entries[2][2]])
+
+
+def is_locked_by_another_process(path):
+    script = "import fcntl, sys\nf = open(sys.argv[1], 'a+')\ntry:\n    fcntl.lockf(f, fcntl.LOCK_EX | fcntl.LOCK_NB)\nexcept OSError:\n    sys.exit(1)"
+    return subprocess.run([sys.executable, "-c", script, path]).returncode == 1
+
+
+def test_lock_is_held_until_the_last_thread_leaves(tmp_path):
+    path    = str(tmp_path / ".lock")
+    entered = threading.Barrier(2)
+    leave   = threading.Event()
+    def hold():
+        with common.file_lock(path):
+            entered.wait()
+            leave.wait()
+    thread = threading.Thread(target=hold)
+    thread.start()
+    with common.file_lock(path):
+        entered.wait()
+    assert is_locked_by_another_process(path)
+    leave.set()
+    thread.join()
+    assert not is_locked_by_another_process(path)
+
+
+def test_exclusive_lock_waits_for_the_process_threads(tmp_path):
+    path   = str(tmp_path / ".lock")
+    events = []
+    with common.file_lock(path):
+        def exclusive():
+            with common.file_lock(path, exclusive=True):
+                events.append("exclusive")
+        thread = threading.Thread(target=exclusive)
+        thread.start()
+        time.sleep(0.2)
+        events.append("shared released")
+    thread.join()
+    assert events == ["shared released", "exclusive"]
@@ -0,0 +1,23 @@
+# Copyright 2021-2023 Datum Technology Corporation
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.1
+########################################################################################################################
+
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from mio import sim  # Must be imported first to resolve the circular imports between mio modules
+from mio import publish
+
+
+def test_only_hdl_files_are_copied_when_staging(tmp_path):
+    src_dir = tmp_path / "src"
+    os.makedirs(src_dir / "agent")
+    (src_dir / "agent" / "agent.sv").write_text("module agent; endmodule\n")
+    (src_dir / "agent" / "agent.flist").write_text("agent.sv\n")
+    publish.stage_src_dir(str(src_dir), str(tmp_path / "src.viv"))
+    (tmp_path / "src.viv" / "agent" / "agent.sv").write_text("encrypted\n")
+    assert (src_dir / "agent" / "agent.sv").read_text() == "module agent; endmodule\n"
+    assert os.path.samefile(src_dir / "agent" / "agent.flist", tmp_path / "src.viv" / "agent" / "agent.flist")
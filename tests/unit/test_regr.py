@@ -0,0 +1,141 @@
+# Copyright 2021-2023 Datum Technology Corporation
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.1
+########################################################################################################################
+
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from mio import sim  # Must be imported first to resolve the circular imports between mio modules
+from mio import common
+from mio import history
+from mio import regr
+
+
+class FakeIp:
+    def __init__(self):
+        self.vendor = "acme"
+        self.name   = "tb"
+
+
+@pytest.fixture
+def suite():
+    test_suite = regr.TestSuite(FakeIp(), "ts.yml", "viv")
+    test_set   = regr.TestSet("functional", test_suite)
+    test_suite.groups = {
+        "fast" : regr.TestGroup("fast", test_set),
+        "slow" : regr.TestGroup("slow", test_set),
+        "new"  : regr.TestGroup("new" , test_set)
+    }
+    test_suite.regression = regr.Regression("nightly", test_suite.groups["fast"], test_set, test_suite)
+    return test_suite
+
+
+def add_test(suite, name, seed, group):
+    suite.regression.add_test(name, seed, [], suite.groups[group])
+
+
+def use_timings(monkeypatch, timings):
+    def get_timing(ip_str, step, simulator="", key=""):
+        assert (ip_str, step, simulator) == ("acme/tb", "simulation", "viv")
+        if key in timings:
+            return {"ewma" : timings[key]}
+        return None
+    monkeypatch.setattr(history, "get_timing", get_timing)
+    monkeypatch.setattr(common, "dbg", lambda msg: None)
+
+
+def order(suite):
+    tests = regr.order_tests_by_duration(suite.ip, suite, suite.regression.get_tests())
+    return [f"{test.name}.{test.seed}" for test in tests]
+
+
+def test_longest_tests_are_launched_first(monkeypatch, suite):
+    use_timings(monkeypatch, {"smoke.1" : 10, "stress.1" : 600, "reset.1" : 60})
+    add_test(suite, "smoke" , 1, "fast")
+    add_test(suite, "reset" , 1, "fast")
+    add_test(suite, "stress", 1, "slow")
+    assert order(suite) == ["stress.1", "reset.1", "smoke.1"]
+
+
+def test_unknown_seeds_use_test_history(monkeypatch, suite):
+    use_timings(monkeypatch, {"smoke" : 10, "stress" : 600, "stress.1" : 5})
+    add_test(suite, "smoke" , 7, "fast")
+    add_test(suite, "stress", 1, "slow")
+    add_test(suite, "stress", 2, "slow")
+    assert order(suite) == ["stress.2", "smoke.7", "stress.1"]
+
+
+def test_unknown_tests_use_group_then_overall_history(monkeypatch, suite):
+    use_timings(monkeypatch, {"" : 100, "stress" : 600, "smoke" : 10})
+    add_test(suite, "smoke" , 1, "fast")
+    add_test(suite, "brand_new", 1, "new")
+    add_test(suite, "soak"  , 1, "slow")
+    add_test(suite, "stress", 1, "slow")
+    assert order(suite) == ["soak.1", "stress.1", "brand_new.1", "smoke.1"]
+
+
+def test_declaration_order_is_kept_without_history(monkeypatch, suite):
+    use_timings(monkeypatch, {})
+    add_test(suite, "b", 1, "fast")
+    add_test(suite, "a", 1, "slow")
+    add_test(suite, "c", 1, "new")
+    assert order(suite) == ["b.1", "a.1", "c.1"]
+
+
+def test_reduce_drops_duplicates(monkeypatch, suite):
+    monkeypatch.setattr(common, "warning", lambda msg: None)
+    suite.regression.add_test("smoke", 1, ["+A=1", "+B=2"], suite.groups["fast"])
+    suite.regression.add_test("smoke", 2, ["+A=1", "+B=2"], suite.groups["fast"])
+    suite.regression.add_test("smoke", 1, ["+B=2", "+A=1"], suite.groups["fast"])
+    suite.regression.add_test("smoke", 1, ["+B=3", "+A=1"], suite.groups["fast"])
+    suite.regression.add_test("smoke", 2, ["+A=1", "+B=2"], suite.groups["fast"])
+    suite.regression.reduce()
+    assert [(test.seed, test.args) for test in suite.regression.get_tests()] == [
+        (1, ["+A=1", "+B=2"]),
+        (2, ["+A=1", "+B=2"]),
+        (1, ["+B=3", "+A=1"])
+    ]
+
+
+def test_reduce_keeps_unique_tests(monkeypatch, suite):
+    for seed in range(1000):
+        suite.regression.add_test("smoke", seed, [], suite.groups["fast"])
+    suite.regression.reduce()
+    assert len(suite.regression.get_tests()) == 1000
+
+
+def test_no_abort_by_default(suite):
+    assert suite.regression.get_abort_reason(100, 100, {"num_fatals" : 1}) == ""
+
+
+def test_abort_on_failures(suite):
+    suite.regression.abort_failures = 2
+    assert suite.regression.get_abort_reason(5, 1, {}) == ""
+    assert suite.regression.get_abort_reason(6, 2, {}) == "2 test(s) failed"
+
+
+def test_abort_on_failure_rate_waits_for_min_tests(suite):
+    suite.regression.abort_rate      = 50
+    suite.regression.abort_min_tests = 4
+    assert suite.regression.get_abort_reason(3, 3, {}) == ""
+    assert suite.regression.get_abort_reason(4, 2, {}) == ""
+    assert suite.regression.get_abort_reason(4, 3, {}) == "75.0% of 4 test(s) failed"
+
+
+def test_abort_on_fatal(suite):
+    suite.regression.abort_on_fatal = True
+    assert suite.regression.get_abort_reason(1, 1, {"num_fatals" : 0}) == ""
+    assert "fatal" in suite.regression.get_abort_reason(1, 1, {"num_fatals" : 1, "test_name" : "smoke", "seed" : 1})
+
+
+def test_test_limits_by_group(suite):
+    limits = {"default" : 30, "slow" : 120, "functional.new" : 0.5}
+    assert suite.get_test_limit(limits, suite.groups["fast"]) == 1800
+    assert suite.get_test_limit(limits, suite.groups["slow"]) == 7200
+    assert suite.get_test_limit(limits, suite.groups["new" ]) == 30
+    assert suite.get_test_limit({}, suite.groups["fast"]) == 0
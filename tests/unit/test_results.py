@@ -0,0 +1,57 @@
+# Copyright 2021-2023 Datum Technology Corporation
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.1
+########################################################################################################################
+
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from mio import sim  # Must be imported first to resolve the circular imports between mio modules
+from mio import cfg
+from mio import history
+from mio import results
+
+
+def write_log(path, num_errors):
+    with open(path, 'w') as log_file:
+        for index in range(num_errors):
+            log_file.write(f"UVM_ERROR @ {index}ns: error {index}\n")
+            log_file.write("x" * (1024 * 1024) + "\n")
+    return str(path)
+
+
+def test_entire_logs_are_parsed_by_default(tmp_path):
+    summary = results.parse_sim_log(write_log(tmp_path / "sim.log", 3))
+    assert (summary["conclusion"], summary["num_errors"]) == ("failed", 3)
+
+
+def test_parsing_stops_after_failure_limit(tmp_path):
+    summary = results.parse_sim_log(write_log(tmp_path / "sim.log", 3), stop_after_failures=1)
+    assert summary["conclusion"] == "failed"
+    assert summary["num_errors"] < 3
+
+
+@pytest.mark.parametrize("num_logs", [1, 2])
+def test_failure_limit_is_passed_to_log_parsers(tmp_path, monkeypatch, num_logs):
+    monkeypatch.setattr(cfg, "sim_log_failure_limit", 1)
+    sims = [{'log_path' : write_log(tmp_path / f"sim{index}.log", 3)} for index in range(num_logs)]
+    for summary in results.load_sim_summaries(sims):
+        assert summary["num_errors"] < 3
+    for summary in results.load_sim_summaries(sims, failure_limit=0):
+        assert summary["num_errors"] == 3
+
+
+def test_expected_durations_come_from_the_timing_model(tmp_path, monkeypatch):
+    monkeypatch.setattr(cfg, "job_history_db_path", str(tmp_path / "job_history.db"))
+    monkeypatch.setattr(cfg, "job_history_retention_days", 0)
+    monkeypatch.setattr(history, "history_db", None)
+    sim = {"type" : "end", "simulator" : "viv", "test_name" : "smoke", "seed" : 1,
+           "timestamp_start" : "2023/01/01-00:00:00", "timestamp_end" : "2023/01/01-00:01:00"}
+    assert results.get_expected_duration("acme/tb", sim) == ""
+    history.add_entry("acme/tb", 'simulation', sim)
+    assert results.get_expected_duration("acme/tb", dict(sim, seed=2)) == 60
+    history.history_db.close()
@@ -0,0 +1,55 @@
+# Copyright 2021-2023 Datum Technology Corporation
+# SPDX-License-Identifier: Apache-2.0 WITH SHL-2.1
+########################################################################################################################
+
+
+import datetime
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from mio import sim  # Must be imported first to resolve the circular imports between mio modules
+from mio import common
+from mio import user
+
+
+class FakeResponse:
+    def json(self):
+        return {"id_token" : "fresh"}
+
+
+@pytest.fixture
+def logins(monkeypatch):
+    posts = []
+    monkeypatch.setattr(user, "session_token", None)
+    monkeypatch.setattr(user.requests, "post", lambda url, json: posts.append(json) or FakeResponse())
+    monkeypatch.setattr(user.getpass, "getpass", lambda prompt: "secret")
+    monkeypatch.setattr(common, "banner", lambda msg: None)
+    monkeypatch.setattr(common, "dbg", lambda msg: None)
+    return posts
+
+
+def use_token(monkeypatch, expires_in):
+    expiration = (datetime.datetime.now() + expires_in).strftime("%Y/%m/%d-%H:%M:%S")
+    monkeypatch.setattr(user, "user_data", {"username" : "jdoe", "token" : "cached", "expiration" : expiration})
+
+
+def test_token_is_resolved_once_for_all_jobs(monkeypatch, logins):
+    use_token(monkeypatch, datetime.timedelta(days=10))
+    assert user.resolve_session_token() == "cached"
+    monkeypatch.setattr(user, "do_login", lambda *args: pytest.fail("Jobs must not log in"))
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        tokens = list(executor.map(lambda ii: user.get_session_token(), range(1000)))
+    assert tokens == ["cached"] * 1000
+    assert logins == []
+
+
+def test_token_expiring_soon_is_renewed_before_jobs_are_launched(monkeypatch, logins):
+    use_token(monkeypatch, datetime.timedelta(hours=1))
+    assert user.resolve_session_token() == "fresh"
+    assert logins == [{"username" : "jdoe", "password" : "secret", "rememberMe" : "true"}]
+    assert user.get_session_token() == "fresh"